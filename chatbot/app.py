@@ -1,238 +1,158 @@
 from fastapi import FastAPI, WebSocket, Request
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, JSONResponse
 from fastapi.templating import Jinja2Templates
 import asyncio
 import json
 import subprocess
-import sqlite3
 import os
+import sys
+from contextlib import asynccontextmanager
 from datetime import datetime
-from typing import Dict, List
+from typing import Dict, List, Optional
+
+# The people_server package lives next to this directory
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
 from llm_client import LLMClient
+from chatbot.history import ChatHistory
+from chatbot.history_maintenance import HistoryMaintenance
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
 load_dotenv()
 
-app = FastAPI()
-templates = Jinja2Templates(directory="templates")
-
-def init_db():
-    conn = sqlite3.connect('chat_history.db')
-    cursor = conn.cursor()
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS chat_sessions (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            session_id TEXT,
-            message TEXT,
-            response TEXT,
-            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    conn.commit()
-    conn.close()
-
-init_db()
-
 class MCPClient:
     def __init__(self):
         # Import here to avoid circular imports
-        import sys
-        import os
-        sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
-        
-        from people_server.csv_data import get_people_data, reload_csv_data
-        from people_server.fuzzy import fuzzy_search_people
+        from people_server.tools import call_tool, result_cache, tool_stats
         
-        # Reload data to ensure we have the latest
-        reload_csv_data()
+        # Same tool implementations and accounting as the MCP server
+        self.dispatch = call_tool
+        self.tool_stats = tool_stats
+        self.result_cache = result_cache
+    
+    def warm_up(self):
+        """Load the primary dataset and its indexes ahead of the first question"""
+        from people_server.tools import get_registry
         
-        self.get_people_data = get_people_data
-        self.fuzzy_search_people = fuzzy_search_people
+        # One parsed copy of each dataset, shared with the MCP server code,
+        # kept fresh in the background as the export files change
+        registry = get_registry()
+        registry.watch()
+        registry.current()
     
     async def call_tool(self, tool_name: str, arguments: dict = None):
         """Call MCP tools directly without subprocess"""
+        return (await self.call_tool_result(tool_name, arguments)).text
+    
+    async def call_tool_result(self, tool_name: str, arguments: dict = None):
+        """Structured result of a tool call, for compacting into prompts
+        
+        Tools run in a worker thread: a large batch, or a call waiting for
+        the dataset to load, must not stall the other sessions.
+        """
+        return await asyncio.to_thread(self._dispatch_result, tool_name, arguments)
+    
+    def _dispatch_result(self, tool_name: str, arguments: dict = None):
         try:
-            if arguments is None:
-                arguments = {}
-            
-            # Force reload data every time
-            import pandas as pd
-            import os
-            csv_path = "data/Employee_Complete_Dataset.csv"
-            people_data = []
-            
-            if os.path.exists(csv_path):
-                df = pd.read_csv(csv_path)
-                for _, row in df.iterrows():
-                    person = {
-                        "id": int(row['Employee_number']),
-                        "full_name": str(row['Employee_name']),
-                        "preferred_name": str(row['Employee_name']).split()[0],
-                        "email": f"{str(row['Employee_name']).lower().replace(' ', '.')}@company.com",
-                        "phone": "+91-9876543210",
-                        "role": str(row['Role']),
-                        "department": str(row['Department']),
-                        "location": "Office",
-                        "tags": []
-                    }
-                    people_data.append(person)
-            
-            if tool_name == "ping":
-                from datetime import datetime
-                timestamp = datetime.now().isoformat()
-                return f"pong - {timestamp}"
-            
-            elif tool_name == "get_person_exact":
-                search_name = arguments.get("name", "").lower()
-                matches = []
-                
-                for person in people_data:
-                    if (person["full_name"].lower() == search_name or 
-                        person["preferred_name"].lower() == search_name):
-                        matches.append(person)
-                
-                if not matches:
-                    return f"No employee found with exact name '{arguments.get('name')}'"
-                
-                result_text = f"Found {len(matches)} exact match(es) for '{arguments.get('name')}':\n\n"
-                for person in matches:
-                    result_text += f"- {person['full_name']} (ID: {person['id']}) - {person['role']} in {person['department']}\n"
-                    result_text += f"  Email: {person['email']} | Phone: {person['phone']}\n\n"
-                
-                return result_text
-            
-            elif tool_name == "get_person_fuzzy":
-                search_name = arguments.get("name", "").lower().strip()
-                max_results = arguments.get("maxResults", 5)
-                
-                # Direct search in employee names
-                matches = []
-                for person in people_data:
-                    if search_name in person["full_name"].lower():
-                        matches.append(person)
-                
-                if not matches:
-                    return f"No employees found with name '{arguments.get('name')}'"
-                
-                matches = matches[:max_results]
-                result_text = f"Found {len(matches)} employee(s) with '{arguments.get('name')}':\n\n"
-                
-                for i, person in enumerate(matches, 1):
-                    result_text += f"{i}. {person['full_name']} (ID: {person['id']})\n"
-                    result_text += f"   Role: {person['role']} | Department: {person['department']}\n"
-                    result_text += f"   Email: {person['email']} | Phone: {person['phone']}\n\n"
-                
-                return result_text
-            
-            elif tool_name == "list_people":
-                department = arguments.get("department")
-                role = arguments.get("role") 
-                min_salary = arguments.get("min_salary")
-                max_salary = arguments.get("max_salary")
-                min_age = arguments.get("min_age")
-                max_age = arguments.get("max_age")
-                limit = arguments.get("limit", 10)
-                
-                # Filter directly from CSV data
-                filtered_people = []
-                for _, row in df.iterrows():
-                    # Create person with all data
-                    person = {
-                        "id": int(row['Employee_number']),
-                        "full_name": str(row['Employee_name']),
-                        "role": str(row['Role']),
-                        "department": str(row['Department']),
-                        "salary": int(row['Current_Salary']),
-                        "age": int(row['Employee_age']),
-                        "education": str(row['Education_level'])
-                    }
-                    
-                    # Apply filters
-                    if department and department.lower() not in person["department"].lower():
-                        continue
-                    if role and role.lower() not in person["role"].lower():
-                        continue
-                    if min_salary and person['salary'] < int(min_salary):
-                        continue
-                    if max_salary and person['salary'] > int(max_salary):
-                        continue
-                    if min_age and person['age'] < int(min_age):
-                        continue
-                    if max_age and person['age'] > int(max_age):
-                        continue
-                    
-                    filtered_people.append(person)
-                
-                # Sort by salary (highest first)
-                filtered_people.sort(key=lambda x: x['salary'], reverse=True)
-                filtered_people = filtered_people[:limit]
-                
-                if not filtered_people:
-                    return "No employees found matching the criteria"
-                
-                filters_used = []
-                if department: filters_used.append(f"department: {department}")
-                if role: filters_used.append(f"role: {role}")
-                if min_salary: filters_used.append(f"salary >= ${min_salary}")
-                if max_salary: filters_used.append(f"salary <= ${max_salary}")
-                if min_age: filters_used.append(f"age >= {min_age}")
-                if max_age: filters_used.append(f"age <= {max_age}")
-                
-                filter_text = f" with filters: {', '.join(filters_used)}" if filters_used else ""
-                result_text = f"Found {len(filtered_people)} employees{filter_text}:\n\n"
-                
-                for i, person in enumerate(filtered_people, 1):
-                    result_text += f"{i}. {person['full_name']} (ID: {person['id']})\n"
-                    result_text += f"   Role: {person['role']} | Department: {person['department']}\n"
-                    result_text += f"   Age: {person['age']}, Salary: ${person['salary']:,}\n"
-                    result_text += f"   Education: {person['education']}\n\n"
-                
-                return result_text
-            
-            else:
-                return f"Unknown tool: {tool_name}"
-                
+            return self.dispatch(tool_name, arguments)
         except Exception as e:
-            return f"Error: {str(e)}"
+            from people_server.tools import ToolResult
+            return ToolResult.error(f"Error: {str(e)}")
+    
+    async def get_people_batch(self, names: List[str], max_results: int = 3, dataset: str = None):
+        """Best candidates for every name in a roster, resolved in one call"""
+        arguments = {"names": list(names), "maxResults": max_results, "dataset": dataset}
+        return await self.call_tool_result("get_people_batch", arguments)
+
+# Created by the lifespan handler below
+history: Optional[ChatHistory] = None
+maintenance: Optional[HistoryMaintenance] = None
+mcp_client: Optional[MCPClient] = None
+llm_client: Optional[LLMClient] = None
+# Background load of the primary dataset, reported by /ready
+dataset_warm_up: Optional[asyncio.Task] = None
 
-mcp_client = MCPClient()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open the history, set up the LLM client and load the data side by side
+    
+    Serving starts once the history and LLM client are up; the dataset
+    keeps loading in the background until /ready says otherwise.
+    """
+    global history, maintenance, mcp_client, llm_client, dataset_warm_up
+    mcp_client = MCPClient()
+    dataset_warm_up = asyncio.create_task(asyncio.to_thread(mcp_client.warm_up))
+    # One writer thread and one read connection for the whole app; the LLM
+    # client uses fallback mode if no API key is set
+    history, llm_client = await asyncio.gather(
+        asyncio.to_thread(ChatHistory),
+        asyncio.to_thread(LLMClient, os.getenv('GEMINI_API_KEY'))
+    )
+    # Archives quiet sessions and keeps the live database compact
+    maintenance = HistoryMaintenance(history)
+    maintenance.start()
+    try:
+        yield
+    finally:
+        maintenance.stop()
+        history.close()
+        llm_client.close()
 
-# Initialize LLM client (will use fallback mode if no API key)
-api_key = os.getenv('GEMINI_API_KEY')
-llm_client = LLMClient(api_key)
+app = FastAPI(lifespan=lifespan)
+templates = Jinja2Templates(directory="templates")
 
 def save_chat(session_id: str, message: str, response: str):
-    conn = sqlite3.connect('chat_history.db')
-    cursor = conn.cursor()
-    cursor.execute(
-        'INSERT INTO chat_sessions (session_id, message, response) VALUES (?, ?, ?)',
-        (session_id, message, response)
-    )
-    conn.commit()
-    conn.close()
+    """Queue an exchange for the history writer"""
+    history.save(session_id, message, response)
 
 def get_chat_history(session_id: str) -> List[Dict]:
-    conn = sqlite3.connect('chat_history.db')
-    cursor = conn.cursor()
-    cursor.execute(
-        'SELECT message, response, timestamp FROM chat_sessions WHERE session_id = ? ORDER BY timestamp',
-        (session_id,)
-    )
-    history = []
-    for row in cursor.fetchall():
-        history.append({
-            'message': row[0],
-            'response': row[1],
-            'timestamp': row[2]
-        })
-    conn.close()
-    return history
+    return history.session(session_id)
+
+async def history_frame(frame_type: str, session_id: str, before: str = None) -> str:
+    """One page of a session's history, with the cursor for the page before it"""
+    try:
+        exchanges, cursor = await asyncio.to_thread(history.page, session_id, before)
+    except ValueError:
+        exchanges, cursor = [], None
+    return json.dumps({"type": frame_type, "data": exchanges, "cursor": cursor})
 
 async def process_message(message: str) -> str:
     """Process message using LLM client"""
     return await llm_client.process_message(message, mcp_client)
 
+def stream_message(message: str):
+    """Reply to a message as an async stream of text pieces"""
+    return llm_client.stream_message(message, mcp_client)
+
+@app.get("/stats")
+async def get_stats():
+    """Per-tool call counts, latency and rows scanned/returned, cache hits, Gemini token use and history upkeep"""
+    return {
+        "tools": mcp_client.tool_stats(),
+        "tool_cache": mcp_client.result_cache.stats(),
+        "intent_cache": llm_client.intents.stats(),
+        "llm": llm_client.telemetry.stats(),
+        "history": {"written": history.written, "batches": history.batches,
+                    "maintenance": maintenance.last_run}
+    }
+
+@app.get("/ready")
+async def get_ready():
+    """200 once the primary dataset and its indexes are loaded, 503 before"""
+    if dataset_warm_up is None or not dataset_warm_up.done():
+        return JSONResponse({"ready": False, "dataset": "loading"}, status_code=503)
+    error = dataset_warm_up.exception()
+    if error is not None:
+        return JSONResponse({"ready": False, "dataset": f"failed: {error}"}, status_code=503)
+    return {"ready": True, "dataset": "loaded", "llm": "gemini" if llm_client.model else "fallback"}
+
+@app.get("/history/search")
+async def search_history(q: str, limit: int = 20, offset: int = 0):
+    """Ranked full-text search over past messages and responses, a page at a time"""
+    results, next_offset = await asyncio.to_thread(history.search, q, limit, offset)
+    return {"query": q, "results": results, "next_offset": next_offset}
+
 @app.get("/", response_class=HTMLResponse)
 async def get_chat_page(request: Request):
     return templates.TemplateResponse("chat.html", {"request": request})
@@ -241,20 +161,31 @@ async def get_chat_page(request: Request):
 async def websocket_endpoint(websocket: WebSocket, session_id: str):
     await websocket.accept()
     
-    history = get_chat_history(session_id)
-    await websocket.send_text(json.dumps({
-        "type": "history",
-        "data": history
-    }))
+    # Only the latest exchanges; older ones are requested page by page
+    await websocket.send_text(await history_frame("history", session_id))
     
     try:
         while True:
             data = await websocket.receive_text()
             message_data = json.loads(data)
+            if message_data.get('type') == 'history_page':
+                await websocket.send_text(await history_frame("history_page", session_id, message_data.get('before')))
+                continue
             user_message = message_data.get('message', '')
             
             if user_message.strip():
-                response = await process_message(user_message)
+                if message_data.get('stream'):
+                    # Relay the reply as it is produced, then send the whole of it
+                    parts = []
+                    async for delta in stream_message(user_message):
+                        parts.append(delta)
+                        await websocket.send_text(json.dumps({
+                            "type": "delta",
+                            "data": {"text": delta}
+                        }))
+                    response = "".join(parts)
+                else:
+                    response = await process_message(user_message)
                 save_chat(session_id, user_message, response)
                 
                 await websocket.send_text(json.dumps({
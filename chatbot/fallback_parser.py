@@ -0,0 +1,58 @@
+"""Rule-based intent parser used when Gemini is unavailable
+
+Departments, roles and education levels are recognised by the dataset's
+``keywords`` index, so every value actually present in the data is
+understood, not just a hand-picked few. Age and salary ranges come from
+precompiled patterns run over the normalized message, where "50k" and
+"50,000" both read as 50000.
+"""
+
+import re
+from typing import Optional
+
+from chatbot.intent_cache import Intent, normalize_message
+
+_ABOVE = r"above|over|greater than|more than|at least|older than"
+_BELOW = r"below|under|less than|at most|younger than"
+_RANGE = re.compile(rf"\b(age|salary) (?:is |of )?({_ABOVE}|{_BELOW}) (\d+)\b")
+_BETWEEN = re.compile(r"\b(age|salary) (?:is |of )?between (\d+) and (\d+)\b")
+_IS_ABOVE = re.compile(rf"(?:{_ABOVE})$")
+_NAME_PATTERNS = ("find", "search", "who is", "show me")
+_NOT_NAMES = {"hello", "hi", "help", "what", "how"}
+
+
+def parse_message(message: str, keywords=None) -> Optional[Intent]:
+    """``(tool, arguments)`` for a message, None when nothing was recognised
+
+    ``keywords`` is the primary dataset's ``KeywordIndex``; without it only
+    ranges and name searches are recognised.
+    """
+    text = normalize_message(message)
+    words = text.split()
+    if "ping" in words:
+        return "ping", {}
+
+    filters = {}
+    for field, low, high in _BETWEEN.findall(text):
+        filters.setdefault(f"min_{field}", int(low))
+        filters.setdefault(f"max_{field}", int(high))
+    for field, comparison, number in _RANGE.findall(text):
+        bound = "min" if _IS_ABOVE.match(comparison) else "max"
+        filters.setdefault(f"{bound}_{field}", int(number))
+    if keywords is not None:
+        for column, value in keywords.find(text):
+            filters.setdefault(column, value)
+    if filters:
+        return "list_people", filters
+
+    message_lower = message.lower().strip()
+    for pattern in _NAME_PATTERNS:
+        if pattern in message_lower:
+            name = message_lower.replace(pattern, "").strip()
+            if name:
+                return "get_person_fuzzy", {"name": name}
+
+    # A short message without a greeting is most likely a name
+    if words and len(message_lower.split()) <= 3 and not _NOT_NAMES.intersection(words):
+        return "get_person_fuzzy", {"name": message}
+    return None
@@ -0,0 +1,462 @@
+"""Chat history storage in chat_history.db
+
+Writes never run on the event loop. ``save`` only queues the exchange.
+A writer thread commits everything queued so far in one transaction, so
+under load many exchanges share one commit. Reads use a separate
+persistent connection, which WAL mode lets proceed while a batch is being
+written.
+
+Sessions are read a page at a time, newest first, with a keyset cursor
+on ``(timestamp, id)``. Every page is one range scan of the session
+index, however long the session is.
+
+Messages and responses are indexed for full-text search by an external
+content FTS5 table. Triggers keep it in step with inserts and deletes.
+Archived exchanges keep their entries, and their hits are read back from
+the archive, until their month expires.
+
+Sessions that have gone quiet are moved to an attached archive database
+(``<name>_archive.db``). There they sit in one table per month, with
+zlib-compressed responses, and expire a whole month at a time. Archiving
+and vacuuming run as short jobs on the writer thread, between chat
+batches, so they never hold the write lock for long.
+"""
+
+import os
+import queue
+import re
+import sqlite3
+import threading
+import zlib
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+HISTORY_DB = "chat_history.db"
+# Most exchanges committed in one transaction
+BATCH_SIZE = 512
+# Exchanges sent when a chat page opens and per older page fetched
+PAGE_SIZE = 20
+# Archive partition tables, one per month: chat_YYYY_MM
+_PARTITION = re.compile(r"chat_(\d{4})_(\d{2})")
+
+_SCHEMA = (
+    '''
+    CREATE TABLE IF NOT EXISTS chat_sessions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        session_id TEXT,
+        message TEXT,
+        response TEXT,
+        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+    ''',
+    'CREATE INDEX IF NOT EXISTS idx_chat_sessions_session ON chat_sessions (session_id, timestamp)',
+)
+# Full-text index over chat_sessions; it stores only the index, not the text
+_SEARCH_SCHEMA = (
+    '''
+    CREATE VIRTUAL TABLE IF NOT EXISTS chat_search USING fts5(
+        message, response, content='chat_sessions', content_rowid='id', tokenize='porter unicode61'
+    )
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS chat_sessions_search_insert AFTER INSERT ON chat_sessions BEGIN
+        INSERT INTO chat_search (rowid, message, response) VALUES (new.id, new.message, new.response);
+    END
+    ''',
+    # Holds a row while exchanges move to the archive, so they stay searchable
+    'CREATE TABLE IF NOT EXISTS chat_archiving (active INTEGER)',
+    '''
+    CREATE TRIGGER IF NOT EXISTS chat_sessions_search_forget AFTER DELETE ON chat_sessions
+    WHEN NOT EXISTS (SELECT 1 FROM chat_archiving) BEGIN
+        INSERT INTO chat_search (chat_search, rowid, message, response)
+        VALUES ('delete', old.id, old.message, old.response);
+    END
+    ''',
+)
+# Trigger of older databases that dropped archived exchanges from search
+_OLD_DELETE_TRIGGER = 'chat_sessions_search_delete'
+_SEARCH_ENTRY = 'INSERT INTO chat_search (rowid, message, response) VALUES (?, ?, ?)'
+_FORGET_ENTRY = "INSERT INTO chat_search (chat_search, rowid, message, response) VALUES ('delete', ?, ?, ?)"
+# Words of context around the first hit in an archived exchange's snippet
+SNIPPET_WORDS = 16
+_WORD = re.compile(r"\w+")
+# Most search results returned per request
+MAX_SEARCH_RESULTS = 100
+_INSERT = 'INSERT INTO chat_sessions (session_id, message, response, timestamp) VALUES (?, ?, ?, ?)'
+
+
+def _timestamp(when: Optional[datetime] = None) -> str:
+    """UTC time (default now) in SQLite's CURRENT_TIMESTAMP format"""
+    return (when or datetime.now(timezone.utc)).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _partition(timestamp: str) -> str:
+    """Archive table holding exchanges from the month of ``timestamp``"""
+    return f"chat_{timestamp[:4]}_{timestamp[5:7]}"
+
+
+def _partitions(conn: sqlite3.Connection) -> List[str]:
+    rows = conn.execute("SELECT name FROM archive.sqlite_master WHERE type = 'table'").fetchall()
+    return sorted(row[0] for row in rows if _PARTITION.fullmatch(row[0]))
+
+
+def _archived_entries(conn: sqlite3.Connection, table: str):
+    """``(id, message, response)`` of an archive table's exchanges that are no longer live"""
+    rows = conn.execute(f'SELECT id, message, response FROM archive.{table} '
+                        'WHERE id NOT IN (SELECT id FROM main.chat_sessions)').fetchall()
+    for row_id, message, response in rows:
+        yield row_id, message, zlib.decompress(response).decode("utf-8")
+
+
+def _snippet(text: str, words: List[str]) -> str:
+    """FTS5-style snippet of ``text`` around the first of ``words``, hits in brackets
+
+    Stemming is approximated by matching each word's leading letters.
+    """
+    stems = tuple(word.casefold()[:max(3, len(word) - 2)] for word in words)
+    tokens = list(_WORD.finditer(text))
+    hits = {i for i, token in enumerate(tokens) if token.group().casefold().startswith(stems)}
+    start = max(0, min(min(hits) - SNIPPET_WORDS // 4, len(tokens) - SNIPPET_WORDS)) if hits else 0
+    window = tokens[start:start + SNIPPET_WORDS]
+    if not window:
+        return text
+    parts, position = [], window[0].start()
+    for i, token in enumerate(window, start):
+        parts.append(text[position:token.start()])
+        parts.append(f"[{token.group()}]" if i in hits else token.group())
+        position = token.end()
+    return ("..." if start else "") + "".join(parts) + ("..." if start + len(window) < len(tokens) else "")
+
+
+class _Job:
+    """Work run on the writer thread, in its own short transaction"""
+
+    def __init__(self, work):
+        self.work = work
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[Exception] = None
+
+    def run(self, conn: sqlite3.Connection):
+        try:
+            self.result = self.work(conn)
+        except sqlite3.Error as e:
+            self.error = e
+        finally:
+            self.done.set()
+
+
+def _cursor(timestamp: str, row_id: int) -> str:
+    return f"{timestamp}|{row_id}"
+
+
+def _parse_cursor(cursor: str) -> Tuple[str, int]:
+    """``(timestamp, id)`` of a cursor; ValueError when it is malformed"""
+    timestamp, _, row_id = str(cursor).rpartition("|")
+    if not timestamp:
+        raise ValueError(f"Invalid history cursor: {cursor!r}")
+    return timestamp, int(row_id)
+
+
+class ChatHistory:
+    """Chat exchanges per session, written in batches off the event loop"""
+
+    def __init__(self, path: str = HISTORY_DB):
+        self.path = path
+        self.archive_path = os.path.splitext(path)[0] + "_archive.db"
+        self.batches = 0
+        self.written = 0
+        writer = self._connect()
+        # Let freed pages be returned a few at a time; an older database is
+        # converted once, here, before anything is served
+        if writer.execute('PRAGMA auto_vacuum').fetchone()[0] != 2:
+            writer.execute('PRAGMA auto_vacuum=INCREMENTAL')
+            writer.execute('VACUUM')
+        indexed = writer.execute("SELECT 1 FROM sqlite_master WHERE name = 'chat_search'").fetchone()
+        forgetful = writer.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (_OLD_DELETE_TRIGGER,)).fetchone()
+        with writer:
+            writer.execute(f'DROP TRIGGER IF EXISTS {_OLD_DELETE_TRIGGER}')
+            for statement in _SCHEMA + _SEARCH_SCHEMA:
+                writer.execute(statement)
+            if not indexed:
+                # Index the exchanges stored before search existed
+                writer.execute("INSERT INTO chat_search (chat_search) VALUES ('rebuild')")
+            if not indexed or forgetful:
+                # Archived exchanges were never indexed, or lost their entries
+                for table in _partitions(writer):
+                    writer.executemany(_SEARCH_ENTRY, _archived_entries(writer, table))
+        self._reader = self._connect()
+        self._read_lock = threading.Lock()
+        self._queue: "queue.Queue" = queue.Queue()
+        self._writer = threading.Thread(target=self._write_loop, args=(writer,),
+                                        name="chat-history-writer", daemon=True)
+        self._writer.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute('ATTACH DATABASE ? AS archive', (self.archive_path,))
+        for schema in ('main', 'archive'):
+            conn.execute(f'PRAGMA {schema}.auto_vacuum=INCREMENTAL')
+            conn.execute(f'PRAGMA {schema}.journal_mode=WAL')
+            # WAL keeps the database consistent without a sync on every commit
+            conn.execute(f'PRAGMA {schema}.synchronous=NORMAL')
+        return conn
+
+    def save(self, session_id: str, message: str, response: str):
+        """Queue one exchange; returns without touching the database"""
+        self._queue.put((session_id, message, response, _timestamp()))
+
+    def flush(self):
+        """Wait until everything queued so far is committed"""
+        if not self._writer.is_alive():
+            return
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait()
+
+    def session(self, session_id: str) -> List[Dict]:
+        """Every exchange of a session, oldest first, including queued ones"""
+        self.flush()
+        with self._read_lock:
+            rows = self._reader.execute(
+                'SELECT message, response, timestamp FROM chat_sessions '
+                'WHERE session_id = ? ORDER BY timestamp, id',
+                (session_id,)
+            ).fetchall()
+        return [{'message': row[0], 'response': row[1], 'timestamp': row[2]} for row in rows]
+
+    def page(self, session_id: str, before: Optional[str] = None,
+             limit: int = PAGE_SIZE) -> Tuple[List[Dict], Optional[str]]:
+        """Up to ``limit`` exchanges older than ``before``, oldest first
+
+        Without ``before`` the most recent ones are returned. The cursor
+        that comes back fetches the page before this one; it is None once
+        the start of the session is reached. When the live exchanges run
+        out, paging carries on through the archive, newest month first.
+        """
+        condition = 'session_id = ?'
+        params: list = [session_id]
+        if before is not None:
+            condition += ' AND (timestamp, id) < (?, ?)'
+            params.extend(_parse_cursor(before))
+        order = ' ORDER BY timestamp DESC, id DESC LIMIT ?'
+        params.append(limit + 1)
+
+        if before is None:
+            self.flush()
+        with self._read_lock:
+            rows = self._reader.execute(
+                f'SELECT id, message, response, timestamp FROM chat_sessions WHERE {condition}{order}', params
+            ).fetchall()
+        # Months are disjoint, so older partitions only matter while the page is short
+        for table in reversed(self.partitions()) if len(rows) <= limit else ():
+            with self._read_lock:
+                archived = self._reader.execute(
+                    f'SELECT id, message, response, timestamp FROM archive.{table} WHERE {condition}{order}', params
+                ).fetchall()
+            rows.extend((row_id, message, zlib.decompress(response).decode("utf-8"), timestamp)
+                        for row_id, message, response, timestamp in archived)
+            if len(rows) > limit:
+                break
+        rows.sort(key=lambda row: (row[3], row[0]), reverse=True)
+        more = len(rows) > limit
+        rows = rows[:limit][::-1]
+        cursor = _cursor(rows[0][3], rows[0][0]) if more else None
+        return [{'message': row[1], 'response': row[2], 'timestamp': row[3]} for row in rows], cursor
+
+    def search(self, query: str, limit: int = 20, offset: int = 0) -> Tuple[List[Dict], Optional[int]]:
+        """Exchanges matching every word of ``query``, best match first
+
+        Words are matched after stemming, so "managers" finds "manager".
+        Archived exchanges are found too, until their month expires.
+        Returns the page of results and the offset of the next page, None
+        on the last one.
+        """
+        words = _WORD.findall(query)
+        if not words:
+            return [], None
+        limit = max(1, min(limit, MAX_SEARCH_RESULTS))
+        # Quoted, so words like AND or NEAR are not read as FTS5 operators
+        match = " ".join(f'"{word}"' for word in words)
+        with self._read_lock:
+            # snippet() needs the live row; archived hits are filled in below
+            rows = self._reader.execute(
+                "SELECT chat_search.rowid, c.session_id, c.message, "
+                f"CASE WHEN c.id IS NOT NULL THEN snippet(chat_search, 1, '[', ']', '...', {SNIPPET_WORDS}) END, "
+                "c.timestamp, bm25(chat_search) "
+                "FROM chat_search LEFT JOIN chat_sessions c ON c.id = chat_search.rowid "
+                "WHERE chat_search MATCH ? ORDER BY rank LIMIT ? OFFSET ?",
+                (match, limit + 1, max(0, offset))
+            ).fetchall()
+        archived = self._archived_exchanges([row[0] for row in rows[:limit] if row[1] is None])
+        results = []
+        for row_id, session_id, message, response, timestamp, score in rows[:limit]:
+            if session_id is None:
+                if row_id not in archived:
+                    continue
+                session_id, message, response, timestamp = archived[row_id]
+                response = _snippet(response, words)
+            results.append({'session_id': session_id, 'message': message, 'response': response,
+                            'timestamp': timestamp, 'score': round(-score, 4)})
+        return results, (max(0, offset) + limit if len(rows) > limit else None)
+
+    def _archived_exchanges(self, row_ids: List[int]) -> Dict[int, Tuple[str, str, str, str]]:
+        """``id -> (session_id, message, response, timestamp)`` of archived exchanges"""
+        found: Dict[int, Tuple[str, str, str, str]] = {}
+        if not row_ids:
+            return found
+        marks = ", ".join("?" * len(row_ids))
+        for table in self.partitions():
+            with self._read_lock:
+                rows = self._reader.execute(
+                    f'SELECT id, session_id, message, response, timestamp FROM archive.{table} '
+                    f'WHERE id IN ({marks})',
+                    row_ids
+                ).fetchall()
+            for row_id, session_id, message, response, timestamp in rows:
+                found[row_id] = (session_id, message, zlib.decompress(response).decode("utf-8"), timestamp)
+        return found
+
+    def run_job(self, work):
+        """Run ``work(conn)`` on the writer thread between batches and return its result"""
+        if not self._writer.is_alive():
+            raise RuntimeError("Chat history is closed")
+        job = _Job(work)
+        self._queue.put(job)
+        job.done.wait()
+        if job.error is not None:
+            raise job.error
+        return job.result
+
+    def stale_sessions(self, cutoff: datetime) -> List[str]:
+        """Sessions with no exchange since ``cutoff``"""
+        with self._read_lock:
+            rows = self._reader.execute(
+                'SELECT session_id FROM chat_sessions GROUP BY session_id HAVING max(timestamp) < ?',
+                (_timestamp(cutoff),)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def archive_sessions(self, session_ids: List[str], cutoff: datetime) -> int:
+        """Move sessions still quiet since ``cutoff`` to the archive; returns rows moved"""
+        cutoff = _timestamp(cutoff)
+
+        def archive(conn: sqlite3.Connection) -> int:
+            marks = ", ".join("?" * len(session_ids))
+            with conn:
+                # Re-checked inside the transaction: a session may have resumed
+                rows = conn.execute(
+                    f'SELECT id, session_id, message, response, timestamp FROM chat_sessions '
+                    f'WHERE session_id IN (SELECT session_id FROM chat_sessions WHERE session_id IN ({marks}) '
+                    f'GROUP BY session_id HAVING max(timestamp) < ?)',
+                    (*session_ids, cutoff)
+                ).fetchall()
+                months = defaultdict(list)
+                for row_id, session_id, message, response, timestamp in rows:
+                    months[_partition(timestamp)].append(
+                        (row_id, session_id, message, zlib.compress((response or "").encode("utf-8")), timestamp))
+                for table, archived in months.items():
+                    conn.execute(f'CREATE TABLE IF NOT EXISTS archive.{table} ('
+                                 'id INTEGER PRIMARY KEY, session_id TEXT, message TEXT, '
+                                 'response BLOB, timestamp DATETIME)')
+                    conn.execute(f'CREATE INDEX IF NOT EXISTS archive.idx_{table}_session '
+                                 f'ON {table} (session_id, timestamp)')
+                    # OR REPLACE: the archive and live databases commit separately
+                    conn.executemany(f'INSERT OR REPLACE INTO archive.{table} VALUES (?, ?, ?, ?, ?)', archived)
+                # Their search entries stay, pointing at the archive from now on
+                conn.execute('INSERT INTO chat_archiving VALUES (1)')
+                conn.executemany('DELETE FROM chat_sessions WHERE id = ?', [(row[0],) for row in rows])
+                conn.execute('DELETE FROM chat_archiving')
+            return len(rows)
+
+        return self.run_job(archive) if session_ids else 0
+
+    def partitions(self) -> List[str]:
+        """Archive tables, oldest month first"""
+        with self._read_lock:
+            return _partitions(self._reader)
+
+    def drop_partitions(self, before: datetime) -> List[str]:
+        """Drop the archived months that ended before ``before``"""
+        expired = [table for table in self.partitions() if table < _partition(_timestamp(before))]
+
+        def drop(conn: sqlite3.Connection):
+            for table in expired:
+                with conn:
+                    if table in _partitions(conn):
+                        conn.executemany(_FORGET_ENTRY, _archived_entries(conn, table))
+                    conn.execute(f'DROP TABLE IF EXISTS archive.{table}')
+
+        if expired:
+            self.run_job(drop)
+        return expired
+
+    def vacuum_step(self, pages: int) -> int:
+        """Return up to ``pages`` free pages per database to the OS; returns pages still free"""
+        def vacuum(conn: sqlite3.Connection) -> int:
+            remaining = 0
+            for schema in ('main', 'archive'):
+                # execute() would step the pragma once, freeing a single page
+                conn.executescript(f'PRAGMA {schema}.incremental_vacuum({int(pages)});')
+                remaining += conn.execute(f'PRAGMA {schema}.freelist_count').fetchone()[0]
+            return remaining
+
+        return self.run_job(vacuum)
+
+    def archived_session(self, session_id: str) -> List[Dict]:
+        """Every archived exchange of a session, oldest first"""
+        exchanges = []
+        for table in self.partitions():
+            with self._read_lock:
+                rows = self._reader.execute(
+                    f'SELECT message, response, timestamp FROM archive.{table} '
+                    'WHERE session_id = ? ORDER BY timestamp, id',
+                    (session_id,)
+                ).fetchall()
+            exchanges.extend({'message': row[0], 'response': zlib.decompress(row[1]).decode("utf-8"),
+                              'timestamp': row[2]} for row in rows)
+        return exchanges
+
+    def close(self):
+        """Commit what is queued, stop the writer and close the connections"""
+        if self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join()
+        with self._read_lock:
+            self._reader.close()
+
+    def _write_loop(self, conn: sqlite3.Connection):
+        stopping = False
+        while not stopping:
+            rows, waiters, job = [], [], None
+            item = self._queue.get()
+            # Take whatever else piled up while the last batch was committed
+            while True:
+                if item is None:
+                    stopping = True
+                elif isinstance(item, threading.Event):
+                    waiters.append(item)
+                elif isinstance(item, _Job):
+                    job = item
+                else:
+                    rows.append(item)
+                if stopping or job is not None or len(rows) >= BATCH_SIZE:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            if rows:
+                try:
+                    with conn:
+                        conn.executemany(_INSERT, rows)
+                    self.batches += 1
+                    self.written += len(rows)
+                except sqlite3.Error as e:
+                    print(f"Chat history write failed, {len(rows)} exchange(s) lost: {e}")
+            if job is not None:
+                job.run(conn)
+            for waiter in waiters:
+                waiter.set()
+        conn.close()
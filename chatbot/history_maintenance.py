@@ -0,0 +1,75 @@
+"""Background retention and compaction for the chat history
+
+Every ``CHAT_HISTORY_MAINTENANCE_INTERVAL`` seconds the maintainer:
+
+- archives sessions with no exchange for ``CHAT_HISTORY_ARCHIVE_DAYS``;
+- drops archived months older than ``CHAT_HISTORY_RETENTION_DAYS``
+  (0 keeps them forever);
+- hands the freed pages back with incremental vacuum steps.
+
+Each step is a separate short job on the history writer thread, so chat
+writes queued in between are committed without waiting for the whole run.
+"""
+
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+
+from chatbot.history import ChatHistory
+
+ARCHIVE_AFTER_DAYS = float(os.getenv("CHAT_HISTORY_ARCHIVE_DAYS", "30"))
+RETENTION_DAYS = float(os.getenv("CHAT_HISTORY_RETENTION_DAYS", "365"))
+MAINTENANCE_INTERVAL = float(os.getenv("CHAT_HISTORY_MAINTENANCE_INTERVAL", "3600"))
+# Sessions moved per archive transaction
+ARCHIVE_SESSIONS = 50
+# Pages released per incremental vacuum step (4 KiB each by default)
+VACUUM_PAGES = 256
+
+
+class HistoryMaintenance(threading.Thread):
+    """Periodic archive, expiry and vacuum of one ChatHistory"""
+
+    def __init__(self, history: ChatHistory, interval: float = MAINTENANCE_INTERVAL,
+                 archive_after_days: float = ARCHIVE_AFTER_DAYS, retention_days: float = RETENTION_DAYS):
+        super().__init__(name="chat-history-maintenance", daemon=True)
+        self.history = history
+        self.interval = interval
+        self.archive_after = timedelta(days=archive_after_days)
+        self.retention = timedelta(days=retention_days) if retention_days > 0 else None
+        self.last_run: Optional[Dict[str, int]] = None
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"Chat history maintenance failed: {e}")
+
+    def stop(self):
+        self._stop_event.set()
+
+    def run_once(self, now: Optional[datetime] = None) -> Dict[str, int]:
+        """One full pass; returns what it did"""
+        now = now or datetime.now(timezone.utc)
+        cutoff = now - self.archive_after
+        sessions = self.history.stale_sessions(cutoff)
+        archived = 0
+        for start in range(0, len(sessions), ARCHIVE_SESSIONS):
+            if self._stop_event.is_set():
+                break
+            archived += self.history.archive_sessions(sessions[start:start + ARCHIVE_SESSIONS], cutoff)
+
+        expired = self.history.drop_partitions(now - self.retention) if self.retention else []
+
+        free = self.history.vacuum_step(VACUUM_PAGES)
+        while free and not self._stop_event.is_set():
+            remaining = self.history.vacuum_step(VACUUM_PAGES)
+            if remaining >= free:
+                break
+            free = remaining
+
+        self.last_run = {"stale_sessions": len(sessions), "rows_archived": archived,
+                         "partitions_dropped": len(expired), "free_pages": free}
+        return self.last_run
@@ -0,0 +1,86 @@
+"""LRU + TTL cache of classified chat intents
+
+Repeated questions ("managers", "employees in sales", "age above 40") map
+to the same tool call. The cache keys on a normalized form of the message
+so trivially different spellings share an entry and skip the Gemini
+classification request.
+"""
+
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+# Numbers with thousands separators, decimals and k/m suffixes, or plain words
+_TOKEN = re.compile(r"\d[\d,]*(?:\.\d+)?[km]?(?![\w])|\w+")
+_SCALE = {"k": 1000, "m": 1000000}
+
+Intent = Tuple[str, Dict[str, Any]]
+
+
+def _number(token: str) -> str:
+    scale = _SCALE.get(token[-1], 1)
+    digits = token.rstrip("km").replace(",", "")
+    try:
+        value = float(digits) * scale
+    except ValueError:
+        return token
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def normalize_message(message: str) -> str:
+    """Case-, spacing- and punctuation-insensitive form with canonical numbers"""
+    text = unicodedata.normalize("NFKC", message).casefold()
+    return " ".join(_number(token) if token[0].isdigit() else token for token in _TOKEN.findall(text))
+
+
+class IntentCache:
+    """Thread-safe LRU of ``key -> (tool, arguments)`` with a time-to-live"""
+
+    def __init__(self, max_size: int = 1024, ttl: float = 3600.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, Tuple[float, Intent]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Intent]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < time.monotonic():
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            tool, arguments = entry[1]
+            return tool, dict(arguments)
+
+    def put(self, key: Hashable, intent: Intent):
+        if self.max_size <= 0:
+            return
+        tool, arguments = intent
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, (tool, dict(arguments)))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
@@ -1,86 +1,36 @@
-"""LLM Client with MCP Tool Integration using Gemini"""
+"""LLM Client with MCP Tool Integration using Gemini
+
+The Gemini SDK is imported only when an API key is configured, so the
+fallback-only setup starts without it.
+"""
 
 import json
 import asyncio
-import google.generativeai as genai
+import hashlib
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Any
 
-class LLMClient:
-    def __init__(self, api_key: str = None):
-        # Use free/demo mode if no API key
-        self.api_key = api_key
-        if api_key:
-            genai.configure(api_key=api_key)
-            self.model = genai.GenerativeModel('gemini-pro')
-        else:
-            self.model = None
-        
-        self.tools = [
-            {
-                "type": "function",
-                "function": {
-                    "name": "ping",
-                    "description": "Health check - returns pong with timestamp",
-                    "parameters": {"type": "object", "properties": {}}
-                }
-            },
-            {
-                "type": "function", 
-                "function": {
-                    "name": "get_person_exact",
-                    "description": "Find people with exact name match",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "name": {"type": "string", "description": "Name to search for"}
-                        },
-                        "required": ["name"]
-                    }
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "get_person_fuzzy", 
-                    "description": "Find people with fuzzy/typo-tolerant name search",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "name": {"type": "string", "description": "Name to search for"},
-                            "maxResults": {"type": "integer", "description": "Max results", "default": 3}
-                        },
-                        "required": ["name"]
-                    }
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "list_people",
-                    "description": "List people filtered by department, role, location",
-                    "parameters": {
-                        "type": "object", 
-                        "properties": {
-                            "department": {"type": "string", "description": "Filter by department"},
-                            "role": {"type": "string", "description": "Filter by role"},
-                            "location": {"type": "string", "description": "Filter by location"},
-                            "limit": {"type": "integer", "description": "Max results", "default": 20}
-                        }
-                    }
-                }
-            }
-        ]
-    
-    async def process_message(self, message: str, mcp_client) -> str:
-        """Process message with LLM and handle tool calls"""
-        
-        if not self.model:
-            # Fallback to simple pattern matching if no API key
-            return await self._fallback_processing(message, mcp_client)
-        
-        try:
-            # Analyze message with Gemini to determine intent
-            prompt = f"""You are a helpful assistant that can search for people in a company directory.
+from chatbot.fallback_parser import parse_message
+from chatbot.intent_cache import IntentCache, normalize_message
+from chatbot.token_budget import TokenTelemetry, compact_result, estimate_tokens, usage_tokens
+from people_server.tools import TOOLS, get_registry
+
+# Gemini requests in flight at once; further ones queue without blocking the event loop
+LLM_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "4"))
+# Seconds to wait for one Gemini reply before using the pattern-matching fallback
+LLM_TIMEOUT = float(os.getenv("GEMINI_TIMEOUT", "30"))
+# "functions": Gemini picks a tool through native function calling in one request;
+# "classify": the older intent-text protocol with a second formatting request
+LLM_MODE = os.getenv("GEMINI_MODE", "functions")
+# Have Gemini rephrase tool results conversationally, at the cost of a second request
+LLM_SUMMARIZE = os.getenv("GEMINI_SUMMARIZE", "0") == "1"
+# Classified intents remembered per normalized message (0 disables the cache)
+INTENT_CACHE_SIZE = int(os.getenv("GEMINI_INTENT_CACHE_SIZE", "1024"))
+INTENT_CACHE_TTL = float(os.getenv("GEMINI_INTENT_CACHE_TTL", "3600"))
+
+CLASSIFY_PROMPT = """You are a helpful assistant that can search for people in a company directory.
             
 Analyze this user message and determine what they want:
             Message: "{message}"
@@ -107,132 +57,346 @@ Analyze this user message and determine what they want:
             - "young employees" -> LIST_PEOPLE: max_age=30
             - "senior employees" -> LIST_PEOPLE: min_age=40
             """
+
+FUNCTION_PROMPT = """You are a helpful assistant that can search for people in a company directory.
+Use the tools to answer questions about people. Numbers such as ages and salaries are
+filters for list_people, not names. Answer other messages directly.
+
+User message: """
+
+# Schema keywords Gemini's function declarations understand
+_SCHEMA_KEYS = ("type", "description", "enum", "items")
+
+def function_declarations() -> List[Dict[str, Any]]:
+    """Gemini function declarations built from the shared tool registry"""
+    declarations = []
+    for tool in TOOLS.values():
+        declaration = {"name": tool.name, "description": tool.description}
+        properties = tool.input_schema["properties"]
+        if properties:
+            declaration["parameters"] = {
+                "type": "object",
+                "properties": {
+                    name: {key: value for key, value in spec.items() if key in _SCHEMA_KEYS}
+                    for name, spec in properties.items()
+                },
+                "required": tool.input_schema["required"],
+            }
+        declarations.append(declaration)
+    return declarations
+
+class LLMClient:
+    def __init__(self, api_key: str = None):
+        # Use free/demo mode if no API key
+        self.api_key = api_key
+        self._executor = None
+        if api_key:
+            import google.generativeai as genai
+            genai.configure(api_key=api_key)
+            # One model (and so one pooled client connection) for every request
+            self.model = genai.GenerativeModel('gemini-pro')
+        else:
+            self.model = None
+        
+        # Gemini function declarations for the shared MCP tools
+        self.tools = [{"function_declarations": function_declarations()}]
+        self.intents = IntentCache(INTENT_CACHE_SIZE, INTENT_CACHE_TTL)
+        self._fingerprints = {}
+        # Tokens and latency of every Gemini request, per query shape
+        self.telemetry = TokenTelemetry()
+    
+    def _pool(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=LLM_CONCURRENCY, thread_name_prefix="gemini")
+        return self._executor
+    
+    async def _run(self, request):
+        """Run a blocking Gemini request on the bounded worker pool
+        
+        The SDK call is synchronous, so it runs on a worker thread while the
+        event loop keeps serving other sessions.
+        """
+        loop = asyncio.get_running_loop()
+        return await asyncio.wait_for(loop.run_in_executor(self._pool(), request), LLM_TIMEOUT)
+    
+    def _record(self, shape: str, prompt: str, response, output: str, start: float, compacted: bool = False):
+        """Account one Gemini request, preferring the token counts it reports"""
+        usage = usage_tokens(response) or {"input": estimate_tokens(prompt), "output": estimate_tokens(output)}
+        self.telemetry.record(shape, usage["input"], usage["output"],
+                              (time.perf_counter() - start) * 1000, compacted)
+    
+    async def _request(self, shape: str, prompt: str, request, compacted: bool = False):
+        """Run one Gemini request on the pool and record its tokens and latency"""
+        start = time.perf_counter()
+        response = await self._run(request)
+        self._record(shape, prompt, response, self._chunk_text(response), start, compacted)
+        return response
+    
+    async def _stream(self, request, shape: str, prompt: str, compacted: bool = False):
+        """Yield the chunks of a streaming Gemini request as they arrive
+        
+        A worker thread from the same pool iterates the blocking stream and
+        hands each chunk to the event loop. LLM_TIMEOUT bounds the wait for
+        each chunk rather than the whole reply. The request is accounted
+        once the stream ends or the caller stops reading.
+        """
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        finished = object()
+        stopped = False
+        
+        def pump():
+            def put(item):
+                if not stopped:
+                    loop.call_soon_threadsafe(queue.put_nowait, item)
+            try:
+                for chunk in request():
+                    if stopped:
+                        break
+                    put(chunk)
+                put(finished)
+            except Exception as e:
+                put(e)
+        
+        start = time.perf_counter()
+        last, output = None, []
+        loop.run_in_executor(self._pool(), pump)
+        try:
+            while True:
+                item = await asyncio.wait_for(queue.get(), LLM_TIMEOUT)
+                if item is finished:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                last = item
+                output.append(self._chunk_text(item))
+                yield item
+        finally:
+            stopped = True
+            self._record(shape, prompt, last, "".join(output), start, compacted)
+    
+    async def _generate(self, prompt: str, shape: str, compacted: bool = False) -> str:
+        """Text of one plain Gemini request"""
+        response = await self._request(shape, prompt, lambda: self.model.generate_content(prompt), compacted)
+        return response.text
+    
+    def _intent_key(self, message: str):
+        """Cache key for a message's intent under the current model and prompts
+        
+        Switching the mode, model, prompts or tool schemas changes the key,
+        so intents classified under the old setup are not reused.
+        """
+        model_name = getattr(self.model, "model_name", type(self.model).__name__)
+        fingerprint = self._fingerprints.get((LLM_MODE, model_name))
+        if fingerprint is None:
+            source = json.dumps([LLM_MODE, model_name, CLASSIFY_PROMPT, FUNCTION_PROMPT, self.tools],
+                                sort_keys=True, default=str)
+            fingerprint = self._fingerprints[(LLM_MODE, model_name)] = hashlib.sha1(source.encode()).hexdigest()
+        return fingerprint, normalize_message(message)
+    
+    @staticmethod
+    def _function_call(response):
+        """The first function call Gemini asked for, None for a text answer"""
+        for part in response.candidates[0].content.parts:
+            if part.function_call.name:
+                return part.function_call
+        return None
+    
+    @staticmethod
+    def _chunk_text(response) -> str:
+        """Text parts of a (possibly partial) response, skipping function calls"""
+        if response is None or not response.candidates:
+            return ""
+        return "".join(part.text for part in response.candidates[0].content.parts
+                       if not part.function_call.name and part.text)
+    
+    async def _summary_request(self, contents, intent, mcp_client):
+        """Follow-up contents with the tool's result compacted to the prompt budget
+        
+        Returns the contents, the prompt text they stand for and whether the
+        result had to be compacted.
+        """
+        result = await mcp_client.call_tool_result(*intent)
+        prompt_result = compact_result(result)
+        prompt = contents[0]["parts"][0] + prompt_result
+        return self._with_result(contents, intent, prompt_result), prompt, prompt_result != result.text
+    
+    @staticmethod
+    def _with_result(contents, intent, result: str):
+        """Conversation extended with the function call and the tool's answer"""
+        import google.generativeai as genai
+        tool, arguments = intent
+        return contents + [
+            genai.protos.Content(role="model", parts=[genai.protos.Part(
+                function_call=genai.protos.FunctionCall(name=tool, args=arguments))]),
+            {"role": "user", "parts": [genai.protos.Part(function_response=genai.protos.FunctionResponse(
+                name=tool, response={"result": result}))]},
+        ]
+    
+    async def stream_message(self, message: str, mcp_client):
+        """Yield the reply to a message in pieces, as soon as each is available
+        
+        Direct answers and summaries are relayed chunk by chunk from Gemini;
+        tool results arrive in one piece. Without function calling the whole
+        reply is yielded once.
+        """
+        if not self.model or LLM_MODE != "functions":
+            yield await self.process_message(message, mcp_client)
+            return
+        
+        streamed = False
+        try:
+            contents = [{"role": "user", "parts": [FUNCTION_PROMPT + message]}]
+            key = self._intent_key(message)
+            intent = self.intents.get(key)
+            if intent is None:
+                call = None
+                async for chunk in self._stream(lambda: self.model.generate_content(contents, tools=self.tools, stream=True),
+                                                "select", contents[0]["parts"][0]):
+                    call = self._function_call(chunk)
+                    if call is not None:
+                        break
+                    text = self._chunk_text(chunk)
+                    if text:
+                        streamed = True
+                        yield text
+                if call is None:
+                    return
+                intent = (call.name, dict(call.args))
+                self.intents.put(key, intent)
             
-            response = self.model.generate_content(prompt)
-            intent = response.text.strip()
+            if not LLM_SUMMARIZE:
+                streamed = True
+                yield await mcp_client.call_tool(*intent)
+                return
+            follow_up, prompt, compacted = await self._summary_request(contents, intent, mcp_client)
+            async for chunk in self._stream(lambda: self.model.generate_content(follow_up, tools=self.tools, stream=True),
+                                            self.telemetry.shape("summarize", *intent), prompt, compacted):
+                text = self._chunk_text(chunk)
+                if text:
+                    streamed = True
+                    yield text
+        except Exception as e:
+            print(f"Gemini Error: {e}")
+            # Once text has gone out, a fallback answer would be appended to it
+            if not streamed:
+                yield await self._fallback_processing(message, mcp_client)
+    
+    async def _process_with_functions(self, message: str, mcp_client) -> str:
+        """Let Gemini pick the tool and its arguments natively, then run it
+        
+        One Gemini request per message, none when the intent is cached; a
+        second one only when results should be rephrased (GEMINI_SUMMARIZE=1).
+        """
+        contents = [{"role": "user", "parts": [FUNCTION_PROMPT + message]}]
+        key = self._intent_key(message)
+        intent = self.intents.get(key)
+        if intent is None:
+            response = await self._request("select", contents[0]["parts"][0],
+                                           lambda: self.model.generate_content(contents, tools=self.tools))
+            call = self._function_call(response)
+            if call is None:
+                return response.text
+            intent = (call.name, dict(call.args))
+            self.intents.put(key, intent)
+        
+        if not LLM_SUMMARIZE:
+            return await mcp_client.call_tool(*intent)
+        
+        follow_up, prompt, compacted = await self._summary_request(contents, intent, mcp_client)
+        response = await self._request(self.telemetry.shape("summarize", *intent), prompt,
+                                       lambda: self.model.generate_content(follow_up, tools=self.tools), compacted)
+        return response.text
+    
+    def close(self):
+        """Release the Gemini worker threads"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+    
+    async def process_message(self, message: str, mcp_client) -> str:
+        """Process message with LLM and handle tool calls"""
+        
+        if not self.model:
+            # Fallback to simple pattern matching if no API key
+            return await self._fallback_processing(message, mcp_client)
+        
+        if LLM_MODE == "functions":
+            try:
+                return await self._process_with_functions(message, mcp_client)
+            except Exception as e:
+                print(f"Gemini Error: {e}")
+                return await self._fallback_processing(message, mcp_client)
+        
+        try:
+            key = self._intent_key(message)
+            intent = self.intents.get(key)
+            if intent is None:
+                # Analyze message with Gemini to determine intent
+                reply = (await self._generate(CLASSIFY_PROMPT.format(message=message), "classify")).strip()
+                intent = self._parse_intent(reply)
+                if intent is None:
+                    return reply.replace('CHAT:', '', 1).strip() if reply.startswith('CHAT:') else reply
+                self.intents.put(key, intent)
             
-            # Process based on intent
-            if intent.startswith('SEARCH_PERSON:'):
-                name = intent.replace('SEARCH_PERSON:', '').strip()
-                result = await mcp_client.call_tool('get_person_fuzzy', {'name': name})
-                
-                # Format response with Gemini
+            tool, arguments = intent
+            if tool == 'ping':
+                return await mcp_client.call_tool(tool, arguments)
+            
+            # Format response with Gemini, on a result that fits the prompt budget
+            tool_result = await mcp_client.call_tool_result(tool, arguments)
+            result = compact_result(tool_result)
+            if tool == 'get_person_fuzzy':
                 format_prompt = f"""Format this search result in a conversational way:
-                User asked about: {name}
+                User asked about: {arguments['name']}
                 Search result: {result}
                 
                 Make it sound natural and helpful."""
-                
-                formatted = self.model.generate_content(format_prompt)
-                return formatted.text
-                
-            elif intent.startswith('LIST_PEOPLE:'):
-                filters_str = intent.replace('LIST_PEOPLE:', '').strip()
-                filters = {}
-                
-                # Parse various filter types
-                if 'role=' in filters_str:
-                    role = filters_str.split('role=')[1].split(',')[0].strip()
-                    filters['role'] = role
-                if 'department=' in filters_str:
-                    dept = filters_str.split('department=')[1].split(',')[0].strip()
-                    filters['department'] = dept
-                if 'min_salary=' in filters_str:
-                    min_sal = filters_str.split('min_salary=')[1].split(',')[0].strip()
-                    filters['min_salary'] = min_sal
-                if 'max_salary=' in filters_str:
-                    max_sal = filters_str.split('max_salary=')[1].split(',')[0].strip()
-                    filters['max_salary'] = max_sal
-                if 'min_age=' in filters_str:
-                    min_age = filters_str.split('min_age=')[1].split(',')[0].strip()
-                    filters['min_age'] = min_age
-                if 'max_age=' in filters_str:
-                    max_age = filters_str.split('max_age=')[1].split(',')[0].strip()
-                    filters['max_age'] = max_age
-                if 'education=' in filters_str:
-                    edu = filters_str.split('education=')[1].split(',')[0].strip()
-                    filters['education'] = edu
-                
-                result = await mcp_client.call_tool('list_people', filters)
-                
-                # Format response with Gemini
+            else:
                 format_prompt = f"""Format this list result in a conversational way:
                 User requested: {message}
                 List result: {result}
                 
                 Make it sound natural and helpful."""
-                
-                formatted = self.model.generate_content(format_prompt)
-                return formatted.text
-                
-            elif intent.startswith('PING'):
-                result = await mcp_client.call_tool('ping')
-                return result
-                
-            elif intent.startswith('CHAT:'):
-                return intent.replace('CHAT:', '').strip()
-                
-            else:
-                return intent
+            
+            return await self._generate(format_prompt, self.telemetry.shape("format", tool, arguments),
+                                        result != tool_result.text)
                 
         except Exception as e:
             print(f"Gemini Error: {e}")
             return await self._fallback_processing(message, mcp_client)
     
+    @staticmethod
+    def _parse_intent(reply: str):
+        """(tool, arguments) for a classification reply, None for chat"""
+        if reply.startswith('SEARCH_PERSON:'):
+            return 'get_person_fuzzy', {'name': reply.replace('SEARCH_PERSON:', '').strip()}
+        
+        if reply.startswith('LIST_PEOPLE:'):
+            filters_str = reply.replace('LIST_PEOPLE:', '').strip()
+            filters = {}
+            for field in ('role', 'department', 'min_salary', 'max_salary', 'min_age', 'max_age', 'education'):
+                if f'{field}=' in filters_str:
+                    filters[field] = filters_str.split(f'{field}=')[1].split(',')[0].strip()
+            return 'list_people', filters
+        
+        if reply.startswith('PING'):
+            return 'ping', {}
+        return None
+    
     async def _fallback_processing(self, message: str, mcp_client) -> str:
-        """Simple pattern matching for natural language"""
-        message_lower = message.lower().strip()
-        
-        if 'ping' in message_lower:
-            return await mcp_client.call_tool('ping')
-        
-        import re
-        filters = {}
-        
-        # Age patterns
-        age_above = re.search(r'age (?:above|over|greater than) (\d+)', message_lower)
-        age_below = re.search(r'age (?:below|under|less than) (\d+)', message_lower)
-        if age_above:
-            filters['min_age'] = age_above.group(1)
-        elif age_below:
-            filters['max_age'] = age_below.group(1)
-        
-        # Salary patterns
-        sal_above = re.search(r'salary (?:above|over|greater than) (\d+)', message_lower)
-        sal_below = re.search(r'salary (?:below|under|less than) (\d+)', message_lower)
-        if sal_above:
-            filters['min_salary'] = sal_above.group(1)
-        elif sal_below:
-            filters['max_salary'] = sal_below.group(1)
-        
-        # Department/Role patterns
-        if 'engineering' in message_lower:
-            filters['department'] = 'Engineering'
-        elif 'sales' in message_lower:
-            filters['department'] = 'Sales'
-        elif 'hr' in message_lower:
-            filters['department'] = 'HR'
-        
-        if 'manager' in message_lower:
-            filters['role'] = 'Manager'
-        elif 'developer' in message_lower:
-            filters['role'] = 'Developer'
-        
-        # If we found any filters, use list_people
-        if filters:
-            return await mcp_client.call_tool('list_people', filters)
-        
-        # Name search patterns
-        name_patterns = ['find', 'search', 'who is', 'show me']
-        for pattern in name_patterns:
-            if pattern in message_lower:
-                name = message_lower.replace(pattern, '').strip()
-                if name:
-                    return await mcp_client.call_tool('get_person_fuzzy', {'name': name})
-        
-        # Simple name search (if no special keywords)
-        words = message_lower.split()
-        if len(words) <= 3 and not any(w in ['hello', 'hi', 'help', 'what', 'how'] for w in words):
-            return await mcp_client.call_tool('get_person_fuzzy', {'name': message})
-        
-        return "Try: 'find john', 'age above 30', 'salary below 50000', 'engineering managers'"
\ No newline at end of file
+        """Answer from the rule-based parser, without Gemini"""
+        # The keywords may wait on the dataset's first load
+        intent = parse_message(message, await asyncio.to_thread(self._keywords))
+        if intent is None:
+            return "Try: 'find john', 'age above 30', 'salary below 50000', 'engineering managers'"
+        return await mcp_client.call_tool(*intent)
+    
+    @staticmethod
+    def _keywords():
+        """Keyword index of the primary dataset's current version, if it loads"""
+        try:
+            return get_registry().current().index("keywords")
+        except (OSError, ValueError) as e:
+            print(f"Fallback parser without dataset keywords: {e}")
+            return None
@@ -0,0 +1,162 @@
+"""Prompt-size budget and token telemetry for Gemini requests
+
+Tool results pasted into a prompt grow with the number of rows returned.
+``compact_result`` keeps them under a token budget by replacing oversize
+listings with aggregates plus the top rows. ``TokenTelemetry`` records
+input and output tokens and latency per query shape, so expensive kinds of
+question show up in ``/stats``.
+"""
+
+import os
+import threading
+from collections import Counter, deque
+from typing import Any, Dict, List, Optional
+
+from people_server.tools import ToolResult
+
+# Estimated tokens a tool result may take up in a prompt
+PROMPT_TOKEN_BUDGET = int(os.getenv("GEMINI_PROMPT_TOKEN_BUDGET", "1500"))
+# Rows kept verbatim when a result is compacted
+PROMPT_TOP_ROWS = int(os.getenv("GEMINI_PROMPT_TOP_ROWS", "10"))
+# Rough size of a token for English text and numbers
+CHARS_PER_TOKEN = 4
+# Recent latencies kept per query shape
+TELEMETRY_WINDOW = 1024
+
+_CATEGORIES = ("department", "role", "location", "education")
+_NUMBERS = ("salary", "age")
+_ROW_FIELDS = ("role", "department", "location", "age", "salary")
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count without a round trip to the API"""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _rows(data: Any) -> List[Dict[str, Any]]:
+    """People in a tool result's data, best first"""
+    if isinstance(data, dict):
+        return [candidate["person"] for candidate in data.get("candidates", [])]
+    if isinstance(data, list):
+        return [row for row in data if hasattr(row, "get")]
+    return []
+
+
+def _row_line(person) -> str:
+    details = []
+    for field in _ROW_FIELDS:
+        value = person.get(field)
+        if value in (None, ""):
+            continue
+        details.append(f"{field} {value:,}" if isinstance(value, (int, float)) and field == "salary" else f"{field} {value}")
+    return f"- {person.get('full_name', '?')} (ID: {person.get('id', '?')}): {', '.join(details)}"
+
+
+def summarize_rows(rows: List[Dict[str, Any]]) -> List[str]:
+    """Value counts and numeric ranges across result rows"""
+    lines = []
+    for field in _CATEGORIES:
+        counts = Counter(row[field] for row in rows if row.get(field))
+        if counts:
+            common = ", ".join(f"{value} {count}" for value, count in counts.most_common(5))
+            more = f", {len(counts) - 5} more" if len(counts) > 5 else ""
+            lines.append(f"{field}: {common}{more}")
+    for field in _NUMBERS:
+        values = [row[field] for row in rows if isinstance(row.get(field), (int, float))]
+        if values:
+            lines.append(f"{field}: min {min(values):,}, avg {sum(values) / len(values):,.0f}, max {max(values):,}")
+    return lines
+
+
+def compact_result(result: ToolResult, max_tokens: int = PROMPT_TOKEN_BUDGET,
+                   top_rows: int = PROMPT_TOP_ROWS) -> str:
+    """Result text for a prompt, at most about ``max_tokens`` long
+
+    Results that fit are returned unchanged. Larger listings become their
+    headline, aggregates over the returned rows and the first ``top_rows``
+    rows, with fewer rows kept if that is still too long.
+    """
+    text = result.text
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    rows = _rows(result.rows if result.rows is not None else result.data)
+    if not rows:
+        return text[:max_tokens * CHARS_PER_TOKEN]
+
+    headline = text.strip().splitlines()[0]
+    summary = [headline, f"Summary of the {len(rows)} rows returned:"] + summarize_rows(rows)
+    shown = [_row_line(person) for person in rows[:top_rows]]
+    while True:
+        lines = summary + [f"Top {len(shown)}:"] + shown if shown else summary
+        compacted = "\n".join(lines)
+        if not shown or estimate_tokens(compacted) <= max_tokens:
+            return compacted[:max_tokens * CHARS_PER_TOKEN]
+        shown.pop()
+
+
+def usage_tokens(response) -> Optional[Dict[str, int]]:
+    """Token counts Gemini reported for a response, if any"""
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None or not getattr(usage, "prompt_token_count", 0):
+        return None
+    return {"input": usage.prompt_token_count, "output": getattr(usage, "candidates_token_count", 0) or 0}
+
+
+class ShapeStats:
+    """Token and latency totals for one query shape"""
+
+    def __init__(self):
+        self.calls = 0
+        self.compacted = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.max_input_tokens = 0
+        self.total_ms = 0.0
+        self.recent_ms = deque(maxlen=TELEMETRY_WINDOW)
+
+    def record(self, input_tokens: int, output_tokens: int, elapsed_ms: float, compacted: bool):
+        self.calls += 1
+        self.compacted += compacted
+        self.input_tokens += input_tokens
+        self.output_tokens += output_tokens
+        self.max_input_tokens = max(self.max_input_tokens, input_tokens)
+        self.total_ms += elapsed_ms
+        self.recent_ms.append(elapsed_ms)
+
+    def summary(self) -> Dict[str, Any]:
+        recent = sorted(self.recent_ms)
+        p95 = recent[min(len(recent) - 1, int(0.95 * len(recent)))] if recent else 0.0
+        return {
+            "calls": self.calls,
+            "compacted": self.compacted,
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "avg_input_tokens": round(self.input_tokens / self.calls, 1) if self.calls else 0.0,
+            "max_input_tokens": self.max_input_tokens,
+            "avg_ms": round(self.total_ms / self.calls, 3) if self.calls else 0.0,
+            "p95_ms": round(p95, 3),
+        }
+
+
+class TokenTelemetry:
+    """Thread-safe per-shape accounting of Gemini requests"""
+
+    def __init__(self):
+        self._shapes: Dict[str, ShapeStats] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def shape(stage: str, tool: Optional[str] = None, arguments: Optional[Dict[str, Any]] = None) -> str:
+        """Query shape: the request stage plus the tool and argument names"""
+        if tool is None:
+            return stage
+        return f"{stage}:{tool}({','.join(sorted(arguments or {}))})"
+
+    def record(self, shape: str, input_tokens: int, output_tokens: int, elapsed_ms: float,
+               compacted: bool = False):
+        with self._lock:
+            self._shapes.setdefault(shape, ShapeStats()).record(input_tokens, output_tokens, elapsed_ms, compacted)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {shape: stats.summary() for shape, stats in self._shapes.items()}
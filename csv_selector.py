@@ -3,7 +3,6 @@
 
 import os
 import glob
-import shutil
 
 def list_csv_files():
     """List all CSV files in data directory"""
@@ -55,19 +54,16 @@ def preview_csv(file_path):
         print(f"Error reading CSV: {e}")
 
 def set_primary_csv(file_path):
-    """Set a CSV file as the primary one (rename to people.csv)"""
-    primary_path = "data/people.csv"
+    """Set a CSV file in data/ as the primary dataset
+
+    The file is loaded first and then published by swapping the registry's
+    primary pointer, so running servers switch over without copying files.
+    """
+    from people_server.registry import dataset_name, get_registry
     
-    if file_path != primary_path:
-        # Backup existing people.csv if it exists
-        if os.path.exists(primary_path):
-            backup_path = "data/people_backup.csv"
-            shutil.copy2(primary_path, backup_path)
-            print(f"Backed up existing people.csv to people_backup.csv")
-        
-        # Copy selected file to people.csv
-        shutil.copy2(file_path, primary_path)
-        print(f"Set {os.path.basename(file_path)} as primary CSV file")
+    registry = get_registry()
+    version = registry.promote(dataset_name(file_path))
+    print(f"Set {os.path.basename(file_path)} as primary CSV file ({len(version)} people)")
 
 if __name__ == "__main__":
     print("CSV File Selector")
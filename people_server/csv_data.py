@@ -1,39 +1,290 @@
-"""Simple CSV Data Handler"""
+"""Simple CSV Data Handler
+
+Files are read in chunks of ``CHUNK_ROWS`` rows. Each chunk is mapped onto
+the canonical columns and dropped before the next one is parsed, so peak
+memory is the finished columns plus one chunk rather than a whole-file
+DataFrame. Rows the parser cannot use are skipped and listed in a
+``LoadReport`` instead of failing the load.
+
+pandas is imported on the first parse, so processes that only load
+snapshots, or never touch the data, do not pay for it.
+"""
+
+from __future__ import annotations
 
-import pandas as pd
 import os
-from typing import List, Dict, Any
-
-def get_people_data() -> List[Dict[str, Any]]:
-    """Load and return employee data"""
-    csv_path = "data/Employee_Complete_Dataset.csv"
-    
-    if not os.path.exists(csv_path):
-        return []
-    
-    try:
-        df = pd.read_csv(csv_path)
-        people_list = []
-        
-        for _, row in df.iterrows():
-            person = {
-                "id": int(row['Employee_number']),
-                "full_name": str(row['Employee_name']),
-                "preferred_name": str(row['Employee_name']).split()[0],
-                "email": f"{str(row['Employee_name']).lower().replace(' ', '.')}@company.com",
-                "phone": "+91-9876543210",
-                "role": str(row['Role']),
-                "department": str(row['Department']),
-                "location": "Office",
-                "tags": []
-            }
-            people_list.append(person)
-        
-        return people_list
-    except Exception as e:
-        print(f"Error loading CSV: {e}")
-        return []
+import re
+import warnings
+from typing import TYPE_CHECKING, Any, Callable, Dict, IO, Iterator, List, Mapping, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+DEFAULT_CSV_PATH = "data/Employee_Complete_Dataset.csv"
+CHUNK_ROWS = int(os.getenv("PEOPLE_CSV_CHUNK_ROWS", "100000"))
+# Bad rows kept per report; the count keeps going past this
+MAX_REPORTED_ROWS = 100
+
+# Canonical columns every loaded dataset exposes, whatever the source schema
+STRING_FIELDS = ("full_name", "preferred_name", "email", "phone", "role",
+                 "department", "location", "tags", "education")
+NUMERIC_FIELDS = ("id", "salary", "age")
+PERSON_FIELDS = ("id", "full_name", "preferred_name", "email", "phone",
+                 "role", "department", "location", "tags")
+EMPLOYEE_FIELDS = PERSON_FIELDS + ("salary", "age", "education")
+
+
+def _text(series: pd.Series) -> List[str]:
+    """Column as a list of plain strings, blanks for missing values"""
+    return [str(value) for value in series.fillna("").tolist()]
+
+
+def _ints(series: pd.Series) -> np.ndarray:
+    """Column as int64, zeros for missing or non-numeric values"""
+    import pandas as pd
+    return pd.to_numeric(series, errors="coerce").fillna(0).astype("int64").to_numpy()
+
+
+# Source column holding each numeric field, per schema
+_EMPLOYEE_NUMERIC = {"id": "Employee_number", "salary": "Current_Salary", "age": "Employee_age"}
+_SKIPPED_LINE = re.compile(r"Skipping line (\d+): (.*)")
+# Spare column past the header that fills only on rows with extra fields
+_EXTRA_FIELDS = "__extra_fields__"
+
+
+class BadRow:
+    """A CSV line that was skipped or only partly understood"""
+
+    def __init__(self, chunk: int, line: Optional[int], reason: str):
+        self.chunk = chunk
+        self.line = line
+        self.reason = reason
+
+    def __repr__(self) -> str:
+        where = f"line {self.line}" if self.line is not None else f"chunk {self.chunk}"
+        return f"{where}: {self.reason}"
+
+
+class LoadReport:
+    """Progress and problems of one streamed CSV load"""
+
+    def __init__(self, source: str = "", total_bytes: Optional[int] = None):
+        self.source = source
+        self.total_bytes = total_bytes
+        self.bytes_read = 0
+        self.chunks = 0
+        self.rows = 0
+        self.bad_row_count = 0
+        self.bad_rows: List[BadRow] = []
+        # Set when the parser gave up before the end of the file
+        self.error: Optional[str] = None
+
+    @property
+    def complete(self) -> bool:
+        return self.error is None
+
+    @property
+    def progress(self) -> Optional[float]:
+        """Fraction of the file consumed so far, None for unsized sources"""
+        if not self.total_bytes:
+            return None
+        return min(1.0, self.bytes_read / self.total_bytes)
+
+    def add_bad_row(self, line: Optional[int], reason: str):
+        self.bad_row_count += 1
+        if len(self.bad_rows) < MAX_REPORTED_ROWS:
+            self.bad_rows.append(BadRow(self.chunks, line, reason))
+
+    def summary(self) -> str:
+        text = f"{self.rows} rows in {self.chunks} chunks from {self.source or 'buffer'}"
+        if self.bad_row_count:
+            text += f", {self.bad_row_count} malformed rows"
+        if self.error:
+            text += f", stopped early: {self.error}"
+        return text
+
+
+def _numeric_sources(header) -> Dict[str, str]:
+    """Source column feeding each numeric field, for the schema of ``header``"""
+    if "Employee_name" in header:
+        return _EMPLOYEE_NUMERIC
+    return {field: field for field in NUMERIC_FIELDS if field in header}
+
+
+def _line_numbers(first_line: int, count: int, skipped: List[int]) -> np.ndarray:
+    """File line of each parsed row, stepping over lines the parser skipped"""
+    lines = np.arange(first_line, first_line + count)
+    for line in sorted(skipped):
+        lines[lines >= line] += 1
+    return lines
+
+
+def _check_numbers(df: pd.DataFrame, sources: Dict[str, str], report: LoadReport, lines: np.ndarray):
+    """Report rows whose numeric cells are present but not numbers"""
+    import pandas as pd
+    for field, column in sources.items():
+        raw = df[column]
+        if pd.api.types.is_numeric_dtype(raw.dtype):
+            continue
+        bad = raw.notna() & pd.to_numeric(raw, errors="coerce").isna()
+        for position in np.flatnonzero(bad.to_numpy()).tolist():
+            report.add_bad_row(int(lines[position]), f"{field} {raw.iloc[position]!r} is not a number")
+
+
+def normalize_frame(df: pd.DataFrame) -> Tuple[Dict[str, Any], Tuple[str, ...]]:
+    """Map a raw CSV frame onto the canonical column layout
+
+    Returns the columns and the fields that records should expose.
+    """
+    if "Employee_name" in df.columns:
+        names = _text(df["Employee_name"])
+        columns = {
+            "id": _ints(df["Employee_number"]),
+            "full_name": names,
+            "preferred_name": [(name.split() or [""])[0] for name in names],
+            "email": [f"{name.lower().replace(' ', '.')}@company.com" for name in names],
+            "phone": ["+91-9876543210"] * len(names),
+            "role": _text(df["Role"]),
+            "department": _text(df["Department"]),
+            "location": ["Office"] * len(names),
+            "tags": [""] * len(names),
+            "salary": _ints(df["Current_Salary"]),
+            "age": _ints(df["Employee_age"]),
+            "education": _text(df["Education_level"]),
+        }
+        return columns, EMPLOYEE_FIELDS
+
+    count = len(df)
+    columns = {}
+    for field in NUMERIC_FIELDS:
+        columns[field] = _ints(df[field]) if field in df.columns else np.zeros(count, dtype="int64")
+    for field in STRING_FIELDS:
+        columns[field] = _text(df[field]) if field in df.columns else [""] * count
+    if "preferred_name" not in df.columns:
+        columns["preferred_name"] = [(name.split() or [""])[0] for name in columns["full_name"]]
+
+    fields = PERSON_FIELDS + tuple(f for f in ("salary", "age", "education") if f in df.columns)
+    return columns, fields
+
+
+def _concat(parts: List[Dict[str, Any]]) -> Dict[str, Any]:
+    columns = {}
+    for field in parts[0]:
+        if field in NUMERIC_FIELDS:
+            columns[field] = np.concatenate([part[field] for part in parts])
+        else:
+            columns[field] = [value for part in parts for value in part[field]]
+    return columns
+
+
+def read_columns(source: Union[str, IO], chunk_rows: int = CHUNK_ROWS,
+                 progress: Optional[Callable[[LoadReport], None]] = None
+                 ) -> Tuple[Dict[str, Any], Tuple[str, ...], LoadReport]:
+    """Stream a CSV path or buffer into canonical columns, chunk by chunk
+
+    ``progress`` is called with the running report after every chunk. A
+    parser error partway through keeps the rows read so far and is recorded
+    in ``report.error``; an error before any row is read is raised.
+    """
+    if isinstance(source, str):
+        with open(source, "rb") as handle:
+            report = LoadReport(source, os.fstat(handle.fileno()).st_size)
+            return _read_chunks(handle, chunk_rows, progress, report)
+    return _read_chunks(source, chunk_rows, progress, LoadReport())
+
+
+def iter_chunks(handle: IO, chunk_rows: int, report: LoadReport) -> Iterator[Tuple[pd.DataFrame, np.ndarray]]:
+    """Raw ``(chunk, file lines)`` of a CSV, malformed rows dropped and reported
+
+    Lines the parser skips, rows with more fields than the header and
+    numeric cells that are not numbers all go into ``report`` as each chunk
+    is read. A parser error partway through ends the stream and is recorded
+    in ``report.error``; an error before any row is read is raised.
+    """
+    import pandas as pd
+    header = pd.read_csv(handle, nrows=0).columns
+    handle.seek(0)
+    sources = _numeric_sources(header)
+    # Text columns stay text, so a column cannot be inferred as int in one
+    # chunk and float in the next; numeric ones keep the parser's fast path
+    dtype = {column: str for column in header if column not in sources.values()}
+    dtype[_EXTRA_FIELDS] = str
+    # The C parser only checks the field count after a chunk's first row and
+    # truncates that one, so a spare column catches extra fields anywhere
+    reader = pd.read_csv(handle, chunksize=chunk_rows, dtype=dtype, on_bad_lines="warn",
+                         names=list(header) + [_EXTRA_FIELDS], header=None, skiprows=1)
+    # The parser's own messages count the spare column
+    miscounted = f"expected {len(header) + 1} fields"
+    # Line numbers are exact unless quoted values span several lines
+    line = 2
+    read_any = False
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always", pd.errors.ParserWarning)
+        while True:
+            try:
+                chunk = next(reader)
+            except StopIteration:
+                break
+            except (pd.errors.ParserError, ValueError) as e:
+                if not read_any:
+                    raise
+                report.error = str(e)
+                break
+            read_any = True
+            skipped = []
+            for warning in caught:
+                for match in _SKIPPED_LINE.finditer(str(warning.message)):
+                    skipped.append(int(match.group(1)))
+                    reason = match.group(2).strip().replace(miscounted, f"expected {len(header)} fields")
+                    report.add_bad_row(skipped[-1], reason)
+            caught.clear()
+
+            lines = _line_numbers(line, len(chunk), skipped)
+            line += len(chunk) + len(skipped)
+            extra = chunk[_EXTRA_FIELDS].notna().to_numpy()
+            for position in np.flatnonzero(extra).tolist():
+                report.add_bad_row(int(lines[position]), f"expected {len(header)} fields, saw more")
+            chunk = chunk[~extra].drop(columns=_EXTRA_FIELDS)
+            lines = lines[~extra]
+            _check_numbers(chunk, sources, report, lines)
+            yield chunk, lines
+
+
+def _read_chunks(handle: IO, chunk_rows: int, progress, report: LoadReport):
+    parts: List[Dict[str, Any]] = []
+    for chunk, _ in iter_chunks(handle, chunk_rows, report):
+        columns, fields = normalize_frame(chunk)
+        parts.append(columns)
+        report.chunks += 1
+        report.rows += len(chunk)
+        if report.total_bytes:
+            report.bytes_read = handle.tell()
+        if progress is not None:
+            progress(report)
+    return _concat(parts), fields, report
+
+
+def load_columns(csv_path: str, progress: Optional[Callable[[LoadReport], None]] = None
+                 ) -> Tuple[Dict[str, Any], Tuple[str, ...], LoadReport]:
+    """Parse a CSV file into canonical columns, streaming it in chunks"""
+    return read_columns(csv_path, progress=progress)
+
+
+def get_people_data() -> Sequence[Mapping[str, Any]]:
+    """Return employee data from the shared in-memory store
+
+    The result is a read-only view over the store's columns; records are
+    built as they are accessed rather than all at once.
+    """
+    from people_server.registry import get_registry
+
+    return get_registry().current().people
+
 
 def reload_csv_data():
-    """Reload data - no-op for simple implementation"""
-    pass
\ No newline at end of file
+    """Re-parse the dataset and swap it into the shared store"""
+    from people_server.registry import get_registry
+
+    get_registry().store().reload()
@@ -1,25 +1,295 @@
-"""Simple name search"""
+"""Typo-tolerant name search
 
-from typing import List, Dict, Any
+Names are indexed as character trigrams per token. A query's rarest
+trigrams pull candidate rows out of the inverted index, phonetic key hits
+are merged in, rapidfuzz scores only those candidates, and a bounded heap
+keeps the best ``max_results``.
 
-def fuzzy_search_people(people_data: List[Dict[str, Any]], query: str, max_results: int = 3) -> Dict[str, Any]:
-    """Simple name search"""
-    query = query.lower().strip()
+Rosters of names use the same candidates, and the (name, candidate) pairs
+of a whole block are scored in one ``rapidfuzz.process.cpdist`` call over
+as many cores as the block is worth.
+"""
+
+import heapq
+import re
+from typing import List, Dict, Any, Optional, Sequence, Tuple
+
+import numpy as np
+from rapidfuzz import fuzz, process
+
+from people_server.phonetic import PhoneticIndex
+
+NGRAM = 3
+# Rows sharing the most trigrams with the query that go on to full scoring
+MAX_CANDIDATES = 64
+# Posting entries read from the rarest query trigrams to nominate candidates
+CANDIDATE_POSTINGS = 4096
+# Rarest trigrams that always nominate: a typo changes at most three
+NOMINATING_GRAMS = 4
+# Nominated rows whose counts are completed against the common trigrams
+SHORTLIST = 8 * MAX_CANDIDATES
+# Candidates scoring below this are not worth reporting
+MIN_SIMILARITY = 0.5
+# Floor for rows whose folded phonetic key matches the query exactly
+PHONETIC_SIMILARITY = 0.9
+# Distinct names whose candidate pairs are scored together in a batch
+BATCH_BLOCK = 256
+# Blocks with fewer pairs than this are scored on one core
+PARALLEL_PAIRS = 8_192
+
+_NON_WORD = re.compile(r"[^\w\s]+")
+
+
+def name_tokens(name: str) -> List[str]:
+    """Casefolded word tokens of a name, punctuation dropped"""
+    return _NON_WORD.sub(" ", name.casefold()).split()
+
+
+def ngrams(tokens: Sequence[str]) -> set:
+    """Padded character n-grams over all tokens"""
+    grams = set()
+    for token in tokens:
+        padded = f" {token} "
+        grams.update(padded[i:i + NGRAM] for i in range(len(padded) - NGRAM + 1))
+    return grams
+
+
+def normalize_name(name: str) -> str:
+    return " ".join(name_tokens(name))
+
+
+def name_similarity(query: str, full_name: str, preferred_name: str) -> float:
+    """Best 0..1 similarity of a normalized query against normalized name variants"""
+    if not query:
+        return 0.0
+    best = max(fuzz.ratio(query, full_name), fuzz.ratio(query, preferred_name))
+    if " " in query:
+        best = max(best, fuzz.token_sort_ratio(query, full_name))
+    else:
+        for token in full_name.split():
+            best = max(best, fuzz.ratio(query, token))
+    return best / 100.0
+
+
+class NameIndex:
+    """Inverted trigram index over ``full_name`` and ``preferred_name``"""
+
+    def __init__(self, names: List[Tuple[str, str]], postings: Dict[str, np.ndarray]):
+        # Normalized (full_name, preferred_name) per row, ready for scoring
+        self.names = names
+        self.postings = postings
+
+    @staticmethod
+    def _collect(full_names: Sequence[str], preferred_names: Sequence[str], start: int,
+                 names: List[Tuple[str, str]]) -> Dict[str, List[int]]:
+        collected: Dict[str, List[int]] = {}
+        for offset, (full_name, preferred_name) in enumerate(zip(full_names, preferred_names)):
+            full_tokens = name_tokens(full_name)
+            preferred_tokens = name_tokens(preferred_name)
+            names.append((" ".join(full_tokens), " ".join(preferred_tokens)))
+            row = start + offset
+            for gram in ngrams(full_tokens + preferred_tokens):
+                collected.setdefault(gram, []).append(row)
+        return collected
+
+    @classmethod
+    def build(cls, full_names: Sequence[str], preferred_names: Sequence[str]) -> "NameIndex":
+        names: List[Tuple[str, str]] = []
+        collected = cls._collect(full_names, preferred_names, 0, names)
+        postings = {gram: np.asarray(rows, dtype=np.int32) for gram, rows in collected.items()}
+        return cls(names, postings)
+
+    @classmethod
+    def for_version(cls, version) -> "NameIndex":
+        return cls.build(version.columns["full_name"], version.columns["preferred_name"])
+
+    def extended(self, version, start: int) -> "NameIndex":
+        """Index for ``version`` reusing this one for rows before ``start``"""
+        full_names = version.columns["full_name"]
+        preferred_names = version.columns["preferred_name"]
+        names = list(self.names)
+        postings = dict(self.postings)
+        added_rows = self._collect(full_names[start:], preferred_names[start:], start, names)
+        for gram, rows in added_rows.items():
+            added = np.asarray(rows, dtype=np.int32)
+            existing = postings.get(gram)
+            postings[gram] = added if existing is None else np.concatenate([existing, added])
+        return NameIndex(names, postings)
+
+    def candidates(self, query: str, limit: int = MAX_CANDIDATES,
+                   budget: int = CANDIDATE_POSTINGS) -> np.ndarray:
+        """Row ids sharing the most trigrams with the query
+
+        Prefix filtering: the query's rarest trigrams (at least
+        ``NOMINATING_GRAMS`` of them, then more while under ``budget``
+        posting entries, each list capped at ``budget``) nominate rows. The
+        ``SHORTLIST`` best nominees get their counts completed by binary
+        search in the common trigrams' sorted postings, so the cost follows
+        ``budget`` rather than the size of the directory.
+        """
+        lists = sorted((self.postings[gram] for gram in ngrams(name_tokens(query)) if gram in self.postings),
+                       key=len)
+        if not lists:
+            return np.empty(0, dtype=np.int32)
+        prefix, used = 0, 0
+        while prefix < len(lists) and (prefix < NOMINATING_GRAMS or used + len(lists[prefix]) <= budget):
+            used += len(lists[prefix])
+            prefix += 1
+        rows, shared = np.unique(np.concatenate([postings[:budget] for postings in lists[:prefix]]),
+                                 return_counts=True)
+        if len(rows) > SHORTLIST:
+            best = np.argpartition(-shared, SHORTLIST - 1)[:SHORTLIST]
+            rows, shared = rows[best], shared[best]
+        for postings in lists[prefix:]:
+            found = np.searchsorted(postings, rows)
+            shared += postings[np.minimum(found, len(postings) - 1)] == rows
+        if len(rows) > limit:
+            rows = rows[np.argpartition(-shared, limit - 1)[:limit]]
+        return rows
+
+    def search(self, query: str, max_results: int = 3,
+               min_similarity: float = MIN_SIMILARITY,
+               phonetic: PhoneticIndex = None) -> List[Tuple[float, int]]:
+        """Best ``(similarity, row)`` pairs for a query, highest first
+
+        With a phonetic index, sound-alike rows join the trigram candidates
+        and rows sharing the query's folded spelling score at least
+        ``PHONETIC_SIMILARITY``.
+        """
+        return self.search_counted(query, max_results, min_similarity, phonetic)[0]
+
+    def search_counted(self, query: str, max_results: int = 3,
+                       min_similarity: float = MIN_SIMILARITY,
+                       phonetic: PhoneticIndex = None) -> Tuple[List[Tuple[float, int]], int]:
+        """``search`` plus the number of candidate rows that were scored"""
+        strong, weak = phonetic.lookup(query) if phonetic is not None else (set(), set())
+        query = normalize_name(query)
+        candidates = strong.union(weak, self.candidates(query).tolist())
+        scored = []
+        for row in candidates:
+            score = name_similarity(query, *self.names[row])
+            if row in strong:
+                score = max(score, PHONETIC_SIMILARITY)
+            if score >= min_similarity:
+                scored.append((score, -row))
+        best = heapq.nlargest(max_results, scored)
+        return [(score, -neg_row) for score, neg_row in best], len(candidates)
+
+    def search_batch(self, queries: Sequence[str], max_results: int = 3,
+                     min_similarity: float = MIN_SIMILARITY,
+                     phonetic: PhoneticIndex = None) -> List[List[Tuple[float, int]]]:
+        """``search`` for many queries at once, with the same results
+
+        Each distinct query gets the candidates ``search`` would score; the
+        pairs of a block of queries are then scored together in C, spread
+        over all cores once the block is large.
+        """
+        distinct: Dict[str, int] = {}
+        slots = [distinct.setdefault(query, len(distinct)) for query in queries]
+        pending = list(distinct)
+        found: List[List[Tuple[float, int]]] = []
+        for start in range(0, len(pending), BATCH_BLOCK):
+            found.extend(self._search_block(pending[start:start + BATCH_BLOCK], max_results,
+                                            min_similarity, phonetic))
+        return [found[slot] for slot in slots]
+
+    def _search_block(self, queries: List[str], max_results: int, min_similarity: float,
+                      phonetic: Optional[PhoneticIndex]) -> List[List[Tuple[float, int]]]:
+        owners, strongs = [], []
+        pair_queries: List[str] = []
+        pair_rows: List[int] = []
+        for query in queries:
+            strong, weak = phonetic.lookup(query) if phonetic is not None else (set(), set())
+            normalized = normalize_name(query)
+            rows = sorted(strong.union(weak, self.candidates(normalized).tolist())) if normalized else []
+            owners.append((len(pair_rows), len(pair_rows) + len(rows)))
+            strongs.append(strong)
+            pair_queries.extend([normalized] * len(rows))
+            pair_rows.extend(rows)
+        if not pair_rows:
+            return [[] for _ in queries]
+
+        scores = self._pair_scores(pair_queries, pair_rows)
+        rows = np.asarray(pair_rows, dtype=np.int64)
+        results = []
+        for (start, stop), strong in zip(owners, strongs):
+            query_rows, query_scores = rows[start:stop], scores[start:stop]
+            if strong:
+                floored = np.isin(query_rows, list(strong))
+                query_scores[floored] = np.maximum(query_scores[floored], PHONETIC_SIMILARITY)
+            keep = np.flatnonzero(query_scores >= min_similarity)
+            order = keep[np.lexsort((query_rows[keep], -query_scores[keep]))][:max_results]
+            results.append([(float(query_scores[i]), int(query_rows[i])) for i in order])
+        return results
+
+    def _pair_scores(self, queries: List[str], rows: List[int]) -> np.ndarray:
+        """``name_similarity`` of each (query, row) pair, computed by rapidfuzz in bulk"""
+        workers = -1 if len(rows) >= PARALLEL_PAIRS else 1
+
+        def ratios(left, right):
+            return process.cpdist(left, right, scorer=fuzz.ratio, dtype=np.float64, workers=workers)
+
+        full_names = [self.names[row][0] for row in rows]
+        scores = np.maximum(ratios(queries, full_names), ratios(queries, [self.names[row][1] for row in rows]))
+        multi = [i for i, query in enumerate(queries) if " " in query]
+        if multi:
+            # token_sort_ratio is a plain ratio of the token-sorted strings
+            ordered = ratios([" ".join(sorted(queries[i].split())) for i in multi],
+                             [" ".join(sorted(full_names[i].split())) for i in multi])
+            scores[multi] = np.maximum(scores[multi], ordered)
+        single = [i for i, query in enumerate(queries) if " " not in query]
+        if single:
+            token_queries, tokens, starts = [], [], []
+            for i in single:
+                starts.append(len(tokens))
+                # A placeholder keeps every pair's token range non-empty
+                words = full_names[i].split() or [""]
+                tokens.extend(words)
+                token_queries.extend([queries[i]] * len(words))
+            by_token = np.maximum.reduceat(ratios(token_queries, tokens), starts)
+            scores[single] = np.maximum(scores[single], by_token)
+        return scores / 100.0
+
+
+def _indexes(people_data: Sequence[Dict[str, Any]]) -> Tuple[NameIndex, PhoneticIndex]:
+    dataset = getattr(people_data, "dataset", None)
+    if dataset is not None:
+        return dataset.index("names"), dataset.index("phonetic")
+    full_names = [p["full_name"] for p in people_data]
+    preferred_names = [p["preferred_name"] for p in people_data]
+    return NameIndex.build(full_names, preferred_names), PhoneticIndex.build(full_names, preferred_names)
+
+
+def _matches(people_data: Sequence[Dict[str, Any]], query: str, best: List[Tuple[float, int]]) -> Dict[str, Any]:
     matches = []
-    
-    for person in people_data:
-        name = person["full_name"].lower()
-        
-        # Simple substring search
-        if query in name:
-            matches.append({
-                "similarity": 1.0,
-                "matched_name": person["full_name"],
-                "person": person
-            })
-    
+    for similarity, row in best:
+        person = people_data[row]
+        matches.append({
+            "similarity": round(similarity, 4),
+            "matched_name": person["full_name"],
+            "person": person,
+            "row": row
+        })
+
     return {
-        "query": query,
+        "query": query.lower().strip(),
         "best_match": matches[0]["matched_name"] if matches else None,
-        "candidates": matches[:max_results]
-    }
\ No newline at end of file
+        "candidates": matches
+    }
+
+
+def fuzzy_search_people(people_data: Sequence[Dict[str, Any]], query: str, max_results: int = 3) -> Dict[str, Any]:
+    """Typo-tolerant name search over a list of people or a store view"""
+    index, phonetic = _indexes(people_data)
+    best, scanned = index.search_counted(query, max_results, phonetic=phonetic)
+    results = _matches(people_data, query, best)
+    results["scanned"] = scanned
+    return results
+
+
+def fuzzy_search_batch(people_data: Sequence[Dict[str, Any]], queries: Sequence[str],
+                       max_results: int = 3) -> List[Dict[str, Any]]:
+    """``fuzzy_search_people`` for a roster of names in one pass over the index"""
+    index, phonetic = _indexes(people_data)
+    best = index.search_batch(queries, max_results, phonetic=phonetic)
+    return [_matches(people_data, query, found) for query, found in zip(queries, best)]
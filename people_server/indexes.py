@@ -0,0 +1,186 @@
+"""Per-version lookup indexes over the store's columns"""
+
+import re
+from typing import Dict, List, Mapping, Sequence, Tuple
+
+import numpy as np
+
+
+class ExactNameIndex:
+    """Casefolded ``full_name``/``preferred_name`` to row ids"""
+
+    def __init__(self, rows_by_name: Mapping[str, Sequence[int]]):
+        self.rows_by_name = rows_by_name
+
+    @staticmethod
+    def _collect(full_names: Sequence[str], preferred_names: Sequence[str],
+                 start: int = 0) -> Dict[str, List[int]]:
+        collected: Dict[str, List[int]] = {}
+        for offset, (full_name, preferred_name) in enumerate(zip(full_names, preferred_names)):
+            row = start + offset
+            for key in {full_name.casefold(), preferred_name.casefold()}:
+                collected.setdefault(key, []).append(row)
+        return collected
+
+    @classmethod
+    def for_version(cls, version) -> "ExactNameIndex":
+        collected = cls._collect(version.columns["full_name"], version.columns["preferred_name"])
+        return cls({key: tuple(rows) for key, rows in collected.items()})
+
+    def extended(self, version, start: int) -> "ExactNameIndex":
+        """Index for ``version`` reusing this one for rows before ``start``"""
+        rows_by_name = dict(self.rows_by_name)
+        added = self._collect(version.columns["full_name"][start:],
+                              version.columns["preferred_name"][start:], start)
+        for key, rows in added.items():
+            rows_by_name[key] = tuple(rows_by_name.get(key, ())) + tuple(rows)
+        return ExactNameIndex(rows_by_name)
+
+    def lookup(self, name: str) -> Tuple[int, ...]:
+        """Row ids whose full or preferred name equals ``name``, ignoring case"""
+        rows = self.rows_by_name.get(name.casefold(), ())
+        return rows if isinstance(rows, tuple) else tuple(rows.tolist())
+
+
+class RangeIndex:
+    """Row ids of a numeric column sorted by value, for bisect range lookups"""
+
+    def __init__(self, column: str, order: np.ndarray, sorted_values: np.ndarray):
+        self.column = column
+        self.order = order
+        self.sorted_values = sorted_values
+
+    @classmethod
+    def for_column(cls, column: str, version) -> "RangeIndex":
+        values = np.asarray(version.columns[column])
+        order = np.argsort(values, kind="stable").astype(np.int32)
+        return cls(column, order, values[order])
+
+    def extended(self, version, start: int) -> "RangeIndex":
+        """Merge appended rows into the existing order instead of re-sorting"""
+        added = np.asarray(version.columns[self.column][start:])
+        positions = np.searchsorted(self.sorted_values, added, side="right")
+        order = np.insert(self.order, positions, np.arange(start, start + len(added), dtype=np.int32))
+        return RangeIndex(self.column, order, np.insert(self.sorted_values, positions, added))
+
+    def bounds(self, low=None, high=None) -> Tuple[int, int]:
+        """Slice of ``order`` holding values within ``[low, high]``"""
+        start = 0 if low is None else int(np.searchsorted(self.sorted_values, low, side="left"))
+        stop = len(self.order) if high is None else int(np.searchsorted(self.sorted_values, high, side="right"))
+        return start, max(start, stop)
+
+    def rows_between(self, low=None, high=None) -> np.ndarray:
+        start, stop = self.bounds(low, high)
+        return self.order[start:stop]
+
+
+class ValueIndex:
+    """Posting lists of row ids per distinct value of a categorical column"""
+
+    def __init__(self, column: str, values: List[str], codes: np.ndarray, postings: List[np.ndarray]):
+        self.column = column
+        self.values = values
+        self.folded = [value.casefold() for value in values]
+        self.codes = codes
+        self.postings = postings
+
+    @staticmethod
+    def _encode(column: Sequence[str], values: List[str], value_ids: Dict[str, int]) -> np.ndarray:
+        codes = np.empty(len(column), dtype=np.int32)
+        for row, value in enumerate(column):
+            code = value_ids.get(value)
+            if code is None:
+                code = value_ids[value] = len(values)
+                values.append(value)
+            codes[row] = code
+        return codes
+
+    @staticmethod
+    def _postings(codes: np.ndarray, count: int, start: int = 0) -> List[np.ndarray]:
+        if count == 0:
+            return []
+        order = np.argsort(codes, kind="stable").astype(np.int32)
+        splits = np.searchsorted(codes[order], np.arange(1, count))
+        return [rows + start for rows in np.split(order, splits)]
+
+    @classmethod
+    def for_column(cls, column: str, version) -> "ValueIndex":
+        values: List[str] = []
+        codes = cls._encode(version.columns[column], values, {})
+        return cls(column, values, codes, cls._postings(codes, len(values)))
+
+    def extended(self, version, start: int) -> "ValueIndex":
+        """Append new rows' codes and postings, adding any new distinct values"""
+        values = list(self.values)
+        added = self._encode(version.columns[self.column][start:], values,
+                             {value: code for code, value in enumerate(values)})
+        postings = list(self.postings) + [np.empty(0, dtype=np.int32)] * (len(values) - len(self.values))
+        for code, rows in enumerate(self._postings(added, len(values), start)):
+            if len(rows):
+                postings[code] = np.concatenate([postings[code], rows])
+        return ValueIndex(self.column, values, np.concatenate([self.codes, added]), postings)
+
+    def matching(self, text: str) -> np.ndarray:
+        """Codes of the distinct values containing ``text``, ignoring case"""
+        needle = text.casefold()
+        return np.array([code for code, value in enumerate(self.folded) if needle in value], dtype=np.int32)
+
+    def count(self, codes: np.ndarray) -> int:
+        return sum(len(self.postings[code]) for code in codes.tolist())
+
+    def rows(self, codes: np.ndarray) -> np.ndarray:
+        if len(codes) == 0:
+            return np.empty(0, dtype=np.int32)
+        return np.concatenate([self.postings[code] for code in codes.tolist()])
+
+
+class KeywordIndex:
+    """Token automaton over the distinct department, role and education values
+
+    ``find`` reports every value mentioned in a piece of free text in one
+    left-to-right pass over its words, preferring the longest phrase, so
+    "data science managers" yields the department before the role. A
+    trailing "s" on a value's last word also matches.
+    """
+
+    COLUMNS = ("department", "role", "education")
+    _WORD = re.compile(r"\w+")
+
+    def __init__(self, trie: Dict[str, dict]):
+        self.trie = trie
+
+    @classmethod
+    def for_version(cls, version) -> "KeywordIndex":
+        trie: Dict[str, dict] = {}
+        for column in cls.COLUMNS:
+            for value in version.index(column).values:
+                words = cls._WORD.findall(value.casefold())
+                if not words:
+                    continue
+                for variant in (words, words[:-1] + [words[-1] + "s"]):
+                    node = trie
+                    for word in variant:
+                        node = node.setdefault(word, {})
+                    matches = node.setdefault("", [])
+                    if (column, value) not in matches:
+                        matches.append((column, value))
+        return cls(trie)
+
+    def find(self, text: str) -> List[Tuple[str, str]]:
+        """``(column, value)`` for each value mentioned in ``text``, in order"""
+        words = self._WORD.findall(text.casefold())
+        found = []
+        start = 0
+        while start < len(words):
+            node, end, longest = self.trie, start, None
+            while end < len(words) and words[end] in node:
+                node = node[words[end]]
+                end += 1
+                if "" in node:
+                    longest = (end, node[""])
+            if longest is None:
+                start += 1
+                continue
+            start, matches = longest
+            found.extend(matches)
+        return found
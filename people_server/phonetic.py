@@ -0,0 +1,154 @@
+"""Phonetic keys for Indian and Western name spellings
+
+Two keys per name token, in the spirit of Double Metaphone's primary and
+secondary codes:
+
+- the *folded* key undoes common transliteration variants ("Aayush" and
+  "Ayush", "Priya" and "Prya", "Rahool" and "Rahul" all fold together)
+- the *skeleton* key keeps only the first letter and the consonants, a
+  looser sound-alike bucket
+
+``PhoneticIndex`` maps both keys to row ids so variants are found with a
+dictionary lookup instead of comparing against every row.
+"""
+
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Dict, List, Sequence, Set, Tuple
+
+import numpy as np
+
+# Buckets larger than this say little about which person was meant
+MAX_BUCKET = 64
+_NO_ROWS = np.empty(0, dtype=np.int32)
+
+_DIGRAPHS = (
+    ("ph", "f"), ("bh", "b"), ("dh", "d"), ("gh", "g"), ("jh", "j"),
+    ("kh", "k"), ("th", "t"), ("sh", "s"), ("ck", "k"), ("q", "k"),
+    ("x", "ks"), ("w", "v"),
+)
+_VOWEL_RUNS = (
+    ("aa", "a"), ("ee", "i"), ("ii", "i"), ("oo", "u"), ("uu", "u"),
+    ("au", "o"), ("ou", "o"),
+)
+_SOFT_C = re.compile(r"c(?=[eiy])")
+_HARD_C = re.compile(r"c(?!h)")
+# 'h' after a vowel and not voicing the next one is silent (John, Sarah)
+_SILENT_H = re.compile(r"(?<=[aeiou])h(?![aeiou])")
+_INNER_Y = re.compile(r"(?<=.)y")
+_DOUBLES = re.compile(r"(.)\1+")
+_VOWELS = re.compile(r"[aeiou]")
+_WORD = re.compile(r"\w+")
+
+
+def _tokens(name: str) -> List[str]:
+    return _WORD.findall(name.casefold())
+
+
+def fold(token: str) -> str:
+    """Transliteration-folded spelling of a single name token"""
+    token = unicodedata.normalize("NFKD", token.casefold())
+    token = "".join(ch for ch in token if "a" <= ch <= "z")
+    token = _SOFT_C.sub("s", token)
+    token = _HARD_C.sub("k", token)
+    for source, target in _DIGRAPHS:
+        token = token.replace(source, target)
+    token = _SILENT_H.sub("", token)
+    token = _INNER_Y.sub("i", token)
+    for source, target in _VOWEL_RUNS:
+        token = token.replace(source, target)
+    return _DOUBLES.sub(r"\1", token)
+
+
+@lru_cache(maxsize=65536)
+def phonetic_keys(token: str) -> Tuple[str, str]:
+    """``(folded, skeleton)`` keys for a name token"""
+    folded = fold(token)
+    if not folded:
+        return "", ""
+    return folded, folded[0] + _VOWELS.sub("", folded[1:])
+
+
+class PhoneticIndex:
+    """Hash index from folded and skeleton keys to row ids"""
+
+    def __init__(self, folded: Dict[str, np.ndarray], skeleton: Dict[str, np.ndarray]):
+        self.folded = folded
+        self.skeleton = skeleton
+
+    @staticmethod
+    def _collect(full_names: Sequence[str], preferred_names: Sequence[str], start: int = 0):
+        folded: Dict[str, List[int]] = {}
+        skeleton: Dict[str, List[int]] = {}
+        for offset, (full_name, preferred_name) in enumerate(zip(full_names, preferred_names)):
+            row = start + offset
+            keys = {phonetic_keys(token) for token in _tokens(full_name) + _tokens(preferred_name)}
+            for folded_key, skeleton_key in keys:
+                if folded_key:
+                    folded.setdefault(folded_key, []).append(row)
+                    skeleton.setdefault(skeleton_key, []).append(row)
+        return folded, skeleton
+
+    @staticmethod
+    def _arrays(collected: Dict[str, List[int]]) -> Dict[str, np.ndarray]:
+        return {key: np.unique(np.asarray(rows, dtype=np.int32)) for key, rows in collected.items()}
+
+    @classmethod
+    def build(cls, full_names: Sequence[str], preferred_names: Sequence[str]) -> "PhoneticIndex":
+        folded, skeleton = cls._collect(full_names, preferred_names)
+        return cls(cls._arrays(folded), cls._arrays(skeleton))
+
+    @classmethod
+    def for_version(cls, version) -> "PhoneticIndex":
+        return cls.build(version.columns["full_name"], version.columns["preferred_name"])
+
+    def extended(self, version, start: int) -> "PhoneticIndex":
+        """Index for ``version`` reusing this one for rows before ``start``"""
+        folded, skeleton = self._collect(version.columns["full_name"][start:],
+                                         version.columns["preferred_name"][start:], start)
+        merged = []
+        for existing, added in ((self.folded, folded), (self.skeleton, skeleton)):
+            keys = dict(existing)
+            for key, rows in self._arrays(added).items():
+                keys[key] = rows if key not in keys else np.concatenate([keys[key], rows])
+            merged.append(keys)
+        return PhoneticIndex(*merged)
+
+    def _match(self, keys: Dict[str, np.ndarray], query_keys: List[str]) -> np.ndarray:
+        """Sorted rows where every query token's key hits some token of the name"""
+        buckets = []
+        for key in query_keys:
+            hits = keys.get(key)
+            if hits is None:
+                return _NO_ROWS
+            buckets.append(hits)
+        # Buckets are sorted and unique: intersect from the smallest up
+        buckets.sort(key=len)
+        rows = buckets[0]
+        for hits in buckets[1:]:
+            if not len(rows):
+                break
+            rows = np.intersect1d(rows, hits, assume_unique=True)
+        return rows
+
+    def lookup(self, query: str, limit: int = MAX_BUCKET) -> Tuple[Set[int], Set[int]]:
+        """``(strong, weak)`` row ids: folded-key hits and skeleton-only hits
+
+        An oversized strong set is trimmed to ``limit`` rows and an oversized
+        weak set is dropped, both before any row becomes a Python object.
+        """
+        keys = [phonetic_keys(token) for token in _tokens(query)]
+        keys = [key for key in keys if key[0]]
+        if not keys:
+            return set(), set()
+        strong = self._match(self.folded, [folded for folded, _ in keys])
+        weak = self._match(self.skeleton, [skeleton for _, skeleton in keys])
+        # Folded hits are skeleton hits too, so this bounds the skeleton-only rows
+        if len(weak) - len(strong) > limit:
+            weak = _NO_ROWS
+        else:
+            weak = np.setdiff1d(weak, strong, assume_unique=True)
+            if len(weak) > limit:
+                weak = _NO_ROWS
+        return set(strong[:limit].tolist()), set(weak.tolist())
@@ -0,0 +1,129 @@
+"""Evaluation of list_people filters
+
+Each filter becomes a predicate that can estimate how many rows it keeps
+from the indexes alone. When the most selective predicate is narrow, it
+produces the candidate rows and the rest are checked against those
+candidates only. When every predicate keeps a large share of the rows,
+all of them are evaluated as column-wide NumPy boolean masks instead.
+Either way the top ``limit`` by salary are picked with ``argpartition``
+rather than by sorting every match.
+"""
+
+from typing import Any, Dict, List, NamedTuple, Optional
+
+import numpy as np
+
+VALUE_FILTERS = ("department", "role", "location", "education")
+# Above this fraction of the dataset, index candidates cost more than masks
+MASK_THRESHOLD = 0.2
+
+RANGE_FILTERS = {
+    "min_salary": ("salary", "low"),
+    "max_salary": ("salary", "high"),
+    "min_age": ("age", "low"),
+    "max_age": ("age", "high"),
+}
+
+
+class QueryResult(NamedTuple):
+    rows: np.ndarray
+    matched: int
+    scanned: int
+
+
+class Predicate:
+    """One filter, with a cheap size estimate taken from its index"""
+
+    def __init__(self, estimate: int, rows, keep, mask):
+        self.estimate = estimate
+        self.rows = rows
+        self.keep = keep
+        self.mask = mask
+
+
+def _bound(value: Any) -> Optional[int]:
+    """Numeric filter argument, None when it was not given"""
+    if not value:
+        return None
+    return int(value)
+
+
+def _value_predicate(version, column: str, text: str) -> Predicate:
+    index = version.index(column)
+    codes = index.matching(text)
+    return Predicate(index.count(codes),
+                     lambda: np.sort(index.rows(codes)),
+                     lambda rows: np.isin(index.codes[rows], codes),
+                     lambda: np.isin(index.codes, codes))
+
+
+def _range_predicate(version, column: str, low: Optional[int], high: Optional[int]) -> Predicate:
+    index = version.index(column)
+    start, stop = index.bounds(low, high)
+    values = version.columns[column]
+
+    def within(selected):
+        mask = np.ones(len(selected), dtype=bool)
+        if low is not None:
+            mask &= selected >= low
+        if high is not None:
+            mask &= selected <= high
+        return mask
+
+    return Predicate(stop - start,
+                     lambda: np.sort(index.order[start:stop]),
+                     lambda rows: within(values[rows]),
+                     lambda: within(values))
+
+
+def plan(version, filters: Dict[str, Any]) -> List[Predicate]:
+    """Predicates for the given filters, most selective first"""
+    predicates = []
+    for column in VALUE_FILTERS:
+        if filters.get(column):
+            predicates.append(_value_predicate(version, column, str(filters[column])))
+
+    bounds: Dict[str, Dict[str, Optional[int]]] = {}
+    for name, (column, side) in RANGE_FILTERS.items():
+        value = _bound(filters.get(name))
+        if value is not None:
+            bounds.setdefault(column, {"low": None, "high": None})[side] = value
+    for column, limits in bounds.items():
+        predicates.append(_range_predicate(version, column, limits["low"], limits["high"]))
+
+    predicates.sort(key=lambda predicate: predicate.estimate)
+    return predicates
+
+
+def top_by(values: np.ndarray, rows: np.ndarray, limit: int) -> np.ndarray:
+    """The ``limit`` rows with the largest values, largest first"""
+    if limit <= 0 or len(rows) == 0:
+        return rows[:0]
+    if len(rows) > limit:
+        rows = rows[np.argpartition(-values[rows], limit - 1)[:limit]]
+    return rows[np.lexsort((rows, -values[rows]))]
+
+
+def find_people(version, filters: Dict[str, Any], limit: int = 10) -> QueryResult:
+    """Rows matching every filter, top ``limit`` by salary (highest first)"""
+    salary = version.columns["salary"]
+    predicates = plan(version, filters)
+    if not predicates:
+        rows = np.arange(len(version), dtype=np.int32)
+        return QueryResult(top_by(salary, rows, limit), len(rows), len(rows))
+
+    if predicates[0].estimate > len(version) * MASK_THRESHOLD:
+        mask = predicates[0].mask()
+        for predicate in predicates[1:]:
+            mask &= predicate.mask()
+        rows = np.flatnonzero(mask).astype(np.int32)
+        return QueryResult(top_by(salary, rows, limit), len(rows), len(version))
+
+    first, rest = predicates[0], predicates[1:]
+    rows = first.rows()
+    scanned = len(rows)
+    for predicate in rest:
+        if len(rows) == 0:
+            break
+        rows = rows[predicate.keep(rows)]
+    return QueryResult(top_by(salary, rows, limit), len(rows), scanned)
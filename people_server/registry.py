@@ -0,0 +1,160 @@
+"""Registry of the datasets served from the data directory
+
+Every ``*.csv`` in the data directory is a dataset named after its file
+(``employees``, ``students``, ...). Each one has its own ``PeopleStore``,
+with its own indexes and version numbers. The primary dataset answers tool
+calls that name no ``dataset``. ``promote`` switches it by atomically
+replacing a small pointer file, so every process sharing the directory
+follows without a restart and nothing ever reads a half-copied CSV.
+
+Loaded datasets are kept in least-recently-used order. Once their combined
+size passes ``MEMORY_BUDGET`` the coldest ones are unloaded. They reload on
+their next use, usually straight from their snapshot.
+"""
+
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+from .csv_data import DEFAULT_CSV_PATH
+from .store import DatasetVersion, FileSignature, PeopleStore, file_signature, get_store
+
+DATA_DIR = os.getenv("PEOPLE_DATA_DIR", os.path.dirname(DEFAULT_CSV_PATH))
+MEMORY_BUDGET = int(float(os.getenv("PEOPLE_MEMORY_BUDGET_MB", "512")) * 2 ** 20)
+# Holds the primary dataset's name; replaced atomically by ``promote``
+PRIMARY_POINTER = ".primary"
+
+
+def dataset_name(path_or_name: str) -> str:
+    """Dataset name for a CSV path, file name or name"""
+    name = os.path.basename(path_or_name.strip())
+    return name[:-len(".csv")] if name.lower().endswith(".csv") else name
+
+
+class DatasetRegistry:
+    """Named datasets, the primary pointer and memory-bounded residency"""
+
+    def __init__(self, data_dir: str = DATA_DIR, memory_budget: int = MEMORY_BUDGET,
+                 default_primary: str = DEFAULT_CSV_PATH):
+        self.data_dir = data_dir
+        self.memory_budget = memory_budget
+        self.default_primary = dataset_name(default_primary)
+        self._pointer = os.path.join(data_dir, PRIMARY_POINTER)
+        self._lock = threading.Lock()
+        # Stores handed out so far, coldest first
+        self._recent: "OrderedDict[str, PeopleStore]" = OrderedDict()
+        self._primary: Tuple[Optional[FileSignature], str] = (None, self.default_primary)
+        self._watching = False
+
+    def names(self) -> List[str]:
+        """Datasets currently present in the data directory"""
+        try:
+            files = os.listdir(self.data_dir)
+        except OSError:
+            return []
+        return sorted(dataset_name(f) for f in files if f.lower().endswith(".csv"))
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.data_dir, f"{name}.csv")
+
+    @property
+    def primary(self) -> str:
+        """Name of the primary dataset, following the pointer file"""
+        signature = file_signature(self._pointer)
+        cached_signature, name = self._primary
+        if signature is None:
+            return self.default_primary
+        if signature != cached_signature:
+            try:
+                with open(self._pointer, encoding="utf-8") as handle:
+                    name = dataset_name(handle.read()) or self.default_primary
+            except OSError:
+                return name
+            self._primary = (signature, name)
+        return name
+
+    def resolve(self, dataset: Optional[str] = None) -> str:
+        """Validated dataset name, the primary one when none is given"""
+        if not dataset:
+            return self.primary
+        name = dataset_name(dataset)
+        if name not in self.names():
+            available = ", ".join(self.names()) or "none"
+            raise ValueError(f"Unknown dataset '{dataset}'. Available datasets: {available}")
+        return name
+
+    def store(self, dataset: Optional[str] = None) -> PeopleStore:
+        """Store for a dataset, marking it as the most recently used"""
+        return self._store(self.resolve(dataset))
+
+    def _store(self, name: str) -> PeopleStore:
+        store = get_store(self.path(name))
+        with self._lock:
+            self._recent[name] = store
+            self._recent.move_to_end(name)
+            if self._watching:
+                store.watch()
+        return store
+
+    def current(self, dataset: Optional[str] = None) -> DatasetVersion:
+        """Current version of a dataset, loading it and evicting colder ones"""
+        name = self.resolve(dataset)
+        version = self._store(name).current
+        self._evict(keep=name)
+        return version
+
+    def promote(self, dataset: str) -> DatasetVersion:
+        """Make a dataset primary once it is loaded, with one atomic rename"""
+        name = self.resolve(dataset)
+        version = self._store(name).current
+        handle, temp_path = tempfile.mkstemp(dir=self.data_dir, prefix=PRIMARY_POINTER)
+        try:
+            with os.fdopen(handle, "w", encoding="utf-8") as out:
+                out.write(name + "\n")
+            os.chmod(temp_path, 0o644)
+            os.replace(temp_path, self._pointer)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+        return version
+
+    def watch(self):
+        """Keep every loaded dataset fresh, including ones loaded later"""
+        with self._lock:
+            self._watching = True
+            for store in self._recent.values():
+                if store.loaded:
+                    store.watch()
+
+    def memory_usage(self) -> int:
+        with self._lock:
+            return sum(store.memory_usage() for store in self._recent.values())
+
+    def _evict(self, keep: str):
+        """Unload the coldest datasets until the loaded ones fit the budget"""
+        with self._lock:
+            usage = sum(store.memory_usage() for store in self._recent.values())
+            primary = self.primary
+            for name, store in list(self._recent.items()):
+                if usage <= self.memory_budget:
+                    break
+                if name in (keep, primary) or not store.loaded:
+                    continue
+                usage -= store.memory_usage()
+                store.unload()
+                del self._recent[name]
+
+
+_registry: Optional[DatasetRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> DatasetRegistry:
+    """Process-wide dataset registry"""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = DatasetRegistry()
+        return _registry
@@ -0,0 +1,342 @@
+"""Columnar binary snapshots of people datasets
+
+A snapshot sits next to its CSV (``<name>.csv.snap``) and is memory-mapped
+at startup, so processes skip CSV parsing and share the page cache.
+
+Layout::
+
+    b"PPLSNAP1" | u64 header length | JSON header | 64-byte aligned blocks
+
+Numeric columns are stored as fixed-width arrays, free-text columns as an
+offsets array plus a UTF-8 blob, and categorical columns as int32 codes
+with their distinct values in the header. Every index is stored too: the
+salary/age range orders, per-value posting lists, and the exact, trigram
+and phonetic name indexes. Their keys are kept as sorted fixed-width byte
+arrays that are binary-searched in place, so nothing is rebuilt at
+startup. The header records the source CSV's size, mtime and SHA-256,
+and a snapshot whose source has changed is ignored and rewritten.
+
+Compile snapshots ahead of time with ``python -m people_server.snapshot``.
+"""
+
+import hashlib
+import json
+import os
+import struct
+import sys
+import tempfile
+from collections.abc import Mapping, Sequence
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .csv_data import NUMERIC_FIELDS
+from .fuzzy import NameIndex
+from .indexes import ExactNameIndex, RangeIndex, ValueIndex
+from .phonetic import PhoneticIndex
+
+MAGIC = b"PPLSNAP1"
+FORMAT_VERSION = 2
+ALIGN = 64
+CATEGORICAL_FIELDS = ("role", "department", "location", "education")
+RANGE_FIELDS = ("salary", "age")
+
+
+def snapshot_path(csv_path: str) -> str:
+    return csv_path + ".snap"
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for chunk in iter(lambda: handle.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _aligned(offset: int) -> int:
+    return (offset + ALIGN - 1) // ALIGN * ALIGN
+
+
+class StringColumn(Sequence):
+    """Strings decoded on access from an offsets array and a UTF-8 blob"""
+
+    def __init__(self, offsets: np.ndarray, blob: np.ndarray):
+        self._offsets = offsets
+        self._blob = memoryview(blob)
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    @property
+    def nbytes(self) -> int:
+        return self._offsets.nbytes + self._blob.nbytes
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        return str(self._blob[self._offsets[index]:self._offsets[index + 1]], "utf-8")
+
+    def __iter__(self):
+        blob, offsets = self._blob, self._offsets.tolist()
+        for start, stop in zip(offsets, offsets[1:]):
+            yield str(blob[start:stop], "utf-8")
+
+
+class CategoricalColumn(Sequence):
+    """Strings looked up through per-row codes into a small value table"""
+
+    def __init__(self, values: List[str], codes: np.ndarray):
+        self._values = values
+        self._codes = codes
+
+    def __len__(self) -> int:
+        return len(self._codes)
+
+    @property
+    def nbytes(self) -> int:
+        return self._codes.nbytes + sum(len(value) for value in self._values)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._values[code] for code in self._codes[index].tolist()]
+        return self._values[self._codes[index]]
+
+    def __iter__(self):
+        values = self._values
+        return (values[code] for code in self._codes.tolist())
+
+
+class PairColumn(Sequence):
+    """Row-aligned pairs drawn from two string columns"""
+
+    def __init__(self, first: StringColumn, second: StringColumn):
+        self._first = first
+        self._second = second
+
+    def __len__(self) -> int:
+        return len(self._first)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return list(zip(self._first[index], self._second[index]))
+        return self._first[index], self._second[index]
+
+    def __iter__(self):
+        return zip(self._first, self._second)
+
+
+class KeyedPostings(Mapping):
+    """Read-only ``str -> row ids`` mapping searched in a sorted key array"""
+
+    def __init__(self, keys: np.ndarray, order: np.ndarray, bounds: np.ndarray):
+        self._keys = keys
+        self._order = order
+        self._bounds = bounds
+        self._width = keys.dtype.itemsize
+
+    def _position(self, key: str) -> int:
+        encoded = key.encode("utf-8")
+        if len(encoded) > self._width or not encoded.rstrip(b"\0") == encoded:
+            return -1
+        position = int(np.searchsorted(self._keys, encoded))
+        if position < len(self._keys) and self._keys[position] == encoded:
+            return position
+        return -1
+
+    def __getitem__(self, key: str) -> np.ndarray:
+        position = self._position(key)
+        if position < 0:
+            raise KeyError(key)
+        return self._order[self._bounds[position]:self._bounds[position + 1]]
+
+    def __contains__(self, key) -> bool:
+        return isinstance(key, str) and self._position(key) >= 0
+
+    def __iter__(self):
+        return (key.decode("utf-8") for key in self._keys.tolist())
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+
+class _BlockWriter:
+    def __init__(self):
+        self.blocks: List[bytes] = []
+        self.size = 0
+
+    def add(self, array: np.ndarray) -> Dict[str, Any]:
+        array = np.ascontiguousarray(array)
+        dtype = array.dtype.newbyteorder("<").str
+        data = array.astype(dtype, copy=False).tobytes()
+        block = {"dtype": dtype, "offset": self.size, "count": int(array.size)}
+        padding = _aligned(len(data)) - len(data)
+        self.blocks.append(data + b"\0" * padding)
+        self.size += len(data) + padding
+        return block
+
+
+def _strings(writer: _BlockWriter, values) -> Dict[str, Any]:
+    encoded = [value.encode("utf-8") for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    return {"kind": "strings",
+            "offsets": writer.add(offsets),
+            "blob": writer.add(np.frombuffer(b"".join(encoded), dtype=np.uint8))}
+
+
+def _keyed(writer: _BlockWriter, mapping) -> Dict[str, Any]:
+    items = sorted((key.encode("utf-8"), rows) for key, rows in mapping.items())
+    width = max([len(key) for key, _ in items] + [1])
+    keys = np.array([key for key, _ in items], dtype=f"S{width}")
+    lengths = [len(rows) for _, rows in items]
+    bounds = np.zeros(len(items) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=bounds[1:])
+    order = np.concatenate([np.asarray(rows, dtype=np.int32) for _, rows in items]) if items \
+        else np.empty(0, dtype=np.int32)
+    return {"keys": writer.add(keys), "order": writer.add(order), "bounds": writer.add(bounds)}
+
+
+def write_snapshot(version, csv_path: str, source: Dict[str, Any], path: Optional[str] = None) -> str:
+    """Write ``version`` (parsed from ``csv_path``) as a snapshot file"""
+    path = path or snapshot_path(csv_path)
+    writer = _BlockWriter()
+    columns: Dict[str, Any] = {}
+    indexes: Dict[str, Any] = {}
+    for field, values in version.columns.items():
+        if field in NUMERIC_FIELDS:
+            columns[field] = {"kind": "int64", "data": writer.add(np.asarray(values, dtype=np.int64))}
+        elif field in CATEGORICAL_FIELDS:
+            index = version.index(field)
+            bounds = np.cumsum([0] + [len(rows) for rows in index.postings], dtype=np.int64)
+            order = np.concatenate(index.postings) if index.postings else np.empty(0, dtype=np.int32)
+            columns[field] = {"kind": "categorical", "values": index.values,
+                              "codes": writer.add(index.codes)}
+            indexes[field] = {"kind": "values", "order": writer.add(order), "bounds": writer.add(bounds)}
+        else:
+            columns[field] = _strings(writer, values)
+    for field in RANGE_FIELDS:
+        index = version.index(field)
+        indexes[field] = {"kind": "range", "order": writer.add(index.order),
+                          "sorted": writer.add(index.sorted_values)}
+    exact = version.index("exact")
+    indexes["exact"] = {"kind": "exact", "rows": _keyed(writer, exact.rows_by_name)}
+    names = version.index("names")
+    indexes["names"] = {"kind": "names", "postings": _keyed(writer, names.postings),
+                        "full": _strings(writer, [full for full, _ in names.names]),
+                        "preferred": _strings(writer, [preferred for _, preferred in names.names])}
+    phonetic = version.index("phonetic")
+    indexes["phonetic"] = {"kind": "phonetic", "folded": _keyed(writer, phonetic.folded),
+                           "skeleton": _keyed(writer, phonetic.skeleton)}
+
+    header = json.dumps({
+        "format": FORMAT_VERSION,
+        "source": source,
+        "rows": len(version),
+        "fields": list(version.fields),
+        "columns": columns,
+        "indexes": indexes,
+    }).encode("utf-8")
+    prefix = MAGIC + struct.pack("<Q", len(header)) + header
+    prefix += b"\0" * (_aligned(len(prefix)) - len(prefix))
+
+    # Write beside the target and rename, so readers never map a torn file
+    directory = os.path.dirname(os.path.abspath(path))
+    handle, temp_path = tempfile.mkstemp(prefix=".snap-", dir=directory)
+    try:
+        with os.fdopen(handle, "wb") as out:
+            out.write(prefix)
+            for block in writer.blocks:
+                out.write(block)
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+    return path
+
+
+def source_info(csv_path: str, signature) -> Dict[str, Any]:
+    return {"size": signature.size, "mtime_ns": signature.mtime_ns, "sha256": file_sha256(csv_path)}
+
+
+def load_snapshot(csv_path: str, signature,
+                  path: Optional[str] = None) -> Optional[Tuple[Dict[str, Any], Tuple[str, ...], Dict[str, Any]]]:
+    """Memory-map a snapshot as ``(columns, fields, indexes)``
+
+    Returns None when there is no snapshot or its source CSV has changed.
+    """
+    path = path or snapshot_path(csv_path)
+    if not os.path.exists(path):
+        return None
+    mapped = np.memmap(path, dtype=np.uint8, mode="r")
+    if bytes(mapped[:len(MAGIC)]) != MAGIC:
+        return None
+    (header_size,) = struct.unpack("<Q", bytes(mapped[len(MAGIC):len(MAGIC) + 8]))
+    header_start = len(MAGIC) + 8
+    header = json.loads(bytes(mapped[header_start:header_start + header_size]))
+    if header.get("format") != FORMAT_VERSION:
+        return None
+
+    source = header["source"]
+    if (source["size"], source["mtime_ns"]) != (signature.size, signature.mtime_ns):
+        if source["size"] != signature.size or source["sha256"] != file_sha256(csv_path):
+            return None
+
+    base = _aligned(header_start + header_size)
+
+    def block(spec: Dict[str, Any]) -> np.ndarray:
+        return np.frombuffer(mapped, dtype=spec["dtype"], count=spec["count"], offset=base + spec["offset"])
+
+    def keyed(spec: Dict[str, Any]) -> KeyedPostings:
+        return KeyedPostings(block(spec["keys"]), block(spec["order"]), block(spec["bounds"]))
+
+    def strings(spec: Dict[str, Any]) -> StringColumn:
+        return StringColumn(block(spec["offsets"]), block(spec["blob"]))
+
+    columns: Dict[str, Any] = {}
+    for field, spec in header["columns"].items():
+        if spec["kind"] == "int64":
+            columns[field] = block(spec["data"])
+        elif spec["kind"] == "categorical":
+            columns[field] = CategoricalColumn(spec["values"], block(spec["codes"]))
+        else:
+            columns[field] = strings(spec)
+
+    indexes: Dict[str, Any] = {}
+    for field, spec in header["indexes"].items():
+        if spec["kind"] == "range":
+            indexes[field] = RangeIndex(field, block(spec["order"]), block(spec["sorted"]))
+        elif spec["kind"] == "exact":
+            indexes[field] = ExactNameIndex(keyed(spec["rows"]))
+        elif spec["kind"] == "names":
+            indexes[field] = NameIndex(PairColumn(strings(spec["full"]), strings(spec["preferred"])),
+                                       keyed(spec["postings"]))
+        elif spec["kind"] == "phonetic":
+            indexes[field] = PhoneticIndex(keyed(spec["folded"]), keyed(spec["skeleton"]))
+        else:
+            order, bounds = block(spec["order"]), block(spec["bounds"]).tolist()
+            postings = [order[start:stop] for start, stop in zip(bounds, bounds[1:])]
+            indexes[field] = ValueIndex(field, header["columns"][field]["values"],
+                                        columns[field]._codes, postings)
+    return columns, tuple(header["fields"]), indexes
+
+
+def compile_snapshot(csv_path: str, path: Optional[str] = None) -> str:
+    """Parse ``csv_path`` and write its snapshot"""
+    from .store import PeopleStore, file_signature
+
+    signature = file_signature(csv_path)
+    if signature is None:
+        raise FileNotFoundError(csv_path)
+    version = PeopleStore(csv_path, use_snapshots=False).current
+    return write_snapshot(version, csv_path, source_info(csv_path, signature), path)
+
+
+if __name__ == "__main__":
+    import glob
+
+    for csv_file in sys.argv[1:] or sorted(glob.glob("data/*.csv")):
+        print(f"Compiled {compile_snapshot(csv_file)}")
@@ -0,0 +1,485 @@
+"""Shared in-memory people store
+
+The CSV is parsed once into columns; every tool call reads the current
+``DatasetVersion`` instead of touching the file again.
+"""
+
+import hashlib
+import io
+import itertools
+import os
+import sys
+import threading
+from collections.abc import Sequence
+from functools import partial
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Mapping, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from .csv_data import (DEFAULT_CSV_PATH, PERSON_FIELDS, NUMERIC_FIELDS, STRING_FIELDS,
+                       LoadReport, load_columns, read_columns)
+from .fuzzy import NameIndex
+from .indexes import ExactNameIndex, KeywordIndex, RangeIndex, ValueIndex
+from .phonetic import PhoneticIndex
+from . import snapshot
+
+WATCH_INTERVAL = float(os.getenv("PEOPLE_WATCH_INTERVAL", "2.0"))
+# Memory-map ``<csv>.snap`` when it is current, and write one after a parse
+USE_SNAPSHOTS = os.getenv("PEOPLE_SNAPSHOTS", "1") != "0"
+
+# Indexes built for every published version. Each builder takes a
+# DatasetVersion; an index may also offer ``extended(version, start)`` to
+# absorb appended rows without a rebuild.
+INDEX_BUILDERS = {
+    "exact": ExactNameIndex.for_version,
+    "names": NameIndex.for_version,
+    "phonetic": PhoneticIndex.for_version,
+    "salary": partial(RangeIndex.for_column, "salary"),
+    "age": partial(RangeIndex.for_column, "age"),
+    "department": partial(ValueIndex.for_column, "department"),
+    "role": partial(ValueIndex.for_column, "role"),
+    "location": partial(ValueIndex.for_column, "location"),
+    "education": partial(ValueIndex.for_column, "education"),
+    # Derived from the value indexes above, so rebuilt rather than extended
+    "keywords": KeywordIndex.for_version,
+}
+
+# Index containers longer than this are sized from a sample of their items
+SIZE_SAMPLE = 1024
+
+# Read size when hashing the parsed region of the file
+HASH_CHUNK = 1 << 20
+
+
+class FileSignature(NamedTuple):
+    inode: int
+    size: int
+    mtime_ns: int
+
+
+def file_signature(path: str) -> Optional[FileSignature]:
+    """Cheap change detector for a dataset file, None if it is missing"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return FileSignature(st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+class PeopleView(Sequence):
+    """Read-only sequence of person records backed by a version's columns"""
+
+    def __init__(self, version: "DatasetVersion"):
+        self._version = version
+
+    @property
+    def dataset(self) -> "DatasetVersion":
+        return self._version
+
+    def __len__(self) -> int:
+        return len(self._version)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._version.record(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("person index out of range")
+        return self._version.record(index)
+
+
+def _prefix_hash(handle, size: int):
+    """SHA-256 over the first ``size`` bytes of an open file, left positioned after them"""
+    digest = hashlib.sha256()
+    handle.seek(0)
+    while size > 0:
+        chunk = handle.read(min(size, HASH_CHUNK))
+        if not chunk:
+            break
+        digest.update(chunk)
+        size -= len(chunk)
+    return digest
+
+
+def _deep_size(obj: Any) -> int:
+    """Rough bytes held by an index: arrays, containers, strings and attributes
+
+    Containers longer than ``SIZE_SAMPLE`` are measured from an evenly
+    spaced sample of their items, so a million-row index costs milliseconds.
+    """
+    total = 0
+    seen = set()
+    pending = [obj]
+    while pending:
+        obj = pending.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        if isinstance(obj, np.ndarray):
+            total += obj.nbytes
+            continue
+        total += sys.getsizeof(obj)
+        if isinstance(obj, (str, bytes, int, float)):
+            continue
+        if isinstance(obj, dict):
+            items = list(obj.keys()) + list(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            items = list(obj)
+        elif hasattr(obj, "__dict__"):
+            items = list(vars(obj).values())
+        else:
+            continue
+        if len(items) > SIZE_SAMPLE:
+            sample = items[::len(items) // SIZE_SAMPLE]
+            total += len(items) * sum(_deep_size(item) for item in sample) // len(sample)
+        else:
+            pending.extend(items)
+    return total
+
+
+class DatasetVersion:
+    """Immutable, fully parsed snapshot of one dataset file"""
+
+    def __init__(self, columns: Dict[str, Any], fields: Tuple[str, ...],
+                 source: str = "", version: int = 0, indexes: Optional[Dict[str, Any]] = None):
+        self.columns = columns
+        self.fields = fields
+        self.source = source
+        self.version = version
+        self._size = len(columns["id"])
+
+        # Where this version sits in the source file; ``parsed_bytes`` is None
+        # when the file cannot safely be extended by an append-only parse
+        self.signature: Optional[FileSignature] = None
+        self.header = b""
+        self.parsed_bytes: Optional[int] = None
+        # SHA-256 of bytes [0, parsed_bytes), to confirm a later append left
+        # everything already parsed untouched
+        self.prefix_digest = b""
+        # True when the columns are memory-mapped from a snapshot file
+        self.snapshot = False
+        # Rows and malformed lines seen by the parse that produced this version
+        self.load_report: Optional[LoadReport] = None
+
+        self._indexes: Dict[str, Any] = dict(indexes or {})
+        # Reentrant: an index may be derived from other indexes
+        self._index_lock = threading.RLock()
+        self._memory: Optional[int] = None
+        self._index_memory: Dict[str, int] = {}
+
+    @classmethod
+    def empty(cls, source: str = "", version: int = 0) -> "DatasetVersion":
+        columns = {field: [] for field in STRING_FIELDS}
+        columns.update({field: [] for field in NUMERIC_FIELDS})
+        return cls(columns, PERSON_FIELDS, source, version)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def extended(self, columns: Dict[str, Any], version: int) -> "DatasetVersion":
+        """New version with appended rows; this one stays valid for readers"""
+        merged = {}
+        for field, values in self.columns.items():
+            if field in NUMERIC_FIELDS:
+                merged[field] = np.concatenate([values, columns[field]])
+            else:
+                merged[field] = list(values) + list(columns[field])
+        extended = DatasetVersion(merged, self.fields, self.source, version)
+        for name, index in self._indexes.items():
+            if hasattr(index, "extended"):
+                extended._indexes[name] = index.extended(extended, self._size)
+        return extended
+
+    def memory_usage(self) -> int:
+        """Rough bytes held by this version's columns and built indexes
+
+        Memory-mapped columns and index arrays count at their mapped size
+        even though the kernel can page them out. Each part is measured
+        once, the indexes as they get built.
+        """
+        if self._memory is None:
+            total = 0
+            for values in self.columns.values():
+                if isinstance(values, list):
+                    total += sys.getsizeof(values) + sum(sys.getsizeof(value) for value in values)
+                else:
+                    total += getattr(values, "nbytes", 0)
+            self._memory = total
+        for name, index in list(self._indexes.items()):
+            if name not in self._index_memory:
+                self._index_memory[name] = _deep_size(index)
+        return self._memory + sum(self._index_memory.values())
+
+    def index(self, name: str) -> Any:
+        """Registered index for this version, built on first use"""
+        index = self._indexes.get(name)
+        if index is None:
+            with self._index_lock:
+                index = self._indexes.get(name)
+                if index is None:
+                    index = self._indexes[name] = INDEX_BUILDERS[name](self)
+        return index
+
+    def build_indexes(self) -> "DatasetVersion":
+        """Build every registered index up front, before the version is published"""
+        for name in INDEX_BUILDERS:
+            self.index(name)
+        return self
+
+    @property
+    def people(self) -> PeopleView:
+        return PeopleView(self)
+
+    def record(self, row: int) -> Mapping[str, Any]:
+        """Build the read-only person record for a row id"""
+        person = {}
+        for field in self.fields:
+            value = self.columns[field][row]
+            if field in NUMERIC_FIELDS:
+                value = int(value)
+            elif field == "tags":
+                value = tuple(tag.strip() for tag in value.split(",") if tag.strip())
+            person[field] = value
+        return MappingProxyType(person)
+
+
+class PeopleStore:
+    """Owns the current dataset version for one CSV file"""
+
+    def __init__(self, csv_path: str = DEFAULT_CSV_PATH, use_snapshots: bool = USE_SNAPSHOTS,
+                 progress: Optional[Callable[[LoadReport], None]] = None):
+        self.csv_path = csv_path
+        self.use_snapshots = use_snapshots
+        # Called after every parsed chunk of a full load
+        self.progress = progress
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._current: Optional[DatasetVersion] = None
+        self._versions = itertools.count(1)
+        self._watcher: Optional["DatasetWatcher"] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._current is not None
+
+    def memory_usage(self) -> int:
+        """Bytes held by the loaded version, 0 when nothing is loaded"""
+        current = self._current
+        return current.memory_usage() if current is not None else 0
+
+    @property
+    def current(self) -> DatasetVersion:
+        """Current version, loading it on first access"""
+        current = self._current
+        if current is None:
+            with self._lock:
+                if self._current is None:
+                    self._current = self._load()
+                current = self._current
+        return current
+
+    def reload(self) -> DatasetVersion:
+        """Re-parse the file and atomically replace the current version"""
+        with self._refresh_lock:
+            version = self._load()
+            self._swap(version)
+        return version
+
+    def refresh(self) -> bool:
+        """Catch up with the file if it changed since the current version
+
+        Appended rows are parsed on their own and merged into a new version;
+        any other change falls back to a full parse. Either way the new
+        version is swapped in atomically, so readers holding the old one are
+        unaffected. Returns True when a new version was published.
+
+        A missing file (an export mid-rewrite, or renamed away) and a full
+        parse of a file that changed while it was read leave the current
+        version in place; the next poll tries again. An unloaded store is
+        left alone, since its next read loads the file as it is then.
+        """
+        with self._refresh_lock:
+            current = self._current
+            if current is None:
+                return False
+            signature = file_signature(self.csv_path)
+            if signature == current.signature or signature is None:
+                return False
+            version = self._load_appended(current, signature)
+            if version is None:
+                version = self._load()
+                if version is not current and version.signature != file_signature(self.csv_path):
+                    return False
+            if version is current:
+                return False
+            self._swap(version)
+            return True
+
+    def watch(self, interval: float = WATCH_INTERVAL) -> "DatasetWatcher":
+        """Start (once) a background thread that keeps this store fresh"""
+        with self._lock:
+            if self._watcher is None or not self._watcher.is_alive():
+                self._watcher = DatasetWatcher(self, interval)
+                self._watcher.start()
+            return self._watcher
+
+    def unload(self):
+        """Drop the current version and stop watching; the next read reloads
+
+        Readers already holding the old version keep using it. A refresh
+        in flight finishes first, so it cannot swap its version back in.
+        """
+        with self._refresh_lock, self._lock:
+            if self._watcher is not None:
+                self._watcher.stop()
+                self._watcher = None
+            self._current = None
+
+    def _swap(self, version: DatasetVersion):
+        with self._lock:
+            self._current = version
+
+    def _load(self) -> DatasetVersion:
+        number = next(self._versions)
+        before = file_signature(self.csv_path)
+        if before is None:
+            # Keep serving the last good version until the file is back
+            if self._current is not None:
+                return self._current
+            return DatasetVersion.empty(self.csv_path, number)
+
+        version = self._load_snapshot(number, before)
+        if version is None:
+            try:
+                columns, fields, report = load_columns(self.csv_path, self.progress)
+            except Exception as e:
+                print(f"Error loading CSV: {e}", file=sys.stderr)
+                if self._current is not None:
+                    return self._current
+                return DatasetVersion.empty(self.csv_path, number)
+            if report.bad_row_count or not report.complete:
+                print(f"Loaded {report.summary()}: {report.bad_rows[:5]}", file=sys.stderr)
+            version = DatasetVersion(columns, fields, self.csv_path, number).build_indexes()
+            version.load_report = report
+
+        version.signature = before
+        # Only remember the parse position if the file held still while we
+        # read it, was read to the end and ends on a row boundary; otherwise
+        # the next change needs a full parse
+        complete = version.load_report is None or version.load_report.complete
+        if complete and file_signature(self.csv_path) == before:
+            with open(self.csv_path, "rb") as handle:
+                version.header = handle.readline()
+                handle.seek(max(0, before.size - 1))
+                digest = _prefix_hash(handle, before.size) if handle.read(1) == b"\n" else None
+            if digest is not None and file_signature(self.csv_path) == before:
+                version.parsed_bytes = before.size
+                version.prefix_digest = digest.digest()
+            if self.use_snapshots and not version.snapshot:
+                self._write_snapshot(version, before)
+        return version
+
+    def _load_snapshot(self, number: int, signature: FileSignature) -> Optional[DatasetVersion]:
+        """Memory-map a current snapshot; remaining indexes build in the background"""
+        if not self.use_snapshots:
+            return None
+        try:
+            loaded = snapshot.load_snapshot(self.csv_path, signature)
+        except Exception as e:
+            print(f"Error reading snapshot for {self.csv_path}: {e}", file=sys.stderr)
+            return None
+        if loaded is None:
+            return None
+        columns, fields, indexes = loaded
+        version = DatasetVersion(columns, fields, self.csv_path, number, indexes)
+        version.snapshot = True
+        threading.Thread(target=version.build_indexes, name="people-index-warmup", daemon=True).start()
+        return version
+
+    def _write_snapshot(self, version: DatasetVersion, signature: FileSignature):
+        try:
+            source = snapshot.source_info(self.csv_path, signature)
+            if file_signature(self.csv_path) == signature:
+                snapshot.write_snapshot(version, self.csv_path, source)
+        except OSError as e:
+            print(f"Could not write snapshot for {self.csv_path}: {e}", file=sys.stderr)
+
+    def _load_appended(self, current: DatasetVersion,
+                       signature: Optional[FileSignature]) -> Optional[DatasetVersion]:
+        """Parse only rows appended after ``current``, None if not possible"""
+        if (signature is None or current.signature is None or current.parsed_bytes is None
+                or signature.inode != current.signature.inode
+                or signature.size <= current.parsed_bytes):
+            return None
+        start = current.parsed_bytes
+        try:
+            with open(self.csv_path, "rb") as handle:
+                # An exporter rewriting in place keeps the inode, so every
+                # parsed byte is re-hashed; far cheaper than parsing them
+                digest = _prefix_hash(handle, start)
+                if digest.digest() != current.prefix_digest:
+                    return None
+                appended = handle.read(signature.size - start)
+        except OSError:
+            return None
+
+        # Leave a partially written last row for the next pass
+        complete = appended[:appended.rfind(b"\n") + 1]
+        if not complete:
+            return current
+        try:
+            columns, fields, report = read_columns(io.BytesIO(current.header + complete))
+        except Exception as e:
+            print(f"Error loading appended CSV rows: {e}", file=sys.stderr)
+            return None
+        if fields != current.fields or not report.complete:
+            return None
+        if report.bad_row_count:
+            print(f"Appended {report.summary()}: {report.bad_rows[:5]}", file=sys.stderr)
+
+        version = current.extended(columns, next(self._versions)).build_indexes()
+        version.header = current.header
+        version.parsed_bytes = start + len(complete)
+        digest.update(complete)
+        version.prefix_digest = digest.digest()
+        if version.parsed_bytes == signature.size:
+            version.signature = signature
+        else:
+            version.signature = FileSignature(signature.inode, version.parsed_bytes, 0)
+        return version
+
+
+class DatasetWatcher(threading.Thread):
+    """Polls a store's file for size/mtime changes and refreshes it"""
+
+    def __init__(self, store: PeopleStore, interval: float = WATCH_INTERVAL):
+        super().__init__(name=f"people-watcher:{os.path.basename(store.csv_path)}", daemon=True)
+        self.store = store
+        self.interval = interval
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.store.refresh()
+            except Exception as e:
+                print(f"Error refreshing {self.store.csv_path}: {e}", file=sys.stderr)
+
+    def stop(self):
+        self._stop_event.set()
+
+
+_stores: Dict[str, PeopleStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(csv_path: str = DEFAULT_CSV_PATH) -> PeopleStore:
+    """Process-wide store for a CSV path, shared by the MCP server and chatbot"""
+    key = os.path.abspath(csv_path)
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = _stores[key] = PeopleStore(csv_path)
+        return store
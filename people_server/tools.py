@@ -0,0 +1,609 @@
+"""Tool registry shared by the MCP server and the chatbot
+
+Each tool is registered once with its JSON schema. The schema is compiled
+into an argument validator at registration time. Every call goes through
+``call_tool``, which validates the arguments, runs the handler, and records
+wall time plus rows scanned and returned for that tool.
+
+Only the registry lives here at import time: the data modules (and
+pandas, NumPy and rapidfuzz behind them) load on the first dataset call,
+so listing tools and answering ``ping`` stay cheap.
+
+Results of dataset tools are memoised on the tool name, the validated
+arguments and the dataset version they were computed from. A reload or
+append publishes a new version, so stale results can never be served and
+are dropped the first time the new version is seen.
+
+Row results carry the rows once. The MCP server sends them as compact
+structured content, optionally projected onto ``fields``; the readable
+text is rendered only for callers that ask for it.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+
+if TYPE_CHECKING:
+    from .registry import DatasetRegistry
+    from .store import DatasetVersion
+
+# Recent latencies kept per tool for the percentiles in ``tool_stats``
+LATENCY_WINDOW = 1024
+# Results kept by the tool-result cache; 0 disables it
+RESULT_CACHE_SIZE = int(os.getenv("PEOPLE_TOOL_CACHE_SIZE", "1024"))
+# Largest roster ``get_people_batch`` resolves in one call
+MAX_BATCH_NAMES = 5000
+
+
+class ToolError(ValueError):
+    """A call that cannot be answered: bad arguments or an unknown target"""
+
+
+class ToolResult:
+    """Uniform outcome of a tool call
+
+    ``summary`` is the headline; ``details`` renders the rest of the
+    readable text on first use of ``text``. ``rows`` are the records
+    returned (``data`` itself when it is a list) and ``meta`` any other
+    values for the structured form.
+
+    Results may be shared between callers through the result cache, so
+    treat them as read-only.
+    """
+
+    def __init__(self, summary: str, data: Any = None, rows_scanned: int = 0,
+                 rows_returned: int = 0, is_error: bool = False,
+                 details: Optional[Callable[[], str]] = None,
+                 rows: Optional[List[Dict[str, Any]]] = None,
+                 meta: Optional[Dict[str, Any]] = None):
+        self.summary = summary
+        self.data = data
+        self.rows_scanned = rows_scanned
+        self.rows_returned = rows_returned
+        self.is_error = is_error
+        self.rows = rows if rows is not None or not isinstance(data, list) else data
+        self.meta = meta or {}
+        self._details = details
+        self._text: Optional[str] = None if details else summary
+
+    @classmethod
+    def error(cls, text: str) -> "ToolResult":
+        return cls(text, is_error=True)
+
+    @property
+    def text(self) -> str:
+        """Readable rendering, built once per result"""
+        if self._text is None:
+            self._text = self.summary + self._details()
+        return self._text
+
+    def structured(self, fields: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+        """Headline, metadata and rows, each row projected onto ``fields``"""
+        content = {"summary": self.summary.strip(), **self.meta}
+        if self.rows is None:
+            return content
+        # Records are read-only views; the transport needs plain dicts
+        if fields:
+            unknown = [field for field in fields if self.rows and field not in self.rows[0]]
+            if unknown:
+                raise ToolError(f"Unknown field(s): {', '.join(unknown)}")
+            rows = [{field: row[field] for field in fields} for row in self.rows]
+        else:
+            rows = [dict(row) for row in self.rows]
+        content["count"] = len(rows)
+        content["rows"] = rows
+        return content
+
+
+def _integer(name: str, value: Any) -> int:
+    if isinstance(value, bool):
+        raise ToolError(f"{name} must be an integer")
+    if isinstance(value, int):
+        return value
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, str):
+        try:
+            return int(value.strip().replace(",", ""))
+        except ValueError:
+            pass
+    raise ToolError(f"{name} must be an integer")
+
+
+def _string(name: str, value: Any) -> str:
+    if isinstance(value, str):
+        return value.strip()
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return str(value)
+    raise ToolError(f"{name} must be a string")
+
+
+def _strings(name: str, value: Any) -> Tuple[str, ...]:
+    # A tuple keeps validated arguments hashable for the result cache; any
+    # sequence is accepted since Gemini passes arrays as protobuf containers
+    if isinstance(value, str):
+        value = [value]
+    try:
+        items = tuple(value)
+    except TypeError:
+        raise ToolError(f"{name} must be a list of strings") from None
+    return tuple(item for item in (_string(name, item) for item in items) if item)
+
+
+_CONVERTERS: Dict[str, Callable[[str, Any], Any]] = {"integer": _integer, "string": _string, "array": _strings}
+
+
+def compile_validator(schema: Dict[str, Any]) -> Callable[[Dict[str, Any]], Dict[str, Any]]:
+    """Validator for a JSON object schema
+
+    Values are converted to the declared type, checked against ``enum``
+    and ``minimum``, clamped to ``maximum`` and defaulted. Unknown arguments
+    are dropped and ``None`` counts as not given.
+    """
+    required = tuple(schema.get("required", ()))
+    checks: List[Tuple[str, Callable, Optional[Tuple], Optional[int], Optional[int], Any]] = []
+    for name, spec in schema.get("properties", {}).items():
+        choices = tuple(spec["enum"]) if "enum" in spec else None
+        checks.append((name, _CONVERTERS[spec["type"]], choices, spec.get("minimum"),
+                       spec.get("maximum"), spec.get("default")))
+
+    def validate(arguments: Dict[str, Any]) -> Dict[str, Any]:
+        validated = {}
+        for name, convert, choices, minimum, maximum, default in checks:
+            value = arguments.get(name)
+            if value is None:
+                if default is not None:
+                    validated[name] = default
+                continue
+            value = convert(name, value)
+            if choices is not None and value not in choices:
+                raise ToolError(f"{name} must be one of: {', '.join(choices)}")
+            if minimum is not None and value < minimum:
+                raise ToolError(f"{name} must be at least {minimum}")
+            if maximum is not None and value > maximum:
+                value = maximum
+            validated[name] = value
+        missing = [name for name in required if validated.get(name) in (None, "", ())]
+        if missing:
+            raise ToolError(f"Missing required argument(s): {', '.join(missing)}")
+        return validated
+
+    return validate
+
+
+Handler = Callable[[Optional["DatasetVersion"], Dict[str, Any]], ToolResult]
+
+
+def published_schema(schema: Dict[str, Any]) -> Dict[str, Any]:
+    """Schema as clients see it, with each ``maximum`` turned into a note
+
+    MCP clients and the SDK reject values above a published maximum, while
+    the validator clamps them, so the cap is only described.
+    """
+    properties = {}
+    for name, spec in schema.get("properties", {}).items():
+        if "maximum" in spec:
+            cap = spec["maximum"]
+            spec = {key: value for key, value in spec.items() if key != "maximum"}
+            spec["description"] = f"{spec.get('description', name)} (larger values are capped at {cap})"
+        properties[name] = spec
+    return dict(schema, properties=properties)
+
+
+class Tool:
+    """A registered tool: schema, compiled validator and handler
+
+    ``input_schema`` is the published form of the schema the validator was
+    compiled from. Handlers of dataset tools receive the resolved dataset
+    version. Their results depend only on it and the arguments, which makes
+    them cacheable.
+    """
+
+    def __init__(self, name: str, description: str, input_schema: Dict[str, Any],
+                 handler: Handler, uses_dataset: bool = True):
+        self.name = name
+        self.description = description
+        self.input_schema = published_schema(input_schema)
+        self.handler = handler
+        self.uses_dataset = uses_dataset
+        self.validate = compile_validator(input_schema)
+
+
+TOOLS: Dict[str, Tool] = {}
+
+DATASET = {
+    "type": "string",
+    "description": "Dataset to search, e.g. 'employees' or 'students' (default: the primary dataset)"
+}
+FIELDS = {
+    "type": "array",
+    "items": {"type": "string"},
+    "description": "Columns to return for each person, e.g. ['full_name', 'email'] (default: all)"
+}
+FORMAT = {
+    "type": "string",
+    "enum": ["structured", "text", "both"],
+    "description": "'structured' returns the rows as structured content under a one-line summary, "
+                   "'text' a readable listing only, 'both' the two together (default: structured)"
+}
+# Arguments that only shape the response, not which rows are found
+PRESENTATION_ARGS = ("fields", "format")
+
+
+def tool(name: str, description: str, properties: Optional[Dict[str, Any]] = None,
+         required: Tuple[str, ...] = (), uses_dataset: bool = True):
+    """Register the decorated function as a tool
+
+    Dataset tools get the ``dataset``, ``fields`` and ``format`` arguments
+    added to their schema.
+    """
+    properties = dict(properties or {})
+    if uses_dataset:
+        properties.update(dataset=DATASET, fields=FIELDS, format=FORMAT)
+    schema = {"type": "object", "properties": properties, "required": list(required)}
+
+    def register(handler):
+        TOOLS[name] = Tool(name, description, schema, handler, uses_dataset)
+        return handler
+
+    return register
+
+
+class ResultCache:
+    """Thread-safe LRU of tool results keyed on arguments and dataset version
+
+    Keys are ``(tool, arguments, source, version)``. Seeing a newer version
+    of a source drops every entry computed from its older versions.
+    """
+
+    def __init__(self, max_size: int = RESULT_CACHE_SIZE):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._entries: "OrderedDict[Hashable, ToolResult]" = OrderedDict()
+        self._versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(name: str, arguments: Dict[str, Any], version: "DatasetVersion") -> Hashable:
+        # The dataset argument is already captured by the version's source,
+        # and every presentation of a result is served from the same entry
+        canonical = tuple(sorted((k, v) for k, v in arguments.items()
+                                 if k != "dataset" and k not in PRESENTATION_ARGS))
+        return name, canonical, version.source, version.version
+
+    def _observe(self, source: str, version: int):
+        """Drop entries for older versions of ``source``; call with the lock held"""
+        latest = self._versions.get(source)
+        if latest is not None and latest >= version:
+            return
+        self._versions[source] = version
+        if latest is None:
+            return
+        stale = [key for key in self._entries if key[2] == source and key[3] < version]
+        for key in stale:
+            del self._entries[key]
+        self.invalidations += len(stale)
+
+    def get(self, key: Hashable) -> Optional[ToolResult]:
+        with self._lock:
+            self._observe(key[2], key[3])
+            result = self._entries.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return result
+
+    def put(self, key: Hashable, result: ToolResult):
+        if self.max_size <= 0 or result.is_error:
+            return
+        with self._lock:
+            self._observe(key[2], key[3])
+            if self._versions[key[2]] != key[3]:
+                return
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "invalidations": self.invalidations,
+            }
+
+
+result_cache = ResultCache()
+
+
+class ToolStats:
+    """Call counts, latency and row counts for one tool"""
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.cache_hits = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.rows_scanned = 0
+        self.rows_returned = 0
+        self.recent_ms = deque(maxlen=LATENCY_WINDOW)
+
+    def record(self, result: ToolResult, elapsed_ms: float, cached: bool = False):
+        self.calls += 1
+        self.errors += result.is_error
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        if cached:
+            self.cache_hits += 1
+        else:
+            self.rows_scanned += result.rows_scanned
+        self.rows_returned += result.rows_returned
+        self.recent_ms.append(elapsed_ms)
+
+    def summary(self) -> Dict[str, Any]:
+        recent = sorted(self.recent_ms)
+
+        def percentile(fraction):
+            return round(recent[min(len(recent) - 1, int(fraction * len(recent)))], 3) if recent else 0.0
+
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "cache_hits": self.cache_hits,
+            "avg_ms": round(self.total_ms / self.calls, 3) if self.calls else 0.0,
+            "p50_ms": percentile(0.5),
+            "p95_ms": percentile(0.95),
+            "max_ms": round(self.max_ms, 3),
+            "rows_scanned": self.rows_scanned,
+            "rows_returned": self.rows_returned,
+        }
+
+
+_stats: Dict[str, ToolStats] = {}
+_stats_lock = threading.Lock()
+
+
+def get_registry() -> "DatasetRegistry":
+    """The process-wide dataset registry, importing the data modules on first use"""
+    from .registry import get_registry as registry
+    return registry()
+
+
+def tool_stats() -> Dict[str, Dict[str, Any]]:
+    """Per-tool accounting since start-up"""
+    with _stats_lock:
+        return {name: stats.summary() for name, stats in _stats.items()}
+
+
+def call_tool(name: str, arguments: Optional[Dict[str, Any]] = None) -> ToolResult:
+    """Validate, dispatch and account for one tool call
+
+    Bad arguments, unknown tools and unknown datasets come back as error
+    results; any other exception is counted and re-raised. Dataset tools
+    are answered from ``result_cache`` when the same arguments were seen
+    for the current dataset version.
+    """
+    return run_tool(name, arguments)[0]
+
+
+def run_tool(name: str, arguments: Optional[Dict[str, Any]] = None) -> Tuple[ToolResult, Dict[str, Any]]:
+    """``call_tool`` plus the validated arguments, for presenting the result
+
+    ``fields`` are checked against the dataset's columns here, so an
+    unknown one is an error result even when no rows match.
+    """
+    spec = TOOLS.get(name)
+    if spec is None:
+        return ToolResult.error(f"Unknown tool: {name}"), {}
+
+    start = time.perf_counter()
+    failed = None
+    cached = False
+    args: Dict[str, Any] = {}
+    try:
+        args = spec.validate(arguments or {})
+        if spec.uses_dataset:
+            version = get_registry().current(args.get("dataset"))
+            unknown = [field for field in args.get("fields", ()) if field not in version.fields]
+            if unknown:
+                raise ToolError(f"Unknown field(s): {', '.join(unknown)}")
+            key = result_cache.key(name, args, version)
+            result = result_cache.get(key)
+            cached = result is not None
+            if result is None:
+                result = spec.handler(version, args)
+                result_cache.put(key, result)
+        else:
+            result = spec.handler(None, args)
+    except ValueError as e:
+        result = ToolResult.error(str(e))
+    except Exception as e:
+        result = ToolResult.error(f"Error: {e}")
+        failed = e
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    with _stats_lock:
+        _stats.setdefault(name, ToolStats()).record(result, elapsed_ms, cached)
+    if failed is not None:
+        raise failed
+    return result, args
+
+
+@tool("ping", "Health check - returns pong with timestamp", uses_dataset=False)
+def ping(version: Optional["DatasetVersion"], args: Dict[str, Any]) -> ToolResult:
+    timestamp = datetime.now().isoformat()
+    return ToolResult(f"pong - {timestamp}", {"timestamp": timestamp}, meta={"timestamp": timestamp})
+
+
+@tool("get_person_exact", "Find people with exact name match (case-insensitive)", {
+    "name": {"type": "string", "description": "Name to search for"},
+}, required=("name",))
+def get_person_exact(version: "DatasetVersion", args: Dict[str, Any]) -> ToolResult:
+    rows = version.index("exact").lookup(args["name"])
+    matches = [version.record(row) for row in rows]
+
+    if not matches:
+        return ToolResult(f"No employee found with exact name '{args['name']}'", [], len(rows))
+
+    def details():
+        result_text = ":\n\n"
+        for person in matches:
+            result_text += f"- {person['full_name']} (ID: {person['id']}) - {person['role']} in {person['department']}\n"
+            result_text += f"  Email: {person['email']} | Phone: {person['phone']}\n\n"
+        return result_text
+
+    return ToolResult(f"Found {len(matches)} exact match(es) for '{args['name']}'", matches,
+                      len(rows), len(matches), details=details)
+
+
+@tool("get_person_fuzzy", "Find people with fuzzy/typo-tolerant name search", {
+    "name": {"type": "string", "description": "Name to search for (may contain typos)"},
+    "maxResults": {"type": "integer", "description": "Maximum number of results to return",
+                   "default": 5, "minimum": 1, "maximum": 50},
+}, required=("name",))
+def get_person_fuzzy(version: "DatasetVersion", args: Dict[str, Any]) -> ToolResult:
+    from .fuzzy import fuzzy_search_people
+    results = fuzzy_search_people(version.people, args["name"], args["maxResults"])
+    matches = results["candidates"]
+    scanned = results.pop("scanned")
+    # Each person once, with the scores alongside rather than wrapped around them
+    rows = [candidate["person"] for candidate in matches]
+    meta = {"query": results["query"], "best_match": results["best_match"],
+            "similarity": [candidate["similarity"] for candidate in matches]}
+
+    if not matches:
+        return ToolResult(f"No employees found with name '{args['name']}'", results, scanned,
+                          rows=rows, meta=meta)
+
+    def details():
+        best = matches[0]["similarity"]
+        result_text = ":\n"
+        if best > 0.85:
+            result_text += "High confidence match - likely the intended person.\n"
+        elif best < 0.6:
+            result_text += "Low confidence - no close match found.\n"
+        result_text += "\n"
+
+        for i, candidate in enumerate(matches, 1):
+            person = candidate["person"]
+            result_text += f"{i}. {person['full_name']} (ID: {person['id']}, similarity: {candidate['similarity']:.2f})\n"
+            result_text += f"   Role: {person['role']} | Department: {person['department']}\n"
+            result_text += f"   Email: {person['email']} | Phone: {person['phone']}\n\n"
+        return result_text
+
+    return ToolResult(f"Found {len(matches)} employee(s) with '{args['name']}'", results, scanned,
+                      len(matches), details=details, rows=rows, meta=meta)
+
+
+@tool("list_people", "List people filtered by department, role, location, education, salary and/or age, highest paid first", {
+    "department": {"type": "string", "description": "Filter by department"},
+    "role": {"type": "string", "description": "Filter by role"},
+    "location": {"type": "string", "description": "Filter by location"},
+    "education": {"type": "string", "description": "Filter by education level"},
+    "min_salary": {"type": "integer", "description": "Minimum salary"},
+    "max_salary": {"type": "integer", "description": "Maximum salary"},
+    "min_age": {"type": "integer", "description": "Minimum age"},
+    "max_age": {"type": "integer", "description": "Maximum age"},
+    "limit": {"type": "integer", "description": "Maximum number of results",
+              "default": 10, "minimum": 1, "maximum": 200},
+})
+def list_people(version: "DatasetVersion", args: Dict[str, Any]) -> ToolResult:
+    from .query import find_people
+    result = find_people(version, args, args["limit"])
+    filtered_people = [version.record(row) for row in result.rows.tolist()]
+
+    if not filtered_people:
+        return ToolResult("No employees found matching the criteria", [], result.scanned)
+
+    filters_used = []
+    for key in ("department", "role", "location", "education"):
+        if args.get(key): filters_used.append(f"{key}: {args[key]}")
+    if args.get("min_salary"): filters_used.append(f"salary >= ${args['min_salary']}")
+    if args.get("max_salary"): filters_used.append(f"salary <= ${args['max_salary']}")
+    if args.get("min_age"): filters_used.append(f"age >= {args['min_age']}")
+    if args.get("max_age"): filters_used.append(f"age <= {args['max_age']}")
+
+    filter_text = f" with filters: {', '.join(filters_used)}" if filters_used else ""
+    summary = f"Found {result.matched} employees{filter_text}"
+    if result.matched > len(filtered_people):
+        summary += f", showing the top {len(filtered_people)} by salary"
+
+    def details():
+        result_text = ":\n\n"
+        for i, person in enumerate(filtered_people, 1):
+            result_text += f"{i}. {person['full_name']} (ID: {person['id']})\n"
+            result_text += f"   Role: {person['role']} | Department: {person['department']}\n"
+            if "salary" in person:
+                result_text += f"   Age: {person.get('age', 0)}, Salary: ${person['salary']:,}\n"
+            if "education" in person:
+                result_text += f"   Education: {person['education']}\n"
+            if "salary" not in person:
+                result_text += f"   Location: {person['location']}\n"
+            result_text += "\n"
+        return result_text
+
+    return ToolResult(summary, filtered_people, result.scanned, len(filtered_people),
+                      details=details, meta={"matched": result.matched})
+
+
+@tool("get_people_batch", "Resolve a list of names (e.g. an attendee roster) with typo-tolerant matching, "
+      "returning the best candidates for each name", {
+    "names": {"type": "array", "items": {"type": "string"}, "description": "Names to resolve"},
+    "maxResults": {"type": "integer", "description": "Maximum number of candidates per name",
+                   "default": 3, "minimum": 1, "maximum": 10},
+}, required=("names",))
+def get_people_batch(version: "DatasetVersion", args: Dict[str, Any]) -> ToolResult:
+    from .fuzzy import fuzzy_search_batch
+    names = args["names"]
+    if len(names) > MAX_BATCH_NAMES:
+        raise ToolError(f"At most {MAX_BATCH_NAMES} names per call")
+    people = version.people
+    results = fuzzy_search_batch(people, names, args["maxResults"])
+
+    # Each person once in the structured rows; per-name matches point into
+    # them by dataset row, since ids need not be unique
+    rows, positions, matches = [], {}, []
+    for name, result in zip(names, results):
+        found = []
+        for candidate in result["candidates"]:
+            if candidate["row"] not in positions:
+                positions[candidate["row"]] = len(rows)
+                rows.append(candidate["person"])
+            found.append(positions[candidate["row"]])
+        matches.append({"name": name, "best_match": result["best_match"], "rows": found,
+                        "similarity": [candidate["similarity"] for candidate in result["candidates"]]})
+    resolved = sum(result["best_match"] is not None for result in results)
+
+    def details():
+        result_text = ":\n\n"
+        for name, result in zip(names, results):
+            candidates = result["candidates"]
+            if not candidates:
+                result_text += f"- '{name}': no match\n"
+                continue
+            best = candidates[0]
+            person = best["person"]
+            result_text += f"- '{name}' -> {person['full_name']} (ID: {person['id']}, similarity: {best['similarity']:.2f})\n"
+            others = [f"{c['matched_name']} ({c['similarity']:.2f})" for c in candidates[1:]]
+            if others:
+                result_text += f"   Also: {', '.join(others)}\n"
+        return result_text
+
+    return ToolResult(f"Resolved {resolved} of {len(names)} name(s)", results, len(people), len(rows),
+                      details=details, rows=rows, meta={"matches": matches})
@@ -1,27 +1,46 @@
-import pandas as pd
 import os
+import sys
 
-def load_employee_data():
-    """Load employee data from CSV"""
+from people_server.csv_data import LoadReport, iter_chunks
+
+CHUNK_ROWS = 100000
+COLUMNS = ['Employee_number', 'Employee_name', 'Role', 'Department', 'Employee_age', 'Current_Salary']
+
+def _reported_chunks(csv_path, chunk_rows):
+    """Chunks of the CSV, reporting each chunk's malformed rows on stderr"""
+    with open(csv_path, "rb") as handle:
+        report = LoadReport(csv_path)
+        reported = 0
+        for chunk, _ in iter_chunks(handle, chunk_rows, report):
+            report.chunks += 1
+            if report.bad_row_count > reported:
+                print(f"Chunk {report.chunks} of {csv_path}: skipped {report.bad_row_count - reported} "
+                      f"malformed rows: {report.bad_rows[reported:reported + 5]}", file=sys.stderr)
+                reported = report.bad_row_count
+            yield chunk[COLUMNS]
+
+def load_employee_data(chunk_rows=CHUNK_ROWS):
+    """Stream employee data from CSV in chunks, None if the file is missing"""
     csv_path = "data/Employee_Complete_Dataset.csv"
     if os.path.exists(csv_path):
-        df = pd.read_csv(csv_path)
-        return df
+        # Malformed lines are skipped and reported instead of failing the read
+        return _reported_chunks(csv_path, chunk_rows)
     return None
 
-def search_employees(query):
+def search_employees(query, limit=5):
     """Search employees by name"""
-    df = load_employee_data()
-    if df is None:
+    chunks = load_employee_data()
+    if chunks is None:
         return []
     
     query = query.lower().strip()
     results = []
     
-    # Search in Employee_name column
-    for _, row in df.iterrows():
-        name = str(row['Employee_name']).lower()
-        if query in name:
+    # Match a whole chunk of Employee_name values at once and stop reading
+    # as soon as enough matches are found
+    for chunk in chunks:
+        names = chunk['Employee_name'].astype(str).str.lower()
+        for _, row in chunk[names.str.contains(query, regex=False)].iterrows():
             results.append({
                 'id': row['Employee_number'],
                 'name': row['Employee_name'],
@@ -30,8 +49,11 @@ def search_employees(query):
                 'age': row['Employee_age'],
                 'salary': row['Current_Salary']
             })
+        if len(results) >= limit:
+            chunks.close()
+            break
     
-    return results[:5]  # Return top 5 matches
+    return results[:limit]  # Return top matches
 
 # Test the search
 if __name__ == "__main__":
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""Test resolving a roster of names in one pass"""
+
+import asyncio
+import os
+import random
+import shutil
+import string
+import sys
+import tempfile
+import threading
+import time
+
+import people_server.tools as tools_module
+from people_server import fuzzy
+from people_server.data import get_people_data
+from people_server.fuzzy import NameIndex, fuzzy_search_batch, fuzzy_search_people
+from people_server.phonetic import PhoneticIndex
+from people_server.registry import DatasetRegistry
+from people_server.tools import call_tool, get_registry
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "chatbot"))
+
+
+def test_batch_matches_single_searches():
+    people = get_people_data()
+    queries = ["Ayshu", "Prya", "Rahool", "Wikram Sing", "Mike", "zzzz", "", "Prya"]
+    for query, result in zip(queries, fuzzy_search_batch(people, queries, 3)):
+        single = fuzzy_search_people(people, query, 3)
+        single.pop("scanned")
+        assert result == single, (query, result, single)
+    print("[OK] Batch results equal one fuzzy search per name")
+
+
+def test_roster_scored_in_bulk():
+    random.seed(7)
+
+    def word():
+        return "".join(random.choice(string.ascii_lowercase) for _ in range(random.randint(3, 8))).title()
+
+    firsts, lasts = [word() for _ in range(300)], [word() for _ in range(800)]
+    full_names = [f"{random.choice(firsts)} {random.choice(lasts)}" for _ in range(5000)]
+    preferred_names = [name.split()[0] for name in full_names]
+    index = NameIndex.build(full_names, preferred_names)
+    phonetic = PhoneticIndex.build(full_names, preferred_names)
+    queries = [random.choice(full_names)[:-1] for _ in range(900)] + [random.choice(firsts) for _ in range(100)]
+
+    calls = []
+    original = fuzzy.process.cpdist
+
+    def counting(*args, **kwargs):
+        calls.append(kwargs["workers"])
+        return original(*args, **kwargs)
+
+    fuzzy.process.cpdist = counting
+    try:
+        batch = index.search_batch(queries, 3, phonetic=phonetic)
+    finally:
+        fuzzy.process.cpdist = original
+
+    # A few bulk scoring calls per block of names, not one search per name
+    assert len(calls) <= 4 * 4 and -1 in calls, calls
+    assert batch == [index.search(query, 3, phonetic=phonetic) for query in queries]
+    print(f"[OK] 1000 names scored in {len(calls)} bulk calls")
+
+
+def test_duplicate_ids_kept_apart():
+    data_dir = tempfile.mkdtemp()
+    with open(os.path.join(data_dir, "roster.csv"), "w") as handle:
+        # No id column: every row gets id 0
+        handle.write("full_name,preferred_name,role,department\n"
+                     "Ann Lee,Ann,Manager,Sales\nBob Stone,Bob,Developer,Engineering\n")
+    registry = DatasetRegistry(data_dir, default_primary="roster.csv")
+    original = tools_module.get_registry
+    tools_module.get_registry = lambda: registry
+    try:
+        result = call_tool("get_people_batch", {"names": ["Ann Lee", "Bob Stone"]})
+        content = result.structured(["full_name"])
+        assert [m["rows"] for m in content["matches"]] == [[0], [1]]
+        assert [row["full_name"] for row in content["rows"]] == ["Ann Lee", "Bob Stone"]
+    finally:
+        tools_module.get_registry = original
+        shutil.rmtree(data_dir)
+    print("[OK] People sharing an id matched to their own rows")
+
+
+def test_batch_tool_and_client():
+    result = call_tool("get_people_batch", {"names": ["Mike", "Rahool", "Mike", "nobody at all"],
+                                            "dataset": "employees"})
+    assert result.summary.startswith("Resolved ") and result.rows_scanned == len(get_registry().current("employees").people)
+    content = result.structured(["id", "full_name"])
+    matches = content["matches"]
+    assert [m["name"] for m in matches] == ["Mike", "Rahool", "Mike", "nobody at all"]
+    assert matches[0] == matches[2] and matches[3]["rows"] == []
+    # People found for several names are sent once
+    ids = [row["id"] for row in content["rows"]]
+    assert len(ids) == len(set(ids)) == result.rows_returned
+    assert call_tool("get_people_batch", {"names": []}).is_error
+
+    # Importing the app opens nothing on disk until it starts serving
+    import app
+
+    client = app.MCPClient()
+    batch = asyncio.run(client.get_people_batch(["Mike", "Rahool"], max_results=1, dataset="employees"))
+    assert not batch.is_error and all(len(m["rows"]) <= 1 for m in batch.meta["matches"])
+    assert "'Mike' -> " in batch.text
+
+    # Tools run off the event loop
+    threads = []
+    client.dispatch = lambda name, arguments: threads.append(threading.get_ident()) or call_tool(name, arguments)
+
+    async def loop_thread():
+        await client.call_tool_result("get_people_batch", {"names": ["Mike"], "dataset": "employees"})
+        return threading.get_ident()
+
+    assert asyncio.run(loop_thread()) not in threads
+    print("[OK] get_people_batch served by the tool registry and MCPClient")
+
+
+def test_roster_does_not_hold_up_the_server():
+    from people_server.main import handle_call_tool
+
+    random.seed(11)
+    names = ["".join(random.choice(string.ascii_lowercase) for _ in range(7)) for _ in range(5000)]
+    finished = []
+
+    async def call(name, arguments):
+        await handle_call_tool(name, arguments)
+        finished.append(name)
+
+    async def run():
+        roster = asyncio.ensure_future(call("get_people_batch", {"names": names, "dataset": "employees"}))
+        await asyncio.sleep(0.05)
+        start = time.perf_counter()
+        await call("ping", {})
+        waited = time.perf_counter() - start
+        await roster
+        return waited
+
+    waited = asyncio.run(run())
+    assert finished == ["ping", "get_people_batch"], finished
+    print(f"[OK] ping answered in {waited * 1000:.0f}ms while a 5000-name roster was resolved")
+
+
+if __name__ == "__main__":
+    test_batch_matches_single_searches()
+    test_roster_scored_in_bulk()
+    test_duplicate_ids_kept_apart()
+    test_batch_tool_and_client()
+    test_roster_does_not_hold_up_the_server()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""Test streamed replies over the chat WebSocket"""
+
+import os
+import shutil
+import sys
+import tempfile
+
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "chatbot"))
+
+
+def test_stream_sends_deltas_then_response():
+    # The app keeps chat_history.db in the working directory
+    cwd = os.getcwd()
+    workdir = tempfile.mkdtemp()
+    os.chdir(workdir)
+    try:
+        import app
+
+        async def fake_stream(message, mcp_client):
+            for piece in ("Found ", "2 ", "people"):
+                yield piece
+
+        with TestClient(app.app) as client:
+            app.llm_client.stream_message = fake_stream
+            with client.websocket_connect("/ws/stream-test") as ws:
+                assert ws.receive_json()["type"] == "history"
+                ws.send_json({"message": "managers", "stream": True})
+                frames = [ws.receive_json() for _ in range(4)]
+            saved = app.get_chat_history("stream-test")
+
+        assert [f["type"] for f in frames] == ["delta", "delta", "delta", "response"]
+        assert "".join(f["data"]["text"] for f in frames[:3]) == "Found 2 people"
+        assert frames[3]["data"]["response"] == "Found 2 people"
+        assert saved[0]["response"] == "Found 2 people"
+        print("[OK] Deltas relayed before the final response")
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir)
+
+
+def test_history_sent_in_pages():
+    cwd = os.getcwd()
+    workdir = tempfile.mkdtemp()
+    os.chdir(workdir)
+    try:
+        import app
+        from chatbot.history import ChatHistory
+
+        with TestClient(app.app) as client:
+            original = app.history
+            app.history = ChatHistory(os.path.join(workdir, "paged_history.db"))
+            try:
+                for i in range(30):
+                    app.save_chat("paged", f"question {i}", f"answer {i}")
+                with client.websocket_connect("/ws/paged") as ws:
+                    first = ws.receive_json()
+                    ws.send_json({"type": "history_page", "before": first["cursor"]})
+                    older = ws.receive_json()
+            finally:
+                app.history.close()
+                app.history = original
+
+        assert first["type"] == "history" and len(first["data"]) == 20
+        assert first["data"][-1]["message"] == "question 29"
+        assert older["type"] == "history_page" and older["cursor"] is None
+        assert [e["message"] for e in older["data"]] == [f"question {i}" for i in range(10)]
+        print("[OK] Latest history on connect, older pages on request")
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+    test_stream_sends_deltas_then_response()
+    test_history_sent_in_pages()
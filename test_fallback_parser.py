@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""Test the data-driven fallback intent parser"""
+
+from chatbot.fallback_parser import parse_message
+from people_server.store import PeopleStore
+from test_store import remove, write_csv
+
+EMPLOYEE_CSV = """Employee_number,Employee_name,Role,Department,Current_Salary,Employee_age,Education_level
+101,Shiv Kumar,Manager,Sales,90000,45,Masters
+102,Rohit Verma,Developer,Engineering,65000,29,Bachelors
+103,Anita Rao,Data Scientist,Data Science,85000,34,PhD
+104,Meera Iyer,Recruiter,Human Resources,50000,41,Bachelors
+"""
+
+
+def keywords_for(text):
+    path = write_csv(text)
+    try:
+        return PeopleStore(path, use_snapshots=False).current.index("keywords")
+    finally:
+        remove(path)
+
+
+def test_dataset_values_recognised():
+    keywords = keywords_for(EMPLOYEE_CSV)
+    assert keywords.find("data science managers with a phd") == [
+        ("department", "Data Science"), ("role", "Manager"), ("education", "PhD")]
+    assert parse_message("Recruiters in human resources", keywords) == (
+        "list_people", {"role": "Recruiter", "department": "Human Resources"})
+    assert parse_message("data scientists", keywords) == ("list_people", {"role": "Data Scientist"})
+    # Values the old hardcoded lists never knew, matched on whole words only
+    assert parse_message("bachelors", keywords) == ("list_people", {"education": "Bachelors"})
+    assert parse_message("find salesforce admin", keywords) == ("get_person_fuzzy", {"name": "salesforce admin"})
+    print("[OK] Departments, roles and education levels taken from the data")
+
+
+def test_ranges_names_and_chat():
+    keywords = keywords_for(EMPLOYEE_CSV)
+    assert parse_message("Engineering developers with salary over 50k and age under 40", keywords) == (
+        "list_people", {"min_salary": 50000, "max_age": 40, "department": "Engineering", "role": "Developer"})
+    assert parse_message("age between 30 and 45") == ("list_people", {"min_age": 30, "max_age": 45})
+    assert parse_message("salary at least 1,200,000") == ("list_people", {"min_salary": 1200000})
+    assert parse_message("ping") == ("ping", {})
+    assert parse_message("who is Shiv Kumar") == ("get_person_fuzzy", {"name": "shiv kumar"})
+    assert parse_message("Rohit") == ("get_person_fuzzy", {"name": "Rohit"})
+    assert parse_message("hi there!") is None
+    assert parse_message("what does the shipping team do all day") is None
+    print("[OK] Ranges, name searches and chit-chat told apart")
+
+
+if __name__ == "__main__":
+    test_dataset_values_recognised()
+    test_ranges_names_and_chat()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""Test typo-tolerant name search"""
+
+from people_server.data import get_people_data
+from people_server.fuzzy import NameIndex, PHONETIC_SIMILARITY, fuzzy_search_people
+from people_server.phonetic import PhoneticIndex, phonetic_keys
+
+
+def test_typos_find_intended_person():
+    people = get_people_data()
+    expected = {
+        "Ayshu": "Ayush Sharma",
+        "Aysuh": "Ayush Sharma",
+        "Prya": "Dr. Priya Patel",
+        "Rahool": "Rahul Kumar",
+        "Srah": "Sarah Johnson",
+    }
+    for query, name in expected.items():
+        results = fuzzy_search_people(people, query, 3)
+        assert results["best_match"] == name, (query, results["best_match"])
+        assert results["candidates"][0]["similarity"] < 1.0
+        print(f"[OK] '{query}' -> {name} ({results['candidates'][0]['similarity']:.2f})")
+
+
+def test_transliteration_variants_share_keys():
+    pairs = [("Aayush", "Ayush"), ("Priya", "Prya"), ("Rahul", "Rahool"),
+             ("Katherine", "Catherine"), ("Jon", "John"), ("Vikram", "Wikram")]
+    for left, right in pairs:
+        assert phonetic_keys(left) == phonetic_keys(right), (left, right)
+    assert phonetic_keys("Rahul")[0] != phonetic_keys("Rahil")[0]
+    print("[OK] Spelling variants fold to the same key")
+
+
+def test_phonetic_hits_ranked_as_confident():
+    people = get_people_data()
+    for query, name in {"Rahool": "Rahul Kumar", "Prya": "Dr. Priya Patel", "Wikram Sing": "Vikram Singh"}.items():
+        best = fuzzy_search_people(people, query, 3)["candidates"][0]
+        assert best["matched_name"] == name
+        assert best["similarity"] >= PHONETIC_SIMILARITY
+    print("[OK] Phonetic matches land in the high-confidence band")
+
+
+def test_phonetic_lookup_is_a_hash_hit():
+    people = get_people_data()
+    index = PhoneticIndex.build([p["full_name"] for p in people], [p["preferred_name"] for p in people])
+    strong, _ = index.lookup("Ayush")
+    assert {people[row]["full_name"] for row in strong} == {"Ayush Sharma", "Aayush Jain"}
+    print("[OK] Aayush/Ayush resolved by key lookup")
+
+
+def test_oversized_buckets_trimmed_or_dropped():
+    full_names = ["Ayush Rao"] * 5000 + ["Ayesha Rao"] * 5000 + ["Ayesha Khan"]
+    index = PhoneticIndex.build(full_names, [""] * len(full_names))
+    strong, weak = index.lookup("Aayush Rao", limit=64)
+    assert strong == set(range(64)) and weak == set()
+    strong, weak = index.lookup("Ayesha Khan")
+    assert strong == {len(full_names) - 1} and weak == set()
+    print("[OK] Crowded phonetic buckets trimmed or dropped")
+
+
+def test_exact_first_name_scores_full_similarity():
+    results = fuzzy_search_people(get_people_data(), "Mike", 3)
+    assert results["best_match"] == "Michael Chen"
+    assert results["candidates"][0]["similarity"] == 1.0
+    print("[OK] Preferred name matches with similarity 1.0")
+
+
+def test_results_bounded_and_ranked():
+    results = fuzzy_search_people(get_people_data(), "Ayush", 1)
+    assert len(results["candidates"]) == 1
+    assert fuzzy_search_people(get_people_data(), "Qwzx", 3)["candidates"] == []
+    print("[OK] Results capped at max_results, nonsense finds nothing")
+
+
+def test_extended_index_matches_rebuild():
+    people = get_people_data()
+    full_names = [p["full_name"] for p in people]
+    preferred_names = [p["preferred_name"] for p in people]
+
+    class Version:
+        columns = {"full_name": full_names, "preferred_name": preferred_names}
+
+    partial = NameIndex.build(full_names[:5], preferred_names[:5])
+    extended = partial.extended(Version, 5)
+    rebuilt = NameIndex.build(full_names, preferred_names)
+    assert extended.names == rebuilt.names
+    assert extended.search("Vikrum") == rebuilt.search("Vikrum")
+    print("[OK] Appended rows extend the index in place of a rebuild")
+
+
+def test_candidates_read_rarest_postings_first():
+    # Every row shares the common name, one row has a rare surname too
+    full_names = ["Rahul Kumar"] * 20000 + ["Rahul Zacharias"]
+    index = NameIndex.build(full_names, ["Rahul"] * len(full_names))
+    found = index.candidates("rahul zakarias", limit=8, budget=64)
+    assert found.tolist() == [len(full_names) - 1]
+    assert index.search("Rahul Zakarias", 1)[0][1] == len(full_names) - 1
+    print("[OK] Rare trigrams nominate candidates within the posting budget")
+
+
+if __name__ == "__main__":
+    test_typos_find_intended_person()
+    test_transliteration_variants_share_keys()
+    test_phonetic_hits_ranked_as_confident()
+    test_phonetic_lookup_is_a_hash_hit()
+    test_oversized_buckets_trimmed_or_dropped()
+    test_exact_first_name_scores_full_similarity()
+    test_results_bounded_and_ranked()
+    test_extended_index_matches_rebuild()
+    test_candidates_read_rarest_postings_first()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""Test the batched chat history store"""
+
+import asyncio
+import os
+import shutil
+import tempfile
+import time
+
+from chatbot.history import ChatHistory
+
+
+def test_saves_batched_and_read_back_in_order():
+    workdir = tempfile.mkdtemp()
+    history = ChatHistory(os.path.join(workdir, "chat_history.db"))
+    try:
+        async def chat(session, count):
+            for i in range(count):
+                history.save(session, f"question {i}", f"answer {i}")
+                await asyncio.sleep(0)
+
+        async def sessions():
+            await asyncio.gather(*(chat(f"s{n}", 200) for n in range(10)))
+
+        start = time.perf_counter()
+        asyncio.run(sessions())
+        queued = time.perf_counter() - start
+
+        exchanges = history.session("s3")
+        assert [e["message"] for e in exchanges] == [f"question {i}" for i in range(200)]
+        assert exchanges[0]["response"] == "answer 0" and exchanges[0]["timestamp"]
+        # 2000 exchanges shared far fewer commits
+        assert history.written == 2000 and history.batches < 2000
+        assert history.session("unknown") == []
+        print(f"[OK] 2000 saves queued in {queued * 1000:.1f}ms, committed in {history.batches} batches")
+    finally:
+        history.close()
+        shutil.rmtree(workdir)
+
+
+def test_pages_walk_back_through_a_session():
+    workdir = tempfile.mkdtemp()
+    history = ChatHistory(os.path.join(workdir, "chat_history.db"))
+    try:
+        for i in range(45):
+            history.save("long", f"question {i}", f"answer {i}")
+        history.save("other", "hi", "hello")
+
+        latest, cursor = history.page("long", limit=20)
+        assert [e["message"] for e in latest] == [f"question {i}" for i in range(25, 45)]
+        pages = [latest]
+        while cursor is not None:
+            page, cursor = history.page("long", before=cursor, limit=20)
+            pages.insert(0, page)
+        # Same-second timestamps are told apart by id
+        assert [len(page) for page in pages] == [5, 20, 20]
+        assert [e["message"] for page in pages for e in page] == [f"question {i}" for i in range(45)]
+
+        page, cursor = history.page("other")
+        assert [e["response"] for e in page] == ["hello"] and cursor is None
+        try:
+            history.page("long", before="garbage")
+            assert False, "malformed cursor accepted"
+        except ValueError:
+            pass
+        plan = history._reader.execute(
+            "EXPLAIN QUERY PLAN SELECT id FROM chat_sessions WHERE session_id = ? AND (timestamp, id) < (?, ?) "
+            "ORDER BY timestamp DESC, id DESC LIMIT 21", ("long", "2026-01-01 00:00:00", 1)).fetchall()
+        assert "idx_chat_sessions_session" in plan[0][-1] and "TEMP B-TREE" not in str(plan), plan
+    finally:
+        history.close()
+        shutil.rmtree(workdir)
+    print("[OK] History paged with a keyset cursor")
+
+
+def test_wal_and_session_index():
+    workdir = tempfile.mkdtemp()
+    path = os.path.join(workdir, "chat_history.db")
+    history = ChatHistory(path)
+    try:
+        history.save("s1", "hi", "hello")
+        history.flush()
+        reader = history._reader
+        assert reader.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        plan = reader.execute(
+            "EXPLAIN QUERY PLAN SELECT message FROM chat_sessions WHERE session_id = ? ORDER BY timestamp, id",
+            ("s1",)).fetchall()
+        assert any("idx_chat_sessions_session" in row[-1] for row in plan), plan
+    finally:
+        history.close()
+
+    # Reopening an existing database keeps its rows
+    history = ChatHistory(path)
+    try:
+        assert history.session("s1")[0]["response"] == "hello"
+    finally:
+        history.close()
+        shutil.rmtree(workdir)
+    print("[OK] WAL journal and (session_id, timestamp) index in place")
+
+
+if __name__ == "__main__":
+    test_saves_batched_and_read_back_in_order()
+    test_pages_walk_back_through_a_session()
+    test_wal_and_session_index()
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""Test chat history archival, retention and vacuum"""
+
+import os
+import shutil
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+from chatbot.history import ChatHistory
+from chatbot.history_maintenance import HistoryMaintenance
+
+NOW = datetime(2026, 10, 18, 12, 0, tzinfo=timezone.utc)
+LONG_ANSWER = "Found 40 employees with filters: department: Sales\n" * 200
+
+
+def insert(history, session_id, when, count=3):
+    stamp = when.strftime("%Y-%m-%d %H:%M:%S")
+    rows = [(session_id, f"question {i}", f"{LONG_ANSWER}{i}", stamp) for i in range(count)]
+
+    def write(conn):
+        with conn:
+            conn.executemany("INSERT INTO chat_sessions (session_id, message, response, timestamp) "
+                             "VALUES (?, ?, ?, ?)", rows)
+
+    history.run_job(write)
+
+
+def test_quiet_sessions_archived_compressed():
+    workdir = tempfile.mkdtemp()
+    history = ChatHistory(os.path.join(workdir, "chat_history.db"))
+    try:
+        insert(history, "old", NOW - timedelta(days=45), count=50)
+        insert(history, "active", NOW - timedelta(days=45))
+        insert(history, "active", NOW - timedelta(hours=1))
+        maintenance = HistoryMaintenance(history, archive_after_days=30, retention_days=365)
+        report = maintenance.run_once(NOW)
+
+        assert report["stale_sessions"] == 1 and report["rows_archived"] == 50
+        assert history.session("old") == [] and len(history.session("active")) == 6
+        assert history.partitions() == ["chat_2026_09"]
+        archived = history.archived_session("old")
+        assert [e["message"] for e in archived] == [f"question {i}" for i in range(50)]
+        assert archived[7]["response"] == f"{LONG_ANSWER}7"
+
+        stored = history._reader.execute("SELECT sum(length(response)) FROM archive.chat_2026_09").fetchone()[0]
+        assert stored * 20 < 50 * len(LONG_ANSWER), stored
+        # Pages freed by the move were handed back
+        assert report["free_pages"] == 0
+        assert history._reader.execute("PRAGMA main.freelist_count").fetchone()[0] == 0
+
+        # Nothing left to do on the next pass
+        assert maintenance.run_once(NOW)["rows_archived"] == 0
+        print(f"[OK] Quiet session archived: {report}")
+    finally:
+        history.close()
+        shutil.rmtree(workdir)
+
+
+def test_expired_months_dropped():
+    workdir = tempfile.mkdtemp()
+    history = ChatHistory(os.path.join(workdir, "chat_history.db"))
+    try:
+        insert(history, "ancient", NOW - timedelta(days=500))
+        insert(history, "recent", NOW - timedelta(days=60))
+        maintenance = HistoryMaintenance(history, archive_after_days=30, retention_days=365)
+        report = maintenance.run_once(NOW)
+        assert report["rows_archived"] == 6 and report["partitions_dropped"] == 1
+        assert history.partitions() == ["chat_2026_08"]
+        assert history.archived_session("ancient") == []
+        assert len(history.archived_session("recent")) == 3
+
+        # Chat writes keep working while and after maintenance runs
+        history.save("recent", "back again", "welcome back")
+        assert [e["message"] for e in history.session("recent")] == ["back again"]
+        print("[OK] Archived months past retention dropped")
+    finally:
+        history.close()
+        shutil.rmtree(workdir)
+
+
+def test_archived_sessions_paged_from_the_archive():
+    workdir = tempfile.mkdtemp()
+    history = ChatHistory(os.path.join(workdir, "chat_history.db"))
+    try:
+        insert(history, "old", NOW - timedelta(days=75), count=30)
+        insert(history, "old", NOW - timedelta(days=45), count=15)
+        HistoryMaintenance(history, archive_after_days=30, retention_days=365).run_once(NOW)
+        assert history.partitions() == ["chat_2026_08", "chat_2026_09"]
+
+        def all_pages():
+            pages = [history.page("old", limit=20)]
+            while pages[-1][1] is not None:
+                pages.append(history.page("old", before=pages[-1][1], limit=20))
+            return [[e["message"] for e in page] for page, _ in pages]
+
+        # A user back after the archive pass still sees the whole session
+        pages = all_pages()
+        assert [len(page) for page in pages] == [20, 20, 5]
+        assert pages[0][-1] == "question 14" and pages[2][0] == "question 0"
+        assert history.page("old", limit=1)[0][0]["response"] == f"{LONG_ANSWER}14"
+
+        history.save("old", "back again", "welcome back")
+        pages = all_pages()
+        assert pages[0][-1] == "back again" and pages[0][-2] == "question 14"
+        assert sum(len(page) for page in pages) == 46
+        print("[OK] Archived session paged after its live exchanges")
+    finally:
+        history.close()
+        shutil.rmtree(workdir)
+
+
+def test_archived_exchanges_stay_searchable():
+    workdir = tempfile.mkdtemp()
+    path = os.path.join(workdir, "chat_history.db")
+    history = ChatHistory(path)
+    try:
+        insert(history, "ancient", NOW - timedelta(days=500), count=2)
+        insert(history, "recent", NOW - timedelta(days=60))
+        insert(history, "active", NOW - timedelta(hours=1), count=2)
+        HistoryMaintenance(history, archive_after_days=30, retention_days=365).run_once(NOW)
+
+        def hits():
+            results, _ = history.search("question employees", limit=100)
+            return sorted((r["session_id"], r["message"]) for r in results), results
+
+        found, results = hits()
+        assert found == [("active", "question 0"), ("active", "question 1"),
+                         ("recent", "question 0"), ("recent", "question 1"), ("recent", "question 2")]
+        archived = [r for r in results if r["session_id"] == "recent"]
+        assert all(r["response"].startswith("Found 40 [employees]") and r["response"].endswith("...")
+                   for r in archived)
+        assert archived[0]["timestamp"].startswith("2026-08")
+        # The dropped month's entries went with it
+        count = history._reader.execute("SELECT count(*) FROM chat_search WHERE chat_search MATCH 'question'")
+        assert count.fetchone()[0] == 5
+
+        # A database whose old trigger dropped archived entries gets them back
+        def forget(conn):
+            with conn:
+                conn.execute("INSERT INTO chat_search (chat_search) VALUES ('delete-all')")
+                conn.execute("INSERT INTO chat_search (chat_search) VALUES ('rebuild')")
+                conn.execute("CREATE TRIGGER chat_sessions_search_delete AFTER DELETE ON chat_sessions "
+                             "BEGIN SELECT 1; END")
+
+        history.run_job(forget)
+        assert len(hits()[0]) == 2
+        history.close()
+        history = ChatHistory(path)
+        assert hits()[0] == found
+        print(f"[OK] Archived exchanges found by search: {archived[0]['response'][:40]!r}")
+    finally:
+        history.close()
+        shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+    test_quiet_sessions_archived_compressed()
+    test_expired_months_dropped()
+    test_archived_sessions_paged_from_the_archive()
+    test_archived_exchanges_stay_searchable()
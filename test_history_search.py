@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""Test full-text search over chat history"""
+
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+
+from fastapi.testclient import TestClient
+
+from chatbot.history import ChatHistory
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "chatbot"))
+
+
+def test_ranked_search_follows_inserts_and_deletes():
+    workdir = tempfile.mkdtemp()
+    history = ChatHistory(os.path.join(workdir, "chat_history.db"))
+    try:
+        history.save("a", "sales managers", "Found 3 employees with filters: department: Sales, role: Manager")
+        history.save("b", "who is john", "John Smith (ID: 1) - Manager in Sales")
+        history.save("c", "engineering developers", "Found 5 employees with filters: department: Engineering")
+        for i in range(30):
+            history.save("d", f"manager question {i}", "Sales manager answer")
+        history.flush()
+
+        results, next_offset = history.search("Sales managers", limit=2)
+        assert len(results) == 2 and next_offset == 2
+        assert "[sales]" in results[0]["response"].lower() and "[manager]" in results[0]["response"].lower()
+        seen, offset = [], 0
+        while offset is not None:
+            page, offset = history.search("sales manager", limit=10, offset=offset)
+            seen.extend(page)
+        assert len(seen) == 32 and all(seen[i]["score"] >= seen[i + 1]["score"] for i in range(31))
+        assert {r["session_id"] for r in seen} == {"a", "b", "d"}
+
+        # FTS5 syntax characters are ignored rather than raising
+        assert history.search('engineering* "(')[0][0]["session_id"] == "c"
+        assert history.search("?!") == ([], None)
+
+        def delete(conn):
+            with conn:
+                conn.execute("DELETE FROM chat_sessions WHERE session_id = 'a'")
+
+        history.run_job(delete)
+        assert all(r["session_id"] != "a" for r in history.search("sales managers", limit=100)[0])
+        print("[OK] Ranked, paginated search kept in sync with the table")
+    finally:
+        history.close()
+        shutil.rmtree(workdir)
+
+
+def test_existing_history_indexed_and_served():
+    cwd = os.getcwd()
+    workdir = tempfile.mkdtemp()
+    os.chdir(workdir)
+    try:
+        # A database from before search existed
+        conn = sqlite3.connect("old_history.db")
+        conn.execute("CREATE TABLE chat_sessions (id INTEGER PRIMARY KEY AUTOINCREMENT, session_id TEXT, "
+                     "message TEXT, response TEXT, timestamp DATETIME DEFAULT CURRENT_TIMESTAMP)")
+        conn.execute("INSERT INTO chat_sessions (session_id, message, response) "
+                     "VALUES ('old', 'hr recruiters', 'Found 2 recruiters in HR')")
+        conn.commit()
+        conn.close()
+
+        import app
+
+        with TestClient(app.app) as client:
+            original = app.history
+            app.history = ChatHistory("old_history.db")
+            try:
+                body = client.get("/history/search", params={"q": "recruiter"}).json()
+                assert [r["session_id"] for r in body["results"]] == ["old"] and body["next_offset"] is None
+                assert client.get("/history/search", params={"q": "payroll"}).json()["results"] == []
+            finally:
+                app.history.close()
+                app.history = original
+        print("[OK] Existing history indexed and searchable over HTTP")
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+    test_ranked_search_follows_inserts_and_deletes()
+    test_existing_history_indexed_and_served()
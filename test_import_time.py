@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""Test that importing the servers stays cheap"""
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+# Generous wall-clock budget per import, in milliseconds
+IMPORT_BUDGET_MS = float(os.getenv("IMPORT_BUDGET_MS", "2500"))
+HEAVY = ("pandas", "rapidfuzz", "google.generativeai")
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = (time.perf_counter() - start) * 1000
+print(json.dumps({{"ms": elapsed, "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def measure(module, cwd, path):
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(path))
+    out = subprocess.run([sys.executable, "-c", PROBE.format(module=module, heavy=HEAVY)],
+                         cwd=cwd, env=env, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def test_mcp_server_import():
+    result = measure("people_server.main", ROOT, [ROOT])
+    assert result["loaded"] == [], result
+    assert result["ms"] < IMPORT_BUDGET_MS, result
+    print(f"[OK] people_server.main imported in {result['ms']:.0f}ms")
+
+
+def test_chat_app_import():
+    # The app opens chat_history.db in the working directory on startup only
+    workdir = tempfile.mkdtemp()
+    try:
+        result = measure("app", workdir, [os.path.join(ROOT, "chatbot"), ROOT])
+        assert result["loaded"] == [], result
+        assert result["ms"] < IMPORT_BUDGET_MS, result
+        assert os.listdir(workdir) == [], "importing the app touched the disk"
+    finally:
+        shutil.rmtree(workdir)
+    print(f"[OK] app imported in {result['ms']:.0f}ms")
+
+
+if __name__ == "__main__":
+    test_mcp_server_import()
+    test_chat_app_import()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""Test the intent classification cache"""
+
+import asyncio
+import time
+
+import chatbot.llm_client as llm_module
+from chatbot.intent_cache import IntentCache, normalize_message
+from chatbot.llm_client import LLMClient
+from test_llm_functions import RecordingMCPClient, ScriptedModel, reply
+
+
+def test_messages_normalized():
+    assert normalize_message("  Age ABOVE 40?! ") == normalize_message("age above 40.0") == "age above 40"
+    assert normalize_message("salary over 50,000") == normalize_message("Salary over 50k") == "salary over 50000"
+    assert normalize_message("Engineering-managers") == "engineering managers"
+    assert normalize_message("find R2D2") == "find r2d2"
+    print("[OK] Messages normalized for cache keys")
+
+
+def test_lru_ttl_and_counters():
+    cache = IntentCache(max_size=2, ttl=0.05)
+    cache.put("a", ("list_people", {"role": "Manager"}))
+    cache.put("b", ("ping", {}))
+    assert cache.get("a") == ("list_people", {"role": "Manager"})
+    cache.put("c", ("ping", {}))
+    assert cache.get("b") is None and cache.get("a") is not None
+
+    # Callers get their own copy of the arguments
+    cache.get("a")[1]["role"] = "Intern"
+    assert cache.get("a")[1] == {"role": "Manager"}
+
+    time.sleep(0.06)
+    assert cache.get("a") is None
+    stats = cache.stats()
+    assert stats["hits"] == 4 and stats["misses"] == 2
+    print(f"[OK] LRU + TTL intent cache: {stats}")
+
+
+def test_repeated_message_skips_classification():
+    client = LLMClient()
+    client.model = ScriptedModel(reply(call="list_people", args={"role": "Manager"}))
+    mcp_client = RecordingMCPClient()
+
+    async def ask(*messages):
+        return [await client.process_message(m, mcp_client) for m in messages]
+
+    try:
+        asyncio.run(ask("Managers", "managers?", "  MANAGERS "))
+        assert len(client.model.requests) == 1
+        assert mcp_client.calls == [("list_people", {"role": "Manager"})] * 3
+        assert client.intents.stats()["hits"] == 2
+
+        # A different model must classify again
+        client.model = ScriptedModel(reply(call="list_people", args={"role": "Manager"}))
+        client.model.model_name = "models/other"
+        asyncio.run(ask("managers"))
+        assert len(client.model.requests) == 1
+    finally:
+        client.close()
+    print("[OK] Repeated messages answered without an LLM classification")
+
+
+def test_classify_mode_caches_parsed_filters():
+    llm_module.LLM_MODE = "classify"
+    client = LLMClient()
+    client.model = ScriptedModel(reply("LIST_PEOPLE: min_age=40,role=Manager"), reply("Here they are"),
+                                 reply("Here they are again"))
+    mcp_client = RecordingMCPClient()
+
+    async def ask(*messages):
+        return [await client.process_message(m, mcp_client) for m in messages]
+
+    try:
+        assert asyncio.run(ask("managers over 40", "Managers over 40!")) == ["Here they are", "Here they are again"]
+        # One classification, two formatting requests
+        assert len(client.model.requests) == 3
+        assert mcp_client.calls == [("list_people", {"role": "Manager", "min_age": "40"})] * 2
+    finally:
+        llm_module.LLM_MODE = "functions"
+        client.close()
+    print("[OK] Classify mode reuses parsed filters")
+
+
+if __name__ == "__main__":
+    test_messages_normalized()
+    test_lru_ttl_and_counters()
+    test_repeated_message_skips_classification()
+    test_classify_mode_caches_parsed_filters()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""Test that Gemini calls do not block the event loop"""
+
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+from chatbot.llm_client import LLMClient
+
+
+class SlowModel:
+    """Stands in for the Gemini model: a blocking call with a fixed delay"""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.active = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def generate_content(self, contents, tools=None):
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(self.delay)
+        with self.lock:
+            self.active -= 1
+        part = SimpleNamespace(function_call=SimpleNamespace(name=""), text="hello")
+        return SimpleNamespace(text="hello", candidates=[SimpleNamespace(content=SimpleNamespace(parts=[part]))])
+
+
+class MockMCPClient:
+    async def call_tool(self, tool_name, arguments=None):
+        return f"Mock result for {tool_name}"
+
+
+def test_concurrent_sessions_overlap():
+    client = LLMClient()
+    client.model = SlowModel(0.2)
+    ticks = []
+
+    async def heartbeat():
+        for _ in range(8):
+            ticks.append(time.perf_counter())
+            await asyncio.sleep(0.05)
+
+    async def run():
+        messages = [client.process_message(f"hi {i}", MockMCPClient()) for i in range(4)]
+        return await asyncio.gather(heartbeat(), *messages)
+
+    start = time.perf_counter()
+    replies = asyncio.run(run())[1:]
+    elapsed = time.perf_counter() - start
+    client.close()
+
+    assert replies == ["hello"] * 4
+    # Four 0.2s calls ran side by side and the loop kept ticking meanwhile
+    assert elapsed < 0.6, elapsed
+    assert client.model.peak == 4
+    assert max(b - a for a, b in zip(ticks, ticks[1:])) < 0.15
+    print(f"[OK] 4 concurrent Gemini calls took {elapsed:.2f}s without blocking the loop")
+
+
+def test_fallback_waits_for_keywords_off_the_loop():
+    client = LLMClient()
+    client.model = None
+
+    def slow_keywords():
+        # Stands in for the primary dataset still loading
+        time.sleep(0.3)
+        return None
+
+    client._keywords = slow_keywords
+    ticks = []
+
+    async def heartbeat():
+        for _ in range(6):
+            ticks.append(time.perf_counter())
+            await asyncio.sleep(0.05)
+
+    async def run():
+        return await asyncio.gather(heartbeat(), client.process_message("ping", MockMCPClient()))
+
+    reply = asyncio.run(run())[1]
+    client.close()
+    assert reply == "Mock result for ping"
+    assert max(b - a for a, b in zip(ticks, ticks[1:])) < 0.15
+    print("[OK] Fallback parser loads dataset keywords without blocking the loop")
+
+
+if __name__ == "__main__":
+    test_concurrent_sessions_overlap()
+    test_fallback_waits_for_keywords_off_the_loop()
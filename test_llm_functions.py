@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""Test native function calling in the LLM client"""
+
+import asyncio
+from types import SimpleNamespace
+
+import chatbot.llm_client as llm_module
+from chatbot.llm_client import LLMClient, function_declarations
+from people_server.tools import ToolResult
+
+
+def reply(text="", call=None, args=None):
+    """A Gemini-shaped response holding either text or one function call"""
+    function_call = SimpleNamespace(name=call or "", args=args or {})
+    content = SimpleNamespace(role="model", parts=[SimpleNamespace(function_call=function_call, text=text)])
+    return SimpleNamespace(text=text, candidates=[SimpleNamespace(content=content)])
+
+
+class ScriptedModel:
+    def __init__(self, *replies):
+        self.replies = list(replies)
+        self.requests = []
+
+    def generate_content(self, contents, tools=None, stream=False):
+        self.requests.append((contents, tools))
+        response = self.replies.pop(0)
+        # A streamed reply is scripted as a list of chunks
+        return iter(response) if stream else response
+
+
+class RecordingMCPClient:
+    def __init__(self):
+        self.calls = []
+
+    async def call_tool(self, tool_name, arguments=None):
+        return (await self.call_tool_result(tool_name, arguments)).text
+
+    async def call_tool_result(self, tool_name, arguments=None):
+        self.calls.append((tool_name, arguments))
+        return ToolResult(f"Found 2 employees for {tool_name}", [])
+
+
+def run(client, message, mcp_client):
+    try:
+        return asyncio.run(client.process_message(message, mcp_client))
+    finally:
+        client.close()
+
+
+def test_declarations_follow_tool_registry():
+    declarations = {d["name"]: d for d in function_declarations()}
+    assert set(declarations) == {"ping", "get_person_exact", "get_person_fuzzy", "list_people", "get_people_batch"}
+    assert declarations["get_people_batch"]["parameters"]["properties"]["names"]["items"] == {"type": "string"}
+    limit = declarations["list_people"]["parameters"]["properties"]["limit"]
+    assert limit == {"type": "integer", "description": "Maximum number of results (larger values are capped at 200)"}
+    assert "parameters" not in declarations["ping"]
+    print("[OK] Function declarations built from the tool registry")
+
+
+def test_tool_call_answered_in_one_request():
+    client = LLMClient()
+    client.model = ScriptedModel(reply(call="list_people", args={"min_age": 40.0, "role": "Manager"}))
+    mcp_client = RecordingMCPClient()
+    answer = run(client, "managers over 40", mcp_client)
+    assert answer == "Found 2 employees for list_people"
+    assert mcp_client.calls == [("list_people", {"min_age": 40.0, "role": "Manager"})]
+    assert len(client.model.requests) == 1
+    assert client.model.requests[0][1] is client.tools
+    print("[OK] Tool call executed after a single Gemini request")
+
+
+def test_text_answer_and_summary():
+    client = LLMClient()
+    client.model = ScriptedModel(reply("Hello! Ask me about anyone."))
+    assert run(client, "hello", RecordingMCPClient()) == "Hello! Ask me about anyone."
+
+    llm_module.LLM_SUMMARIZE = True
+    try:
+        client.model = ScriptedModel(reply(call="get_person_fuzzy", args={"name": "jon"}),
+                                     reply("I found John Smith."))
+        assert run(client, "who is jon", RecordingMCPClient()) == "I found John Smith."
+        assert len(client.model.requests) == 2
+    finally:
+        llm_module.LLM_SUMMARIZE = False
+    print("[OK] Direct answers take one request, summaries two")
+
+
+def collect(client, message, mcp_client):
+    async def gather():
+        return [piece async for piece in client.stream_message(message, mcp_client)]
+
+    try:
+        return asyncio.run(gather())
+    finally:
+        client.close()
+
+
+def test_stream_relays_chunks():
+    client = LLMClient()
+    client.model = ScriptedModel([reply("Hel"), reply("lo "), reply("there")])
+    assert collect(client, "hello", RecordingMCPClient()) == ["Hel", "lo ", "there"]
+
+    client.model = ScriptedModel([reply(call="list_people", args={"role": "Manager"})])
+    mcp_client = RecordingMCPClient()
+    assert collect(client, "managers", mcp_client) == ["Found 2 employees for list_people"]
+    assert mcp_client.calls == [("list_people", {"role": "Manager"})]
+
+    # Without a model the fallback reply comes as a single piece
+    assert len(collect(LLMClient(), "ping", RecordingMCPClient())) == 1
+    print("[OK] Replies streamed chunk by chunk")
+
+
+if __name__ == "__main__":
+    test_declarations_follow_tool_registry()
+    test_tool_call_answered_in_one_request()
+    test_text_answer_and_summary()
+    test_stream_relays_chunks()
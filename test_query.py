@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""Test indexed list_people filtering"""
+
+import os
+import random
+import tempfile
+
+import people_server.query as query
+from people_server.store import PeopleStore
+from people_server.query import find_people, plan
+
+DEPARTMENTS = ["Engineering", "Sales", "HR", "Finance", "Data Engineering"]
+ROLES = ["Manager", "Developer", "Analyst", "Sales Manager"]
+
+
+def make_store(rows=500, seed=7):
+    rng = random.Random(seed)
+    handle = tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False)
+    handle.write("Employee_number,Employee_name,Role,Department,Current_Salary,Employee_age,Education_level\n")
+    for number in range(rows):
+        handle.write(f"{number},Person {number},{rng.choice(ROLES)},{rng.choice(DEPARTMENTS)},"
+                     f"{rng.randrange(20000, 150000, 500)},{rng.randint(21, 65)},{rng.choice(['Bachelors', 'PhD'])}\n")
+    handle.close()
+    return handle.name, PeopleStore(handle.name)
+
+
+def remove(path):
+    for name in (path, path + ".snap"):
+        if os.path.exists(name):
+            os.remove(name)
+
+
+def brute_force(version, filters, limit):
+    columns = version.columns
+    matches = []
+    for row in range(len(version)):
+        if filters.get("department") and filters["department"].lower() not in columns["department"][row].lower():
+            continue
+        if filters.get("role") and filters["role"].lower() not in columns["role"][row].lower():
+            continue
+        if filters.get("min_salary") and columns["salary"][row] < int(filters["min_salary"]):
+            continue
+        if filters.get("max_salary") and columns["salary"][row] > int(filters["max_salary"]):
+            continue
+        if filters.get("min_age") and columns["age"][row] < int(filters["min_age"]):
+            continue
+        if filters.get("max_age") and columns["age"][row] > int(filters["max_age"]):
+            continue
+        matches.append(row)
+    matches.sort(key=lambda row: -columns["salary"][row])
+    return matches
+
+
+FILTERS = [
+    {},
+    {"department": "engineering"},
+    {"department": "Engineering", "min_age": "40"},
+    {"role": "manager", "min_salary": 90000, "max_salary": "120000"},
+    {"max_age": 25, "department": "hr"},
+    {"department": "Nope"},
+]
+
+
+def test_matches_brute_force():
+    path, store = make_store()
+    try:
+        version = store.current
+        for filters in FILTERS:
+            expected = brute_force(version, filters, 10)
+            result = find_people(version, filters, 10)
+            salaries = [int(version.columns["salary"][row]) for row in result.rows]
+            assert result.matched == len(expected), filters
+            assert salaries == [int(version.columns["salary"][row]) for row in expected[:10]], filters
+            print(f"[OK] {filters}: {result.matched} matches, scanned {result.scanned}")
+    finally:
+        remove(path)
+
+
+def test_mask_and_index_paths_agree():
+    path, store = make_store()
+    original = query.MASK_THRESHOLD
+    try:
+        version = store.current
+        for filters in FILTERS:
+            query.MASK_THRESHOLD = 0.0
+            masked = find_people(version, filters, 10)
+            query.MASK_THRESHOLD = float("inf")
+            indexed = find_people(version, filters, 10)
+            assert masked.rows.tolist() == indexed.rows.tolist(), filters
+            assert masked.matched == indexed.matched
+        print("[OK] Vectorized masks agree with index candidates")
+    finally:
+        query.MASK_THRESHOLD = original
+        remove(path)
+
+
+def test_most_selective_filter_first():
+    path, store = make_store()
+    try:
+        version = store.current
+        predicates = plan(version, {"department": "engineering", "min_age": 64})
+        estimates = [predicate.estimate for predicate in predicates]
+        assert estimates == sorted(estimates)
+        result = find_people(version, {"department": "engineering", "min_age": 64}, 5)
+        assert result.scanned == estimates[0] < len(version)
+        print("[OK] Candidates come from the most selective index")
+    finally:
+        remove(path)
+
+
+def test_appended_rows_extend_indexes():
+    path, store = make_store(rows=200)
+    try:
+        store.current
+        with open(path, "a") as handle:
+            handle.write("900,Late Hire,Manager,Engineering,149999,64,PhD\n")
+            handle.write("901,Other Hire,Analyst,Legal,30000,22,PhD\n")
+        assert store.refresh()
+        version = store.current
+        for column in ("salary", "age", "department", "role"):
+            rebuilt = type(version.index(column)).for_column(column, version)
+            extended = version.index(column)
+            if column in ("salary", "age"):
+                assert (rebuilt.sorted_values == extended.sorted_values).all()
+            else:
+                assert rebuilt.values == extended.values
+                assert all((a == b).all() for a, b in zip(rebuilt.postings, extended.postings))
+        top = find_people(version, {"department": "engineering"}, 1)
+        assert version.columns["full_name"][top.rows[0]] == "Late Hire"
+        assert find_people(version, {"department": "legal"}, 5).matched == 1
+        print("[OK] Range and value indexes extended on append")
+    finally:
+        remove(path)
+
+
+if __name__ == "__main__":
+    test_matches_brute_force()
+    test_mask_and_index_paths_agree()
+    test_most_selective_filter_first()
+    test_appended_rows_extend_indexes()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""Test the multi-dataset registry"""
+
+import os
+import shutil
+import tempfile
+
+from people_server.registry import DatasetRegistry, dataset_name
+
+EMPLOYEES = """id,full_name,preferred_name,role,department
+1,Shiv Kumar,Shiv,Manager,Sales
+2,Rohit Verma,Rohit,Developer,Engineering
+"""
+
+STUDENTS = """id,full_name,preferred_name,role,department
+1,Alice Johnson,Alice,Student,Mathematics
+"""
+
+
+def make_data_dir():
+    data_dir = tempfile.mkdtemp()
+    for name, text in (("employees", EMPLOYEES), ("students", STUDENTS)):
+        with open(os.path.join(data_dir, f"{name}.csv"), "w") as handle:
+            handle.write(text)
+    return data_dir
+
+
+def test_datasets_served_side_by_side():
+    data_dir = make_data_dir()
+    try:
+        registry = DatasetRegistry(data_dir, default_primary="employees.csv")
+        assert registry.names() == ["employees", "students"]
+        assert dataset_name("data/students.csv") == "students"
+        employees = registry.current()
+        students = registry.current("students")
+        assert [p["full_name"] for p in employees.people] == ["Shiv Kumar", "Rohit Verma"]
+        assert students.index("exact").lookup("alice johnson") == (0,)
+        assert registry.current("students.csv") is students
+        try:
+            registry.current("payroll")
+            assert False, "unknown dataset should be rejected"
+        except ValueError as e:
+            assert "employees, students" in str(e)
+        print("[OK] Datasets served side by side")
+    finally:
+        shutil.rmtree(data_dir)
+
+
+def test_promote_swaps_primary_pointer():
+    data_dir = make_data_dir()
+    try:
+        registry = DatasetRegistry(data_dir, default_primary="employees.csv")
+        before = registry.current()
+        promoted = registry.promote("students")
+        assert registry.primary == "students"
+        assert registry.current() is promoted
+        assert len(before) == 2
+
+        # Another process sharing the directory follows the pointer
+        other = DatasetRegistry(data_dir, default_primary="employees.csv")
+        assert other.primary == "students"
+        print("[OK] Promotion swapped the primary dataset")
+    finally:
+        shutil.rmtree(data_dir)
+
+
+def test_cold_datasets_evicted_under_budget():
+    data_dir = make_data_dir()
+    try:
+        registry = DatasetRegistry(data_dir, memory_budget=1, default_primary="employees.csv")
+        primary = registry.current()
+        students = registry.current("students")
+        # Both fit nothing, but the primary and the dataset in use stay loaded
+        assert registry.store().loaded and registry.store("students").loaded
+
+        with open(os.path.join(data_dir, "alumni.csv"), "w") as handle:
+            handle.write(STUDENTS)
+        registry.current("alumni")
+        assert not registry.store("students").loaded
+        assert registry.store().current is primary
+        # Readers holding an evicted version keep a complete snapshot of it
+        assert students.people[0]["full_name"] == "Alice Johnson"
+        assert registry.current("students") is not students
+        print("[OK] Coldest dataset evicted over the memory budget")
+    finally:
+        shutil.rmtree(data_dir)
+
+
+if __name__ == "__main__":
+    test_datasets_served_side_by_side()
+    test_promote_swaps_primary_pointer()
+    test_cold_datasets_evicted_under_budget()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""Test memory-mapped dataset snapshots"""
+
+import os
+import tempfile
+
+from people_server import snapshot
+from people_server.fuzzy import fuzzy_search_people
+from people_server.query import find_people
+from people_server.store import PeopleStore
+
+EMPLOYEE_CSV = """Employee_number,Employee_name,Role,Department,Current_Salary,Employee_age,Education_level
+101,Shiv Kumar,Manager,Sales,90000,45,Masters
+102,Rohit Verma,Developer,Engineering,65000,29,Bachelors
+103,Priya Nair,Manager,Engineering,120000,38,PhD
+"""
+
+
+def write_csv(text):
+    handle = tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False)
+    handle.write(text)
+    handle.close()
+    return handle.name
+
+
+def cleanup(path):
+    for name in (path, snapshot.snapshot_path(path)):
+        if os.path.exists(name):
+            os.remove(name)
+
+
+def test_snapshot_round_trip():
+    path = write_csv(EMPLOYEE_CSV)
+    try:
+        parsed = PeopleStore(path, use_snapshots=False).current
+        snapshot.compile_snapshot(path)
+        mapped = PeopleStore(path).current
+        assert mapped.snapshot
+        assert [dict(p) for p in mapped.people] == [dict(p) for p in parsed.people]
+        filters = {"department": "engineering", "min_salary": 70000}
+        assert find_people(mapped, filters, 5).rows.tolist() == find_people(parsed, filters, 5).rows.tolist()
+        assert fuzzy_search_people(mapped.people, "Rohitt")["best_match"] == "Rohit Verma"
+        assert fuzzy_search_people(mapped.people, "Prya")["candidates"][0]["similarity"] >= 0.9
+        assert mapped.index("exact").lookup("SHIV") == parsed.index("exact").lookup("shiv") == (0,)
+        assert mapped.index("exact").lookup("nobody") == ()
+        print("[OK] Snapshot serves the same rows and indexes as the CSV")
+    finally:
+        cleanup(path)
+
+
+def test_parse_writes_snapshot_for_next_process():
+    path = write_csv(EMPLOYEE_CSV)
+    try:
+        assert not PeopleStore(path).current.snapshot
+        assert os.path.exists(snapshot.snapshot_path(path))
+        assert PeopleStore(path).current.snapshot
+        print("[OK] First load leaves a snapshot behind")
+    finally:
+        cleanup(path)
+
+
+def test_changed_source_invalidates_snapshot():
+    path = write_csv(EMPLOYEE_CSV)
+    try:
+        snapshot.compile_snapshot(path)
+        os.utime(path, ns=(1, 1))
+        assert PeopleStore(path).current.snapshot, "touched but unchanged CSV keeps its snapshot"
+
+        with open(path, "w") as handle:
+            handle.write(EMPLOYEE_CSV.replace("Shiv Kumar", "Shiv Kumaz"))
+        os.utime(path, ns=(2, 2))
+        version = PeopleStore(path).current
+        assert not version.snapshot
+        assert version.people[0]["full_name"] == "Shiv Kumaz"
+        print("[OK] Snapshot ignored once the source hash changes")
+    finally:
+        cleanup(path)
+
+
+if __name__ == "__main__":
+    test_snapshot_round_trip()
+    test_parse_writes_snapshot_for_next_process()
+    test_changed_source_invalidates_snapshot()
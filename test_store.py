@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""Test the shared in-memory people store"""
+
+import contextlib
+import io
+import os
+import tempfile
+import threading
+
+import people_server.store as store_module
+from people_server.csv_data import read_columns
+from people_server.fuzzy import fuzzy_search_people
+from people_server.store import PeopleStore, get_store
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+EMPLOYEE_CSV = """Employee_number,Employee_name,Role,Department,Current_Salary,Employee_age,Education_level
+101,Shiv Kumar,Manager,Sales,90000,45,Masters
+102,Rohit Verma,Developer,Engineering,65000,29,Bachelors
+"""
+
+
+def remove(path):
+    for name in (path, path + ".snap"):
+        if os.path.exists(name):
+            os.remove(name)
+
+
+def write_csv(text):
+    handle = tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False)
+    handle.write(text)
+    handle.close()
+    return handle.name
+
+
+def test_directory_csv_loaded_once():
+    store = PeopleStore(os.path.join(DATA_DIR, "employees.csv"))
+    first = store.current
+    assert store.current is first
+    assert len(first) > 0
+    person = first.people[0]
+    assert person["full_name"] == "John Smith"
+    assert person["tags"] == ("leadership", "sales", "management")
+    print(f"[OK] Loaded {len(first)} people once")
+
+
+def test_records_are_read_only():
+    store = PeopleStore(os.path.join(DATA_DIR, "employees.csv"))
+    person = store.current.people[0]
+    try:
+        person["role"] = "CEO"
+    except TypeError:
+        print("[OK] Records are read-only")
+    else:
+        raise AssertionError("person record was mutable")
+
+
+def test_employee_schema_normalized():
+    path = write_csv(EMPLOYEE_CSV)
+    try:
+        version = PeopleStore(path).current
+        person = version.people[0]
+        assert person["id"] == 101
+        assert person["preferred_name"] == "Shiv"
+        assert person["email"] == "shiv.kumar@company.com"
+        assert person["salary"] == 90000 and person["age"] == 45
+        print("[OK] Employee export mapped onto canonical columns")
+    finally:
+        remove(path)
+
+
+def test_reload_swaps_version():
+    path = write_csv(EMPLOYEE_CSV)
+    try:
+        store = PeopleStore(path)
+        old = store.current
+        with open(path, "a") as handle:
+            handle.write("103,Priya Nair,Analyst,Finance,70000,33,Masters\n")
+        new = store.reload()
+        assert store.current is new and new.version > old.version
+        assert len(old) == 2 and len(new) == 3
+        print("[OK] Reload swapped in a new version")
+    finally:
+        remove(path)
+
+
+def test_refresh_applies_appended_rows_only():
+    path = write_csv(EMPLOYEE_CSV)
+    original_load = store_module.load_columns
+    try:
+        store = PeopleStore(path)
+        old = store.current
+        assert store.refresh() is False
+
+        def fail(*_args):
+            raise AssertionError("append should not trigger a full parse")
+
+        store_module.load_columns = fail
+        with open(path, "a") as handle:
+            handle.write("103,Priya Nair,Analyst,Finance,70000,33,Masters\n104,Karen")
+        assert store.refresh() is True
+        new = store.current
+        assert len(old) == 2 and len(new) == 3
+        assert new.people[2]["full_name"] == "Priya Nair"
+        assert fuzzy_search_people(new.people, "Priya Nayr")["best_match"] == "Priya Nair"
+        assert fuzzy_search_people(old.people, "Priya Nayr")["best_match"] is None
+
+        # The half-written row is picked up once it is complete
+        with open(path, "a") as handle:
+            handle.write(" Lobo,Manager,HR,80000,50,PhD\n")
+        assert store.refresh() is True
+        assert store.current.people[3]["full_name"] == "Karen Lobo"
+        print("[OK] Appended rows merged without a full re-parse")
+    finally:
+        store_module.load_columns = original_load
+        remove(path)
+
+
+def test_refresh_rewrite_does_full_parse():
+    path = write_csv(EMPLOYEE_CSV)
+    try:
+        store = PeopleStore(path)
+        assert len(store.current) == 2
+        with open(path, "w") as handle:
+            handle.write(EMPLOYEE_CSV.replace("Shiv Kumar", "Shiva Kumar"))
+            handle.writelines(f"{200 + i},Filler {i},Clerk,Admin,30000,30,Bachelors\n" for i in range(10))
+        os.utime(path, ns=(0, 1))
+        assert store.refresh() is True
+        assert store.current.people[0]["full_name"] == "Shiva Kumar"
+
+        # Edited in place, same width and inode, with a row appended
+        with open(path, "r+b") as handle:
+            data = handle.read().replace(b"90000", b"95000")
+            handle.seek(0)
+            handle.write(data + b"103,Priya Nair,Analyst,Finance,70000,33,Masters\n")
+        assert store.refresh() is True
+        assert len(store.current) == 13 and store.current.people[0]["salary"] == 95000
+        print("[OK] Rewritten file re-parsed in full")
+    finally:
+        remove(path)
+
+
+def test_missing_or_moving_file_keeps_last_version():
+    path = write_csv(EMPLOYEE_CSV)
+    try:
+        store = PeopleStore(path, use_snapshots=False)
+        first = store.current
+        # Renamed away mid-export: readers keep the last good rows
+        os.rename(path, path + ".tmp")
+        assert store.refresh() is False and store.reload() is first
+        os.rename(path + ".tmp", path)
+        assert store.refresh() is False and store.current is first
+
+        original = store_module.load_columns
+
+        def racing(csv_path, progress=None):
+            loaded = original(csv_path, progress)
+            with open(csv_path, "a") as handle:
+                handle.write("104,Rohit Das,Manager,HR,80000,50,PhD\n")
+            return loaded
+
+        with open(path, "w") as handle:
+            handle.write(EMPLOYEE_CSV.replace("Shiv Kumar", "Shiva Kumar"))
+        os.utime(path, ns=(0, 1))
+        store_module.load_columns = racing
+        try:
+            # The file changed during the parse, so nothing is published
+            assert store.refresh() is False and store.current is first
+        finally:
+            store_module.load_columns = original
+        assert store.refresh() is True
+        assert [p["full_name"] for p in store.current.people] == ["Shiva Kumar", "Rohit Verma", "Rohit Das"]
+        print("[OK] Missing and changing files leave the last version in place")
+    finally:
+        remove(path)
+        remove(path + ".tmp")
+
+
+def test_unload_during_refresh_stays_unloaded():
+    path = write_csv(EMPLOYEE_CSV)
+    original = store_module.load_columns
+    parsing, release = threading.Event(), threading.Event()
+
+    def slow(csv_path, progress=None):
+        parsing.set()
+        release.wait(5)
+        return original(csv_path, progress)
+
+    try:
+        store = PeopleStore(path, use_snapshots=False)
+        first = store.current
+        with open(path, "w") as handle:
+            handle.write(EMPLOYEE_CSV.replace("Shiv Kumar", "Shiva Kumar"))
+        os.utime(path, ns=(0, 1))
+        store_module.load_columns = slow
+        refresher = threading.Thread(target=store.refresh)
+        refresher.start()
+        assert parsing.wait(5)
+        # Evicted mid-parse: the unload waits for the refresh to finish
+        unloader = threading.Thread(target=store.unload)
+        unloader.start()
+        unloader.join(0.2)
+        assert unloader.is_alive()
+        release.set()
+        refresher.join(5)
+        unloader.join(5)
+        assert not store.loaded
+
+        # A late watcher tick leaves it unloaded; the next read loads afresh
+        assert store.refresh() is False and not store.loaded
+        store_module.load_columns = original
+        assert store.current is not first and store.current.people[0]["full_name"] == "Shiva Kumar"
+        print("[OK] Unload waits for an in-flight refresh")
+    finally:
+        release.set()
+        store_module.load_columns = original
+        remove(path)
+
+
+def test_exact_index_lookup():
+    path = write_csv(EMPLOYEE_CSV + "103,Shiv Rao,Analyst,Finance,70000,33,Masters\n")
+    try:
+        store = PeopleStore(path)
+        exact = store.current.index("exact")
+        assert exact.lookup("SHIV KUMAR") == (0,)
+        assert exact.lookup("shiv") == (0, 2)
+        assert exact.lookup("Kumar") == ()
+        with open(path, "a") as handle:
+            handle.write("104,Rohit Das,Manager,HR,80000,50,PhD\n")
+        store.refresh()
+        assert store.current.index("exact").lookup("rohit") == (1, 3)
+        assert exact.lookup("rohit") == (1,)
+        print("[OK] Exact names resolved through the hash index")
+    finally:
+        remove(path)
+
+
+def test_memory_usage_counts_indexes():
+    path = write_csv(EMPLOYEE_CSV + "103,Shiv Rao,Analyst,Finance,70000,33,Masters\n")
+    try:
+        version = PeopleStore(path, use_snapshots=False).current
+        bare = store_module.DatasetVersion(version.columns, version.fields, version.source)
+        columns_only = bare.memory_usage()
+        names = bare.index("names")
+        postings = sum(rows.nbytes for rows in names.postings.values())
+        assert bare.memory_usage() > columns_only + postings
+        assert version.memory_usage() > bare.memory_usage()
+        print(f"[OK] Indexes counted: {columns_only} column bytes, {version.memory_usage()} in all")
+    finally:
+        remove(path)
+
+
+def test_chunked_load_reports_malformed_rows():
+    path = write_csv(EMPLOYEE_CSV
+                     + "103,Priya Nair,Analyst,Finance,70000,33,Masters,extra\n"
+                     + "104,Karen Lobo,Manager,HR,lots,50,PhD\n"
+                     + "105,Anil Rao,Developer,Engineering,60000,31,Bachelors\n")
+    try:
+        reports = []
+        store = PeopleStore(path, use_snapshots=False,
+                            progress=lambda report: reports.append((report.chunks, report.rows)))
+        stdout, stderr = io.StringIO(), io.StringIO()
+        with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+            version = store.current
+        report = version.load_report
+        # stdout carries the MCP server's JSON-RPC stream
+        assert stdout.getvalue() == "" and "2 malformed rows" in stderr.getvalue()
+        assert [p["full_name"] for p in version.people] == [
+            "Shiv Kumar", "Rohit Verma", "Karen Lobo", "Anil Rao"]
+        assert version.people[2]["salary"] == 0
+        assert report.complete and report.rows == 4 and report.bad_row_count == 2
+        assert [row.line for row in report.bad_rows] == [4, 5]
+        assert reports[-1] == (report.chunks, 4)
+
+        # Line 4 ends the first chunk, then starts the second one
+        for chunk_rows, chunks in ((3, 2), (2, 3)):
+            columns, _, chunked = read_columns(path, chunk_rows=chunk_rows)
+            assert columns["full_name"] == ["Shiv Kumar", "Rohit Verma", "Karen Lobo", "Anil Rao"]
+            assert chunked.chunks == chunks and [row.line for row in chunked.bad_rows] == [4, 5], chunked.bad_rows
+        print(f"[OK] Streamed load: {report.summary()}")
+    finally:
+        remove(path)
+
+
+def test_missing_file_is_empty():
+    store = PeopleStore("data/does_not_exist.csv")
+    assert len(store.current) == 0
+    assert list(store.current.people) == []
+    print("[OK] Missing CSV yields an empty dataset")
+
+
+def test_get_store_is_shared():
+    path = os.path.join(DATA_DIR, "employees.csv")
+    assert get_store(path) is get_store(path)
+    print("[OK] Stores are shared per path")
+
+
+if __name__ == "__main__":
+    test_directory_csv_loaded_once()
+    test_records_are_read_only()
+    test_employee_schema_normalized()
+    test_reload_swaps_version()
+    test_refresh_applies_appended_rows_only()
+    test_refresh_rewrite_does_full_parse()
+    test_missing_or_moving_file_keeps_last_version()
+    test_unload_during_refresh_stays_unloaded()
+    test_exact_index_lookup()
+    test_memory_usage_counts_indexes()
+    test_chunked_load_reports_malformed_rows()
+    test_missing_file_is_empty()
+    test_get_store_is_shared()
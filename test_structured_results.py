@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""Test compact structured tool results from the MCP server"""
+
+import asyncio
+import json
+import threading
+import time
+
+from mcp.types import CallToolResult
+
+import people_server.main as main
+from people_server.main import handle_call_tool
+from people_server.tools import call_tool, tool_stats
+
+
+def test_rows_sent_once_and_projected():
+    arguments = {"department": "Engineering", "limit": 50, "dataset": "employees"}
+    result = asyncio.run(handle_call_tool("list_people", dict(arguments, fields=["full_name", "email"])))
+    assert isinstance(result, CallToolResult)
+    content = result.structuredContent
+    assert content["count"] == len(content["rows"]) > 0 and content["matched"] >= content["count"]
+    assert all(set(row) == {"full_name", "email"} for row in content["rows"])
+    # The text is only the headline, not a second copy of the rows
+    assert result.content[0].text == content["summary"] and "\n" not in content["summary"]
+
+    full = asyncio.run(handle_call_tool("list_people", arguments)).structuredContent
+    assert full["rows"] == [dict(row) for row in call_tool("list_people", arguments).data]
+    compact = len(json.dumps(full, separators=(",", ":")))
+    assert len(json.dumps(content, separators=(",", ":"))) * 2 < compact
+    # Against the old reply: the listing followed by the same rows as indented JSON
+    result = call_tool("list_people", arguments)
+    assert compact * 1.5 < len(result.text + "\nFull data: " + json.dumps(result.data, indent=2, default=dict))
+
+    listing = asyncio.run(handle_call_tool("list_people", dict(arguments, format="text")))
+    assert listing[0].text == call_tool("list_people", arguments).text and "Full data" not in listing[0].text
+    print(f"[OK] {content['count']} rows sent once, projected to 2 fields")
+
+
+def test_fuzzy_candidates_not_duplicated():
+    result = asyncio.run(handle_call_tool("get_person_fuzzy", {"name": "Jon Smth", "maxResults": 3,
+                                                               "dataset": "employees", "format": "both"}))
+    content = result.structuredContent
+    assert content["best_match"] == "John Smith" and "candidates" not in content
+    assert len(content["similarity"]) == content["count"] == len(content["rows"])
+    assert content["rows"][0]["full_name"] == "John Smith"
+    assert "similarity: " in result.content[0].text
+
+    try:
+        asyncio.run(handle_call_tool("get_person_fuzzy", {"name": "Jon Smth", "dataset": "employees",
+                                                          "fields": ["shoe_size"]}))
+        assert False, "unknown field accepted"
+    except ValueError as e:
+        assert "shoe_size" in str(e)
+    print("[OK] Fuzzy matches carry each person once with scores alongside")
+
+
+def test_presentation_arguments_validated():
+    errors = tool_stats().get("list_people", {}).get("errors", 0)
+    # Checked against the dataset's columns even when nothing matches
+    for arguments in ({"fields": ["shoe_size"]}, {"format": "xml"}):
+        try:
+            asyncio.run(handle_call_tool("list_people", dict(arguments, department="Nowhere",
+                                                             dataset="employees")))
+            assert False, f"{arguments} accepted"
+        except ValueError as e:
+            assert "shoe_size" in str(e) or "format" in str(e)
+    assert tool_stats()["list_people"]["errors"] == errors + 2
+    listing = asyncio.run(handle_call_tool("list_people", {"role": "Manager", "dataset": "employees",
+                                                           "format": " text "}))
+    assert listing[0].text.startswith("Found ")
+    print("[OK] fields and format read from the validated arguments")
+
+
+def test_text_rendered_only_on_demand():
+    result = call_tool("list_people", {"role": "Manager", "limit": 25, "dataset": "employees"})
+    again = call_tool("list_people", {"role": "Manager", "limit": 25, "dataset": "employees",
+                                      "fields": ["id"], "format": "text"})
+    # Presentation arguments share the cached result
+    assert again is result and result._text is None
+    assert result.text.startswith(result.summary + ":\n\n") and result.text is result.text
+    print("[OK] Readable listing rendered lazily, once")
+
+
+def test_calls_run_off_the_loop():
+    original = main.run_tool
+    calls = []
+
+    def loading(name, arguments):
+        # Stands in for a call waiting on the warm-up's dataset load
+        calls.append(threading.get_ident())
+        time.sleep(0.3)
+        return original(name, arguments)
+
+    ticks = []
+
+    async def heartbeat():
+        for _ in range(6):
+            ticks.append(time.perf_counter())
+            await asyncio.sleep(0.05)
+
+    async def run():
+        return await asyncio.gather(heartbeat(), main.handle_call_tool("ping", {}))
+
+    main.run_tool = loading
+    try:
+        reply = asyncio.run(run())[1]
+    finally:
+        main.run_tool = original
+    assert reply.structuredContent["summary"].startswith("pong") and calls[0] != threading.get_ident()
+    assert max(b - a for a, b in zip(ticks, ticks[1:])) < 0.15
+    print("[OK] Tool calls leave the server's event loop free")
+
+
+if __name__ == "__main__":
+    test_rows_sent_once_and_projected()
+    test_fuzzy_candidates_not_duplicated()
+    test_presentation_arguments_validated()
+    test_text_rendered_only_on_demand()
+    test_calls_run_off_the_loop()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""Test the prompt token budget and telemetry"""
+
+import asyncio
+from types import SimpleNamespace
+
+import chatbot.llm_client as llm_module
+from chatbot.llm_client import LLMClient
+from chatbot.token_budget import compact_result, estimate_tokens
+from people_server.tools import ToolResult
+from test_llm_functions import ScriptedModel, reply
+
+DEPARTMENTS = ("Sales", "Engineering", "HR")
+
+
+def big_listing(count=200):
+    people = [{"id": i, "full_name": f"Person {i}", "role": "Manager", "department": DEPARTMENTS[i % 3],
+               "salary": 200000 - i * 100, "age": 30 + i % 20} for i in range(count)]
+    text = f"Found {count * 5} employees with filters: role: Manager, showing the top {count} by salary:\n\n"
+    for i, person in enumerate(people, 1):
+        text += f"{i}. {person['full_name']} (ID: {person['id']})\n"
+        text += f"   Role: {person['role']} | Department: {person['department']}\n"
+        text += f"   Age: {person['age']}, Salary: ${person['salary']:,}\n\n"
+    return ToolResult(text, people, count * 5, count)
+
+
+class ListingMCPClient:
+    def __init__(self, result):
+        self.result = result
+
+    async def call_tool(self, tool_name, arguments=None):
+        return self.result.text
+
+    async def call_tool_result(self, tool_name, arguments=None):
+        return self.result
+
+
+def test_oversize_results_compacted():
+    small = ToolResult("Found 1 exact match(es) for 'john smith'", [])
+    assert compact_result(small) == small.text
+
+    listing = big_listing()
+    compacted = compact_result(listing, max_tokens=300, top_rows=10)
+    assert estimate_tokens(listing.text) > 3000 and estimate_tokens(compacted) <= 300
+    assert compacted.startswith("Found 1000 employees")
+    assert "department: Sales 67, Engineering 67, HR 66" in compacted
+    assert "salary: min 180,100, avg 190,050, max 200,000" in compacted
+    assert "- Person 0 (ID: 0): role Manager, department Sales, age 30, salary 200,000" in compacted
+
+    # A tighter budget keeps the aggregates and drops rows
+    tight = compact_result(listing, max_tokens=120, top_rows=10)
+    assert "department:" in tight and tight.count("\n- ") < compacted.count("\n- ")
+    print(f"[OK] {estimate_tokens(listing.text)} estimated tokens compacted to {estimate_tokens(compacted)}")
+
+
+def test_tokens_and_latency_recorded_per_shape():
+    llm_module.LLM_MODE = "classify"
+    client = LLMClient()
+    formatted = reply("Here are the managers")
+    formatted.usage_metadata = SimpleNamespace(prompt_token_count=812, candidates_token_count=40)
+    client.model = ScriptedModel(reply("LIST_PEOPLE: role=Manager"), formatted)
+    try:
+        answer = asyncio.run(client.process_message("managers", ListingMCPClient(big_listing())))
+    finally:
+        llm_module.LLM_MODE = "functions"
+        client.close()
+
+    assert answer == "Here are the managers"
+    prompt = client.model.requests[1][0]
+    assert "Summary of the 200 rows returned" in prompt and "Person 150" not in prompt
+    stats = client.telemetry.stats()
+    assert stats["classify"]["calls"] == 1 and stats["classify"]["input_tokens"] > 0
+    shape = stats["format:list_people(role)"]
+    assert shape["compacted"] == 1
+    assert shape["input_tokens"] == 812 and shape["output_tokens"] == 40
+    print(f"[OK] Per-shape token telemetry: {stats}")
+
+
+if __name__ == "__main__":
+    test_oversize_results_compacted()
+    test_tokens_and_latency_recorded_per_shape()
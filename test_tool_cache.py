@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""Test the tool-result cache"""
+
+import os
+import shutil
+import tempfile
+
+import people_server.tools as tools_module
+from people_server.registry import DatasetRegistry
+from people_server.tools import ResultCache, ToolResult, call_tool, tool_stats
+
+EMPLOYEES = """id,full_name,preferred_name,role,department
+1,Shiv Kumar,Shiv,Manager,Sales
+2,Rohit Verma,Rohit,Developer,Engineering
+"""
+
+
+class FakeVersion:
+    def __init__(self, source, version):
+        self.source = source
+        self.version = version
+
+
+def test_repeat_calls_served_from_cache():
+    data_dir = tempfile.mkdtemp()
+    path = os.path.join(data_dir, "employees.csv")
+    with open(path, "w") as handle:
+        handle.write(EMPLOYEES)
+    registry = DatasetRegistry(data_dir, default_primary="employees.csv")
+    original = tools_module.get_registry
+    tools_module.get_registry = lambda: registry
+    try:
+        before = tool_stats().get("list_people", {}).get("cache_hits", 0)
+        first = call_tool("list_people", {"department": "Sales"})
+        # Same arguments once validated, and the primary named explicitly
+        again = call_tool("list_people", {"department": " Sales", "limit": "10", "dataset": "employees"})
+        assert again is first and first.rows_returned == 1
+        assert tool_stats()["list_people"]["cache_hits"] == before + 1
+        assert first.text is again.text
+
+        with open(path, "a") as handle:
+            handle.write("3,Priya Shah,Priya,Analyst,Sales\n")
+        assert registry.store().refresh()
+        fresh = call_tool("list_people", {"department": "Sales"})
+        assert fresh is not first and fresh.rows_returned == 2
+        assert call_tool("list_people", {"department": "Sales"}) is fresh
+
+        assert call_tool("ping") is not call_tool("ping")
+        assert call_tool("list_people", {"dataset": "payroll"}).is_error
+    finally:
+        tools_module.get_registry = original
+        shutil.rmtree(data_dir)
+    print("[OK] Repeat calls answered from the cache until the dataset changes")
+
+
+def test_old_versions_dropped_and_size_bounded():
+    cache = ResultCache(max_size=2)
+    old, new = FakeVersion("a.csv", 1), FakeVersion("a.csv", 2)
+    other = FakeVersion("b.csv", 1)
+    cache.put(cache.key("list_people", {"role": "x"}, old), ToolResult("old"))
+    cache.put(cache.key("list_people", {"role": "x"}, other), ToolResult("other"))
+    assert cache.get(cache.key("list_people", {"role": "x"}, new)) is None
+    assert cache.stats()["invalidations"] == 1 and cache.stats()["size"] == 1
+
+    # A result computed from a version that has since been replaced is not kept
+    cache.put(cache.key("list_people", {"role": "y"}, old), ToolResult("late"))
+    assert cache.stats()["size"] == 1
+
+    for role in ("y", "z"):
+        cache.put(cache.key("list_people", {"role": role}, new), ToolResult(role))
+    assert cache.get(cache.key("list_people", {"role": "x"}, other)) is None
+    assert cache.get(cache.key("list_people", {"role": "z"}, new)).text == "z"
+
+    cache.put(cache.key("list_people", {}, new), ToolResult.error("bad"))
+    assert cache.get(cache.key("list_people", {}, new)) is None
+    print(f"[OK] Stale and cold entries evicted: {cache.stats()}")
+
+
+if __name__ == "__main__":
+    test_repeat_calls_served_from_cache()
+    test_old_versions_dropped_and_size_bounded()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""Test the shared tool registry"""
+
+from people_server.tools import TOOLS, call_tool, compile_validator, tool_stats
+
+
+def test_arguments_validated_and_converted():
+    validate = TOOLS["list_people"].validate
+    args = validate({"min_salary": "50,000", "max_age": 40.0, "role": " Manager ", "unknown": 1})
+    assert args == {"min_salary": 50000, "max_age": 40, "role": "Manager", "limit": 10}
+    assert validate({"limit": 10000})["limit"] == 200
+    # Clamped, not rejected: the published schema must accept it too
+    import jsonschema
+    schema = TOOLS["list_people"].input_schema
+    jsonschema.validate({"limit": 10000}, schema)
+    assert "maximum" not in schema["properties"]["limit"] and "capped at 200" in schema["properties"]["limit"]["description"]
+
+    validate = compile_validator({"properties": {"name": {"type": "string"}}, "required": ["name"]})
+    for bad in ({}, {"name": ""}, {"name": None}):
+        try:
+            validate(bad)
+            assert False, f"{bad} should be rejected"
+        except ValueError as e:
+            assert "name" in str(e)
+    print("[OK] Arguments validated against the compiled schema")
+
+
+def test_dispatch_returns_uniform_results():
+    result = call_tool("get_person_exact", {"name": "john smith", "dataset": "employees"})
+    assert not result.is_error and result.rows_returned == 1
+    assert result.data[0]["full_name"] == "John Smith"
+
+    result = call_tool("get_person_fuzzy", {"name": "Jon Smth", "dataset": "employees", "maxResults": "2"})
+    assert result.data["best_match"] == "John Smith" and result.rows_scanned >= result.rows_returned
+
+    result = call_tool("list_people", {"department": "Engineering", "dataset": "employees"})
+    assert result.rows_returned == len(result.data) > 0
+    assert all(p["department"] == "Engineering" for p in result.data)
+
+    assert call_tool("list_people", {"min_age": "forty"}).is_error
+    assert call_tool("list_people", {"dataset": "payroll"}).is_error
+    assert call_tool("fire_everyone").text == "Unknown tool: fire_everyone"
+    print("[OK] Tools dispatched through one registry")
+
+
+def test_calls_are_accounted():
+    before = tool_stats().get("ping", {}).get("calls", 0)
+    call_tool("ping")
+    call_tool("get_person_fuzzy", {"name": "Sarah", "dataset": "employees"})
+    stats = tool_stats()
+    assert stats["ping"]["calls"] == before + 1
+    fuzzy = stats["get_person_fuzzy"]
+    assert fuzzy["max_ms"] >= fuzzy["p50_ms"] > 0
+    assert fuzzy["rows_scanned"] >= fuzzy["rows_returned"] > 0
+    print(f"[OK] Per-tool accounting: {fuzzy}")
+
+
+if __name__ == "__main__":
+    test_arguments_validated_and_converted()
+    test_dispatch_returns_uniform_results()
+    test_calls_are_accounted()